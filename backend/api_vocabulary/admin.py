@@ -1,29 +1,144 @@
-from django.contrib import admin
-from .models import Language, SharedVocabularyWord, UserVocabularyWord, CustomWordContent, DownloadHistory
+from django.contrib import admin, messages
+from .translation_service import translate_example_sentences
+from .models import Language, SharedVocabularyWord, UserVocabularyWord, CustomWordContent, DownloadHistory, Deck, DeckBuild, ExportArtifact, ExportJob, GenerationJob, GenerationClaim, TranslationCache, CacheCounter, LLMResponseCache, AudioAsset
 
 @admin.register(Language)
 class LanguageAdmin(admin.ModelAdmin):
-    list_display = ("code", "name")
+    list_display = ("code", "name", "tts_backend", "tts_voice")
+    list_editable = ("tts_backend", "tts_voice")
     search_fields = ("code", "name")
 
+@admin.action(description="Regenerar traducción de la frase de ejemplo")
+def regenerate_example_translations(modeladmin, request, queryset):
+    # Una llamada por lote a Google Translate por cada par de idiomas seleccionado
+    try:
+        updated = translate_example_sentences(
+            queryset.select_related("source_lang", "target_lang"), use_cache=False
+        )
+    except Exception as e:
+        modeladmin.message_user(request, f"Error al traducir: {e}", level=messages.ERROR)
+        return
+    modeladmin.message_user(request, f"Traducciones regeneradas: {len(updated)}")
+
+@admin.action(description="Regenerar contenido completo (sin usar las cachés)")
+def force_regenerate_content(modeladmin, request, queryset):
+    from .views import UserVocabularyWordViewSet  # Los flujos de generación viven en la vista
+
+    creator = UserVocabularyWordViewSet()
+    regenerated, failed = 0, 0
+    for content in queryset.select_related("source_lang", "target_lang"):
+        try:
+            if isinstance(content, CustomWordContent):
+                creator.generate_content_for_custom(content, force_regenerate=True)
+            else:
+                creator.generate_content_for_shared(content, force_regenerate=True)
+            regenerated += 1
+        except Exception as e:
+            failed += 1
+            modeladmin.message_user(request, f"Error al regenerar '{content.word}': {e}", level=messages.ERROR)
+    modeladmin.message_user(request, f"Contenido regenerado: {regenerated}. Fallidos: {failed}.")
+
 @admin.register(SharedVocabularyWord)
 class SharedVocabularyWordAdmin(admin.ModelAdmin):
     list_display = ("word", "translation", "source_lang", "target_lang")
+    list_select_related = ("source_lang", "target_lang")
     search_fields = ("word", "translation", "example_sentence")
+    actions = [regenerate_example_translations, force_regenerate_content]
 
 @admin.register(CustomWordContent)
 class CustomWordContentAdmin(admin.ModelAdmin):
     list_display = ("word", "context", "translation", "source_lang", "target_lang")
+    list_select_related = ("source_lang", "target_lang")
     search_fields = ("word", "translation", "context")
+    actions = [regenerate_example_translations, force_regenerate_content]
 
 @admin.register(UserVocabularyWord)
 class UserVocabularyWordAdmin(admin.ModelAdmin):
     list_display = ("user", "deck", "shared_word", "custom_content", "created_at")
+    # shared_word es nullable: el select_related automático del admin no lo seguiría
+    list_select_related = ("user", "shared_word__source_lang", "shared_word__target_lang", "custom_content")
     search_fields = ("user__email", "deck")
-    list_filter = ("deck", "shared_word", "custom_content", "created_at")
+    # Filtrar por palabra listaba (y renderizaba con sus idiomas) todo el vocabulario compartido
+    list_filter = (
+        "deck",
+        ("shared_word", admin.EmptyFieldListFilter),
+        ("custom_content", admin.EmptyFieldListFilter),
+        "created_at",
+    )
+    autocomplete_fields = ("shared_word", "custom_content")
+    readonly_fields = ("deck_ref",)  # Lo asigna signals.py a partir de `deck`
+
+@admin.register(Deck)
+class DeckAdmin(admin.ModelAdmin):
+    list_display = ("user", "name", "word_count", "last_modified", "created_at")
+    list_select_related = ("user",)
+    search_fields = ("user__email", "name")
+    readonly_fields = ("key", "word_count", "last_modified")
 
 @admin.register(DownloadHistory)
 class DownloadHistoryAdmin(admin.ModelAdmin):
     list_display = ('user', 'deck_name', 'file_path', 'created_at')
+    list_select_related = ('user',)
     search_fields = ('user__username', 'deck_name')
-    list_filter = ('created_at',)
\ No newline at end of file
+    list_filter = ('created_at', 'delivered')
+
+@admin.register(GenerationJob)
+class GenerationJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "user", "word", "status", "stage", "progress", "attempts", "created_at", "finished_at")
+    list_select_related = ("user",)
+    search_fields = ("user__email", "word")
+    list_filter = ("status", "created_at")
+
+
+@admin.register(GenerationClaim)
+class GenerationClaimAdmin(admin.ModelAdmin):
+    list_display = ("word", "source_lang", "target_lang", "owner", "created_at", "heartbeat_at")
+    search_fields = ("word", "owner")
+
+
+@admin.register(TranslationCache)
+class TranslationCacheAdmin(admin.ModelAdmin):
+    list_display = ("source_text", "translated_text", "source_code", "target_code", "hits", "last_used_at")
+    search_fields = ("source_text", "translated_text")
+    list_filter = ("source_code", "target_code")
+
+@admin.register(CacheCounter)
+class CacheCounterAdmin(admin.ModelAdmin):
+    list_display = ("name", "hits", "misses", "evictions", "hit_rate", "updated_at")
+
+
+@admin.register(LLMResponseCache)
+class LLMResponseCacheAdmin(admin.ModelAdmin):
+    list_display = ("prompt_hash", "model", "hits", "created_at", "expires_at", "last_used_at")
+    search_fields = ("prompt_hash", "raw_response")
+    list_filter = ("model",)
+
+
+@admin.register(AudioAsset)
+class AudioAssetAdmin(admin.ModelAdmin):
+    list_display = ("text", "lang_code", "voice", "format", "size", "created_at")
+    search_fields = ("text", "key")
+    list_filter = ("lang_code", "voice", "format")
+
+
+@admin.register(DeckBuild)
+class DeckBuildAdmin(admin.ModelAdmin):
+    list_display = ("user", "deck_name", "deck_id", "archive_path", "updated_at")
+    list_select_related = ("user",)
+    search_fields = ("user__username", "deck_name")
+    readonly_fields = ("notes", "media")
+
+
+@admin.register(ExportArtifact)
+class ExportArtifactAdmin(admin.ModelAdmin):
+    list_display = ("user", "deck_name", "fingerprint", "size", "created_at", "last_used_at")
+    list_select_related = ("user",)
+    search_fields = ("user__username", "deck_name", "fingerprint")
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "user", "deck_name", "status", "stage", "progress", "attempts", "created_at", "finished_at")
+    list_select_related = ("user",)
+    search_fields = ("user__email", "deck_name")
+    list_filter = ("status", "created_at")
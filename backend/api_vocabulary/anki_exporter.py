@@ -1,125 +1,563 @@
 import os
+import io
+import json
 import random
 import hashlib
+import sqlite3
 import tempfile
 import shutil
-import requests
+import sys
+import time
+import itertools
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import genanki
 from django.conf import settings
-from api_vocabulary.models import UserVocabularyWord, DownloadHistory
-from api_vocabulary.genanki_utils.model import get_flashlang_model
+from django.utils import timezone
+from api_vocabulary.models import (
+    UserVocabularyWord, CustomWordContent, DownloadHistory, DeckBuild, ExportArtifact, normalize_deck_key
+)
+from api_vocabulary.genanki_utils.model import TEMPLATE_VERSION, get_flashlang_model
+from api_vocabulary.translation_service import translate_example_sentences
+from api_vocabulary.media_resolver import copy_remote, is_local, local_path, open_remote
+from api_vocabulary.media_cache import CACHE_NAME as MEDIA_CACHE_NAME, get_media_cache
+from api_vocabulary.cache_stats import record_cache_event
+from api_vocabulary.export_store import enforce_user_quota, get_export_store
 
-def generate_apkg_for_user(user, deck_name=None, ids=None, allow_duplicates=False) -> tuple[str, str]:
+CHUNK_SIZE = 64 * 1024
+
+
+def iter_media_files(filefields, dest_dir, max_workers=None, failed=None):
     """
-    Genera un archivo .apkg para el usuario con las palabras seleccionadas y con audios embebidos.
-    Si se proporcionan IDs, se filtra por esas palabras; si no, por deck_name; si tampoco, todas las palabras.
-    Si allow_duplicates=False, se reutiliza un archivo si ya existe para el mismo conjunto.
-    También registra la descarga en el historial.
+    Genera las rutas locales de los audios del mazo a medida que están disponibles, leyendo directamente
+    del storage (media_resolver.py): los archivos en disco local se usan sin copiarlos; los remotos se sirven
+    desde la caché de media (media_cache.py) y los que faltan se leen en paralelo (pool de hilos acotado)
+    por streaming. Sin caché, los remotos se copian a dest_dir.
+    Los audios que no se pudieron leer se agregan a `failed` como {"file": nombre, "reason": motivo}.
+    """
+    failed = [] if failed is None else failed
+
+    # Los audios son direccionados por contenido: el mismo archivo puede repetirse entre palabras
+    pending = {}
+    for filefield in filefields:
+        if filefield and filefield.name:
+            pending.setdefault(os.path.basename(filefield.name), filefield)
+
+    remote = {}
+    for filename, filefield in pending.items():
+        if is_local(filefield):
+            path = local_path(filefield)
+            if path:
+                yield path
+            else:
+                print(f"[ERROR] No existe el archivo local {filefield.name}", file=sys.stderr)
+                failed.append({"file": filename, "reason": "El archivo no existe en el almacenamiento."})
+        else:
+            remote[filename] = filefield
+
+    cache = get_media_cache() if remote else None
+    cache_hits = 0
+    if cache:
+        for filename, filefield in list(remote.items()):
+            path = cache.get(filefield.name)
+            if path:
+                cache_hits += 1
+                del remote[filename]
+                yield path
+
+    def fetch(filefield):
+        if cache:
+            deadline = time.monotonic() + settings.APKG_MEDIA_FILE_TIMEOUT
+            return cache.put(filefield.name, open_remote(filefield), deadline)
+        return copy_remote(filefield, dest_dir)
+
+    if remote:
+        workers = min(max_workers or settings.APKG_MEDIA_DOWNLOAD_WORKERS, len(remote))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="apkg-media") as pool:
+            futures = {pool.submit(fetch, field): name for name, field in remote.items()}
+            for future in as_completed(futures):
+                filename = futures[future]
+                try:
+                    path = future.result()
+                except Exception as e:
+                    print(f"[ERROR] Fallo al leer {filename} del storage: {str(e)}", file=sys.stderr)
+                    failed.append({"file": filename, "reason": str(e)})
+                    continue
+                yield path
+
+    if cache:
+        # Contadores y expulsión desde el hilo principal (la base de datos no se usa en los hilos)
+        evictions = cache.evict() if remote else 0
+        record_cache_event(MEDIA_CACHE_NAME, hits=cache_hits, misses=len(remote), evictions=evictions)
+
+
+def fetch_media_files(filefields, dest_dir, max_workers=None):
     """
+    Igual que iter_media_files, pero reúne todos los audios antes de devolver.
+    Devuelve (rutas_locales, fallidos) con fallidos = [{"file": nombre, "reason": motivo}].
+    """
+    failed = []
+    media_files = sorted(iter_media_files(filefields, dest_dir, max_workers=max_workers, failed=failed))
+    failed.sort(key=lambda item: item["file"])
+    return media_files, failed
+
+
+def build_collection(deck, timestamp=None):
+    """Genera la base SQLite collection.anki2 del mazo en memoria y devuelve sus bytes."""
+    timestamp = time.time() if timestamp is None else timestamp
+    conn = sqlite3.connect(":memory:")
+    try:
+        genanki.Package(deck).write_to_db(conn.cursor(), timestamp, itertools.count(int(timestamp * 1000)))
+        conn.commit()
+        return conn.serialize()
+    finally:
+        conn.close()
+
+
+class _ZipStream(io.RawIOBase):
+    """Destino no posicionable para zipfile: acumula lo escrito hasta que se entrega con drain()."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_apkg(deck, media_fields, tee_path=None, failed=None, previous=None, media_index=None, on_progress=None):
+    """
+    Genera el .apkg por partes, a medida que se escribe el zip: primero cada audio (entrada por entrada,
+    en cuanto está disponible), luego el índice `media` y al final collection.anki2. El primer byte no
+    depende del tamaño del mazo y nunca se guarda el archivo completo en memoria.
+    Con `tee_path`, también se escribe en ese archivo local (quien llama decide si publicarlo).
+    Con `previous` = (archivo o ruta, {nombre en el storage: entrada}) los audios que ya estaban en el .apkg anterior
+    del mazo se copian desde ahí sin volver a leer el storage. `media_index` se completa con
+    {nombre en el storage: entrada} del archivo nuevo. `on_progress("media", reunidos, total)` se llama por cada audio.
+    """
+    failed = [] if failed is None else failed
+    media_index = {} if media_index is None else media_index
+    buffer = _ZipStream()
+    temp_dir = tempfile.mkdtemp()
+    tee = open(tee_path, "wb") if tee_path else None
+
+    fields_by_filename = {}
+    for field in media_fields:
+        if field and field.name:
+            fields_by_filename.setdefault(os.path.basename(field.name), field)
+
+    previous_archive = None
+    if previous:
+        try:
+            previous_archive = zipfile.ZipFile(previous[0])
+        except Exception as e:
+            print(f"[ERROR] No se pudo abrir el .apkg anterior: {str(e)}", file=sys.stderr)
+
+    def emit():
+        data = buffer.drain()
+        if data and tee:
+            tee.write(data)
+        return data
+
+    try:
+        # El zip no es posicionable: cada entrada lleva data descriptor; DEFLATED es el formato que todos los lectores aceptan así
+        with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+            media_names = {}
+            entry_ids = itertools.count()
+
+            def write_media(source, filename):
+                entry_name = str(next(entry_ids))
+                with archive.open(entry_name, "w") as entry:
+                    while chunk := source.read(CHUNK_SIZE):
+                        entry.write(chunk)
+                        data = emit()
+                        if data:
+                            yield data
+                media_names[entry_name] = filename
+                media_index[fields_by_filename[filename].name] = entry_name
+                if on_progress:
+                    on_progress("media", len(media_names), len(fields_by_filename))
+                data = emit()
+                if data:
+                    yield data
+
+            pending = media_fields
+            if previous_archive:
+                available = set(previous_archive.namelist())
+                pending = []
+                for filename, field in fields_by_filename.items():
+                    entry_name = previous[1].get(field.name)
+                    if entry_name in available:
+                        with previous_archive.open(entry_name) as source:
+                            yield from write_media(source, filename)
+                    else:
+                        pending.append(field)
+                print(
+                    f"[LOG] {len(media_names)} audios copiados del .apkg anterior, {len(pending)} leídos del storage",
+                    file=sys.stderr
+                )
+
+            for path in iter_media_files(pending, temp_dir, failed=failed):
+                with open(path, "rb") as source:
+                    yield from write_media(source, os.path.basename(path))
+
+            archive.writestr("media", json.dumps(media_names))
+            archive.writestr("collection.anki2", build_collection(deck), compresslevel=6)
+        yield emit()
+    finally:
+        if previous_archive:
+            previous_archive.close()
+        if tee:
+            tee.close()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def stable_deck_id(user_id, deck_name):
+    """Id de Anki del mazo derivado del usuario y el nombre: se conserva entre exportaciones."""
+    digest = hashlib.sha256(f"{user_id}\x1f{deck_name}".encode("utf-8")).hexdigest()
+    return (1 << 30) + int(digest[:8], 16) % (1 << 30)
+
+
+def note_version(source):
+    """Versión del contenido de una nota: plantilla + fuente (shared/custom) + updated_at."""
+    kind = "c" if isinstance(source, CustomWordContent) else "s"
+    return f"{TEMPLATE_VERSION}:{kind}{source.pk}:{source.updated_at.isoformat()}"
+
+
+def export_fingerprint(user, deck_name, user_words):
+    """Clave del .apkg reutilizable: cambia si cambia cualquier nota, el mazo o la versión de plantilla."""
+    parts = [f"v{TEMPLATE_VERSION}", user.username, deck_name]
+    parts += sorted(
+        f"{w.id}={note_version(w.custom_content or w.shared_word)}"
+        for w in user_words if w.custom_content or w.shared_word
+    )
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def render_note_row(source, guid, version):
+    """Fila de la nota tal como va al mazo: {"guid", "version", "fields", "media"} (media = nombres en el storage)."""
+    word_audio_filename = os.path.basename(source.audio_word.name) if source.audio_word else ""
+    sentence_audio_filename = os.path.basename(source.audio_sentence.name) if source.audio_sentence else ""
+    return {
+        "guid": guid,
+        "version": version,
+        "fields": [
+            source.word,
+            source.translation or "",
+            source.example_sentence or "",
+            source.example_translation or "",
+            f"[sound:{word_audio_filename}]" if word_audio_filename else "",
+            f"[sound:{sentence_audio_filename}]" if sentence_audio_filename else "",
+            f"<img src='{source.image_url}'>" if source.image_url else "",
+        ],
+        "media": [field.name for field in (source.audio_word, source.audio_sentence) if field],
+    }
+
+
+def apkg_filename(deck_name):
+    """Nombre con el que el usuario descarga el mazo."""
+    return f"aiflashlang_{deck_name.strip().replace(' ', '_')}.apkg"
 
-    # Obtener palabras filtradas
-    user_words = UserVocabularyWord.objects.filter(user=user)
+
+class ApkgExport:
+    """Mazo listo para exportar: notas construidas y audios pendientes de reunir."""
+
+    def __init__(self, user, base_deck_name, user_words, name, cacheable, deck=None, media_fields=None,
+                 rows=None, build=None, fingerprint=None, artifact=None, store=None, on_progress=None,
+                 delta=False, history_ids=None, snapshot_at=None, whole_deck=False):
+        self.user = user
+        self.base_deck_name = base_deck_name
+        self.user_words = user_words
+        self.name = name  # Nombre en el almacén de exportaciones (export_store.py)
+        self.cacheable = cacheable
+        self.deck = deck
+        self.media_fields = media_fields or []
+        self.rows = rows or {}
+        self.build = build  # DeckBuild anterior del mazo (si existe)
+        self.fingerprint = fingerprint
+        self.artifact = artifact  # ExportArtifact ya publicado (reutilizado, o al terminar stream())
+        self.store = store or get_export_store()
+        self.on_progress = on_progress
+        self.delta = delta  # Solo las palabras nuevas o modificadas desde la última descarga
+        self.history_ids = history_ids  # IDs que se registran en el historial (en un delta, el mazo completo)
+        self.snapshot_at = snapshot_at  # Momento en que se leyeron las palabras
+        self.whole_deck = whole_deck  # Se exportó el mazo completo (no una selección por ids): puede ser su DeckBuild
+
+    @property
+    def cached(self):
+        # Un .apkg reutilizable ya generado para el mismo contenido
+        return self.deck is None
+
+    @property
+    def filename(self):
+        if self.delta:
+            return apkg_filename(f"{self.base_deck_name}_nuevas")
+        return apkg_filename(self.base_deck_name)
+
+    def open(self):
+        return self.store.open(self.artifact.path)
+
+    def open_previous(self):
+        """(archivo, índice de audios) del último .apkg completo del mazo, o None si ya no está en el almacén."""
+        if not (self.build and self.build.archive_path):
+            return None
+        try:
+            return self.store.open(self.build.archive_path), self.build.media
+        except OSError:
+            return None
+
+    def stream(self, failed=None, one_off=False):
+        """
+        Chunks del .apkg (ver stream_apkg). Si la exportación es reutilizable se guarda a la vez en el almacén y,
+        completa, queda como base de la próxima exportación del mazo. Con one_off=True se guarda siempre
+        (como artefacto de un solo uso si no es reutilizable o faltó algún audio).
+        """
+        failed = [] if failed is None else failed
+        keep = self.cacheable or one_off
+        staging_path = self.store.staging_path(self.name) if keep else None
+        previous = self.open_previous()
+        media_index = {}
+        digest = hashlib.sha256()
+        try:
+            for chunk in stream_apkg(
+                self.deck, self.media_fields, tee_path=staging_path, failed=failed,
+                previous=previous, media_index=media_index, on_progress=self.on_progress
+            ):
+                digest.update(chunk)
+                yield chunk
+            if self.cacheable and not failed:
+                self.publish(staging_path, media_index, digest.hexdigest())
+            elif one_off:
+                self.publish_one_off(staging_path, digest.hexdigest())
+            elif keep:
+                print(f"[ERROR] {len(failed)} audios no se pudieron incluir en el mazo; no se guarda para reutilizar", file=sys.stderr)
+        finally:
+            if previous:
+                previous[0].close()
+            if staging_path and os.path.exists(staging_path):
+                os.remove(staging_path)
+
+    def publish(self, staging_path, media_index, sha256=""):
+        """
+        Publica el .apkg completo y lo registra en el índice de artefactos. Si es el mazo entero, queda además
+        como base de la próxima exportación (una selección por ids no reemplaza las notas y audios del DeckBuild).
+        """
+        size = self.store.publish(staging_path, self.name)
+        self.artifact, _ = ExportArtifact.objects.update_or_create(
+            user=self.user,
+            fingerprint=self.fingerprint,
+            defaults={
+                "deck_name": self.base_deck_name,
+                "path": self.name,
+                "size": size,
+                "sha256": sha256,
+                "created_at": timezone.now(),  # Se vuelve a publicar: cambia el Last-Modified
+                "last_used_at": timezone.now(),
+            },
+        )
+        if self.whole_deck:
+            DeckBuild.objects.update_or_create(
+                user=self.user,
+                deck_key=normalize_deck_key(self.base_deck_name),
+                defaults={
+                    "deck_name": self.base_deck_name,
+                    "deck_id": self.deck.deck_id,
+                    "notes": self.rows,
+                    "media": media_index,
+                    "archive_path": self.name,
+                },
+            )
+        enforce_user_quota(self.user, keep=self.artifact, store=self.store)
+
+    def publish_one_off(self, staging_path, sha256=""):
+        """Publica el .apkg con un nombre propio; nunca se reutiliza y expira antes (EXPORT_ONE_OFF_MAX_AGE_HOURS)."""
+        self.name = self.store.name_for(
+            self.user.id, f"aiflashlang_{self.base_deck_name.strip().replace(' ', '_')}_{uuid.uuid4().hex[:8]}.apkg"
+        )
+        size = self.store.publish(staging_path, self.name)
+        self.artifact = ExportArtifact.objects.create(
+            user=self.user, deck_name=self.base_deck_name, path=self.name, size=size, sha256=sha256
+        )
+        enforce_user_quota(self.user, keep=self.artifact, store=self.store)
+
+    def record_download(self, delivered=True):
+        """
+        Registra la descarga en el historial. Solo debe llamarse cuando el .apkg llegó completo al usuario
+        (o con delivered=False, hasta que descargue el artefacto de su trabajo): el próximo delta parte de aquí.
+        """
+        return DownloadHistory.objects.create(
+            user=self.user,
+            deck_name=self.base_deck_name,
+            word_ids=",".join(str(i) for i in (self.history_ids or [w.id for w in self.user_words])),
+            file_path=self.artifact.path if self.artifact else "",
+            artifact=self.artifact,
+            delta=self.delta,
+            snapshot_at=self.snapshot_at,
+            delivered=delivered,
+        )
+
+
+# Relaciones que necesita la exportación por palabra (contenido, idiomas para traducir los ejemplos, mazo)
+EXPORT_RELATED = (
+    "deck_ref", "shared_word__source_lang", "shared_word__target_lang",
+    "custom_content__source_lang", "custom_content__target_lang",
+)
+
+
+def prepare_apkg_export(user, deck_name=None, ids=None, allow_duplicates=False, on_progress=None,
+                        since_last_download=False) -> ApkgExport:
+    """
+    Selecciona las palabras y construye las notas del mazo (sin tocar todavía los audios).
+    Si se proporcionan IDs, se filtra por esas palabras; si no, por la clave del mazo deck_name (igual que
+    /api/decks/: "General" y "general " son el mismo mazo); si tampoco, todas las palabras.
+    Si allow_duplicates=False y el índice de artefactos tiene un .apkg con el mismo fingerprint de contenido,
+    se devuelve sin construir nada (export.cached).
+    Si no, se parte del DeckBuild del mazo: mismo id de mazo, mismos GUID de notas y sus audios ya empaquetados.
+    Con since_last_download=True solo se empaquetan las palabras nuevas o modificadas desde la última descarga
+    del mazo (mismo id de mazo y mismos GUID, así Anki las fusiona con el mazo ya importado): las que no estaban
+    en esa descarga o cambiaron después de su snapshot_at. Sin descargas previas es una exportación completa.
+    `on_progress(etapa, hechos, total)` recibe el avance: "notes" al renderizar y "media" al reunir los audios.
+    """
+
+    # Obtener palabras filtradas: una sola consulta con el contenido y sus idiomas (las traducciones de
+    # ejemplo necesitan los códigos); a partir de aquí todo trabaja sobre esta lista
+    queryset = UserVocabularyWord.objects.filter(user=user).select_related(*EXPORT_RELATED).order_by("id")
     if ids:
-        user_words = user_words.filter(id__in=ids)
+        queryset = queryset.filter(id__in=ids)
     elif deck_name:
-        user_words = user_words.filter(deck=deck_name)
+        queryset = queryset.filter(deck_ref__key=normalize_deck_key(deck_name))
+    # Antes de leer: lo que se modifique desde ahora (incluso mientras se arma el mazo) entra en el próximo delta
+    snapshot_at = timezone.now()
+    user_words = list(queryset)
 
-    if not user_words.exists():
+    if not user_words:
         raise ValueError("No se encontraron palabras para exportar.")
 
-    # Nombre base del mazo
-    base_deck_name = deck_name or user_words.first().deck or "default"
+    # Nombre base del mazo: el del Deck si se exporta un mazo (el mismo para cualquier forma de escribirlo).
+    # El historial y el DeckBuild se buscan por su clave
+    base_deck_name = user_words[0].deck_ref.name if deck_name else (user_words[0].deck or "default")
+    deck_key = normalize_deck_key(base_deck_name)
     final_deck_name = base_deck_name.strip().replace(" ", "_")
 
-    # Ruta de usuario
-    user_folder = os.path.join(settings.MEDIA_ROOT, "generated_apkg", f"user_{user.id}")
-    os.makedirs(user_folder, exist_ok=True)
+    store = get_export_store()
+
+    delta = False
+    history_ids = None
+    if since_last_download and not allow_duplicates:
+        last = (
+            DownloadHistory.objects.filter(user=user, deck_key=deck_key, delivered=True)
+            .order_by("-created_at")
+            .first()
+        )
+        if last:
+            known_ids = {int(i) for i in last.word_ids.split(",") if i.strip().isdigit()}
+            since = last.snapshot_at or last.created_at
+            # El historial registra el mazo completo que el usuario tiene en Anki después de importar el delta
+            history_ids = [w.id for w in user_words]
+            user_words = [
+                w for w in user_words
+                if w.id not in known_ids or (w.content and w.content.updated_at > since)
+            ]
+            if not user_words:
+                raise ValueError("No hay palabras nuevas ni modificadas desde la última descarga.")
+            delta = True
+
+    # Completar traducciones de ejemplo faltantes con una llamada por lote por par de idiomas
+    # (antes del fingerprint: completar una traducción cambia la versión de la nota)
+    try:
+        translate_example_sentences(
+            [w.custom_content or w.shared_word for w in user_words if w.custom_content or w.shared_word],
+            only_missing=True
+        )
+    except Exception as e:
+        print(f"[ERROR] No se pudieron completar las traducciones de ejemplo: {str(e)}", file=sys.stderr)
 
     # Comportamiento con duplicados
-    if not allow_duplicates:
-        word_hash_input = "|".join(sorted([f"{w.custom_content_id or w.shared_word_id}" for w in user_words]))
-        deck_hash = hashlib.md5(word_hash_input.encode()).hexdigest()[:8]
-        output_filename = f"aiflashlang_{final_deck_name}_{deck_hash}.apkg"
-        output_path = os.path.join(user_folder, output_filename)
-
-        if os.path.exists(output_path):
-            # Registrar historial incluso si se reutiliza
-            DownloadHistory.objects.create(
-                user=user,
-                deck_name=base_deck_name,
-                word_ids=",".join(str(w.id) for w in user_words),
-                file_path=output_path,
+    build = None
+    fingerprint = None
+    cacheable = not allow_duplicates and not delta
+    if cacheable:
+        fingerprint = export_fingerprint(user, base_deck_name, user_words)
+        output_name = store.name_for(user.id, f"aiflashlang_{final_deck_name}_{fingerprint[:12]}.apkg")
+
+        # Búsqueda por índice: solo se consulta el almacén para confirmar el archivo encontrado
+        artifact = ExportArtifact.objects.filter(user=user, fingerprint=fingerprint).first()
+        if artifact and store.exists(artifact.path):
+            ExportArtifact.objects.filter(pk=artifact.pk).update(last_used_at=timezone.now())
+            return ApkgExport(
+                user, base_deck_name, user_words, artifact.path, cacheable=True,
+                fingerprint=fingerprint, artifact=artifact, store=store, on_progress=on_progress,
+                snapshot_at=snapshot_at
             )
-            return output_path, base_deck_name
+        if artifact:
+            artifact.delete()
     else:
-        # Si se permiten duplicados, siempre crear nuevo archivo
-        temp_suffix = random.randint(1000, 9999)
-        output_filename = f"aiflashlang_{final_deck_name}_{temp_suffix}.apkg"
-        output_path = os.path.join(user_folder, output_filename)
+        # Mazo con duplicados o delta: siempre se arma (si se guarda, es de un solo uso)
+        output_name = store.name_for(user.id, f"aiflashlang_{final_deck_name}_{uuid.uuid4().hex[:8]}.apkg")
 
-    # Crear carpeta temporal para audios descargados
-    TEMP_DIR = tempfile.mkdtemp()
-
-    def download_to_temp(filefield):
-        if not filefield or not filefield.url:
-            return None
-        try:
-            url = filefield.url
-            filename = os.path.basename(filefield.name)
-            local_path = os.path.join(TEMP_DIR, filename)
-
-            response = requests.get(url)
-            if response.status_code == 200:
-                with open(local_path, 'wb') as f:
-                    f.write(response.content)
-                return local_path
-        except Exception as e:
-            print(f"[ERROR] Fallo al descargar {filefield.name}: {str(e)}")
-        return None
+    if not allow_duplicates:
+        # El delta usa el id de mazo y los GUID del DeckBuild, pero no lo reemplaza (no es el mazo completo)
+        build = DeckBuild.objects.filter(user=user, deck_key=deck_key).first()
+        deck_id = build.deck_id if build else stable_deck_id(user.id, base_deck_name)
+    else:
+        deck_id = random.randrange(1 << 30, 1 << 31)
 
     # Crear mazo Anki
     deck = genanki.Deck(
-        deck_id=random.randrange(1 << 30, 1 << 31),
+        deck_id=deck_id,
         name=f"AIflashLang {base_deck_name} - {user.username}"
     )
-    media_files = []
+    model = get_flashlang_model()
+    previous_rows = build.notes if build else {}
+    media_fields = []
+    rows = {}
+    reused = 0
 
     for word in user_words:
         source = word.custom_content or word.shared_word
         if not source:
             continue
 
-        word_text = source.word
-        translation = source.translation or ""
-        example = source.example_sentence or ""
-        example_translation = source.example_translation or ""
-        word_audio_filename = os.path.basename(source.audio_word.name) if source.audio_word else ""
-        sentence_audio_filename = os.path.basename(source.audio_sentence.name) if source.audio_sentence else ""
-        word_audio_tag = f"[sound:{word_audio_filename}]" if word_audio_filename else ""
-        sentence_audio_tag = f"[sound:{sentence_audio_filename}]" if sentence_audio_filename else ""
-        image_tag = f"<img src='{source.image_url}'>" if source.image_url else ""
-
-        note = genanki.Note(
-            model=get_flashlang_model(),
-            fields=[
-                word_text,
-                translation,
-                example,
-                example_translation,
-                word_audio_tag,
-                sentence_audio_tag,
-                image_tag,
-            ],
-            guid=str(random.randrange(1 << 30, 1 << 31)) if allow_duplicates else None
-        )
+        key = str(word.id)
+        version = note_version(source)
+        previous_row = previous_rows.get(key)
+        if allow_duplicates:
+            rows[key] = render_note_row(source, str(random.randrange(1 << 30, 1 << 31)), version)
+        elif previous_row and previous_row.get("version") == version:
+            # Contenido sin cambios desde el último .apkg del mazo: la fila se reutiliza tal cual
+            rows[key] = previous_row
+            reused += 1
+        else:
+            # GUID estable por palabra del usuario: al reimportar, Anki actualiza la nota en vez de duplicarla
+            guid = (previous_row or {}).get("guid") or genanki.guid_for("aiflashlang", key)
+            rows[key] = render_note_row(source, guid, version)
 
-        deck.add_note(note)
+        deck.add_note(genanki.Note(model=model, fields=rows[key]["fields"], guid=rows[key]["guid"]))
+        media_fields.extend([source.audio_word, source.audio_sentence])
+        if on_progress:
+            on_progress("notes", len(rows), len(user_words))
 
-        # Descargar audios desde S3 y agregar como media local
-        for f in [source.audio_word, source.audio_sentence]:
-            local_path = download_to_temp(f)
-            if local_path:
-                media_files.append(local_path)
+    if build:
+        added = len(rows.keys() - previous_rows.keys())
+        print(
+            f"[LOG] Mazo '{base_deck_name}': {added} notas nuevas, {len(rows) - added - reused} actualizadas, "
+            f"{len(previous_rows.keys() - rows.keys())} eliminadas, {reused} sin cambios",
+            file=sys.stderr
+        )
 
     ''' Comentaremos este fragmento de codigo ya que no es necesario por ahora en produccion
     # Agregar imagen decorativa si existe
@@ -128,18 +566,35 @@ def generate_apkg_for_user(user, deck_name=None, ids=None, allow_duplicates=Fals
         media_files.append(flashy_path)
     '''
 
-    # Crear el archivo final
-    genanki.Package(deck, media_files=media_files).write_to_file(output_path)
-
-    # Registrar historial de descarga
-    DownloadHistory.objects.create(
-        user=user,
-        deck_name=base_deck_name,
-        word_ids=",".join(str(w.id) for w in user_words),
-        file_path=output_path,
+    return ApkgExport(
+        user, base_deck_name, user_words, output_name,
+        cacheable=cacheable, deck=deck, media_fields=media_fields, rows=rows, build=build,
+        fingerprint=fingerprint, store=store, on_progress=on_progress, delta=delta, history_ids=history_ids,
+        snapshot_at=snapshot_at, whole_deck=bool(deck_name) and not ids
     )
 
-    # Limpiar carpeta temporal
-    shutil.rmtree(TEMP_DIR)
 
-    return output_path, base_deck_name
\ No newline at end of file
+def generate_apkg_for_user(user, deck_name=None, ids=None, allow_duplicates=False,
+                           since_last_download=False) -> tuple[str, str, list]:
+    """
+    Genera un archivo .apkg para el usuario con las palabras seleccionadas y con audios embebidos,
+    y lo guarda en el almacén de exportaciones.
+    Si allow_duplicates=False, se reutiliza un archivo si ya existe para el mismo contenido.
+    También registra la descarga en el historial.
+    Devuelve (ruta local o nombre en el almacén, nombre_del_mazo, audios_fallidos).
+    """
+    export = prepare_apkg_export(
+        user, deck_name=deck_name, ids=ids, allow_duplicates=allow_duplicates, since_last_download=since_last_download
+    )
+    failed_media = []
+    if not export.cached:
+        for _ in export.stream(failed=failed_media, one_off=True):
+            pass
+        if failed_media:
+            print(f"[ERROR] {len(failed_media)} audios no se pudieron incluir en el mazo '{export.base_deck_name}'", file=sys.stderr)
+
+    # Registrar historial de descarga (incluso si se reutiliza)
+    export.record_download()
+    failed_media.sort(key=lambda item: item["file"])
+    path = export.store.local_path(export.artifact.path) or export.artifact.path
+    return path, export.base_deck_name, failed_media
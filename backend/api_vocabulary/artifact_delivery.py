@@ -0,0 +1,116 @@
+# artifact_delivery.py
+# Entrega de los .apkg ya publicados sin que el worker de Python empuje los bytes (EXPORT_DELIVERY):
+# - "x-accel":    X-Accel-Redirect hacia una location `internal` de nginx (EXPORT_ACCEL_PREFIX → generated_apkg/).
+# - "x-sendfile": X-Sendfile con la ruta en disco (Apache mod_xsendfile, lighttpd).
+# - "presigned":  redirección a una URL firmada y temporal del bucket (EXPORT_PRESIGNED_TTL segundos).
+# - "stream":     el propio Django lee el archivo (con ETag/Range, artifact_http.py). Es el respaldo de todos.
+# - "auto":       "presigned" si el almacén es remoto; "stream" si es local (x-accel/x-sendfile requieren
+#                 configurar el proxy, así que se activan explícitamente).
+#
+# El proxy o S3 atienden Range e If-Range por su cuenta; el 304 se resuelve aquí antes de delegar.
+#
+# `on_delivered` (p. ej. registrar la descarga en el historial) se llama cuando el archivo llega al cliente:
+# con "stream", al enviar el último byte; con el resto de modos, al entregar la redirección o el encabezado.
+
+import sys
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
+from django.utils import timezone
+
+from api_vocabulary.artifact_http import call_after, not_modified_response, serve_artifact, validator_headers
+from api_vocabulary.export_store import get_export_store
+from api_vocabulary.models import ExportArtifact
+
+
+def deliver_stream(request, artifact, filename, store):
+    return serve_artifact(request, artifact, filename, store)
+
+
+def _proxy_response(request, artifact, filename, header, value):
+    response = HttpResponse(content_type="application/octet-stream")
+    response[header] = value
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    for key, header_value in validator_headers(artifact).items():
+        response[key] = header_value
+    return response
+
+
+def deliver_x_accel(request, artifact, filename, store):
+    if not store.local_path(artifact.path):
+        return None
+    uri = settings.EXPORT_ACCEL_PREFIX.rstrip("/") + "/" + quote(artifact.path)
+    return _proxy_response(request, artifact, filename, "X-Accel-Redirect", uri)
+
+
+def deliver_x_sendfile(request, artifact, filename, store):
+    path = store.local_path(artifact.path)
+    if not path:
+        return None
+    return _proxy_response(request, artifact, filename, "X-Sendfile", path)
+
+
+def deliver_presigned(request, artifact, filename, store):
+    ttl = settings.EXPORT_PRESIGNED_TTL
+    url = store.signed_url(artifact.path, expire=ttl, filename=filename)
+    if not url:
+        return None
+    # ?redirect=false: el cliente recibe la URL y la abre por su cuenta (p. ej. un gestor de descargas móvil)
+    if request.GET.get("redirect", "").lower() in ("0", "false", "no"):
+        return JsonResponse({"url": url, "expires_in": ttl, "filename": filename, "size": artifact.size})
+    response = HttpResponseRedirect(url)
+    response["Cache-Control"] = "private, no-store"
+    return response
+
+
+DELIVERY_MODES = {
+    "stream": deliver_stream,
+    "x-accel": deliver_x_accel,
+    "x-sendfile": deliver_x_sendfile,
+    "presigned": deliver_presigned,
+}
+
+
+def delivery_mode(store):
+    mode = settings.EXPORT_DELIVERY
+    if mode == "auto":
+        return "stream" if store.local_path("") else "presigned"
+    if mode not in DELIVERY_MODES:
+        print(f"[ERROR] EXPORT_DELIVERY='{mode}' no existe; se usa 'stream'", file=sys.stderr)
+        return "stream"
+    return mode
+
+
+def _notify_delivered(response, artifact, on_delivered):
+    # 304 y 416 no entregan nada; un rango que no llega al final del archivo tampoco completa la descarga
+    if not on_delivered or response.status_code not in (200, 206, 302):
+        return response
+    if response.status_code == 206 and not response["Content-Range"].endswith(f"-{artifact.size - 1}/{artifact.size}"):
+        return response
+    if response.streaming:
+        response.streaming_content = call_after(response.streaming_content, on_delivered)
+    else:
+        on_delivered()
+    return response
+
+
+def deliver_artifact(request, artifact, filename, store=None, on_delivered=None):
+    """
+    Respuesta de descarga del artefacto según EXPORT_DELIVERY. Si el modo no aplica al almacén
+    (p. ej. x-accel con S3), se responde por streaming. `on_delivered()` se llama al completar la entrega.
+    """
+    store = store or get_export_store()
+    mode = delivery_mode(store)
+    if mode == "stream":
+        return _notify_delivered(deliver_stream(request, artifact, filename, store), artifact, on_delivered)
+
+    ExportArtifact.objects.filter(pk=artifact.pk).update(last_used_at=timezone.now())
+    not_modified = not_modified_response(request, artifact)
+    if not_modified:
+        return not_modified
+    response = DELIVERY_MODES[mode](request, artifact, filename, store)
+    if response is None:
+        print(f"[LOG] Entrega '{mode}' no disponible para {artifact.path}; se usa streaming", file=sys.stderr)
+        response = deliver_stream(request, artifact, filename, store)
+    return _notify_delivered(response, artifact, on_delivered)
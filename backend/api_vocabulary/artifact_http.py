@@ -0,0 +1,137 @@
+# artifact_http.py
+# Respuesta HTTP de un .apkg ya publicado en el almacén de exportaciones, con validadores y rangos:
+# - ETag (hash del contenido) y Last-Modified (fecha de publicación) → 304 con If-None-Match / If-Modified-Since.
+# - Range: bytes=inicio-fin (un solo rango) → 206, para que un cliente lento retome una descarga cortada.
+#   If-Range con un validador que ya no coincide devuelve el archivo completo (cambió el contenido).
+
+import re
+
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+from api_vocabulary.models import ExportArtifact
+
+CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def artifact_etag(artifact):
+    if artifact.sha256:
+        return quote_etag(artifact.sha256)
+    # Artefactos sin hash: débil, derivado del tamaño y la fecha de publicación
+    return "W/" + quote_etag(f"{artifact.size:x}-{int(artifact.created_at.timestamp()):x}")
+
+
+def _not_modified(request, etag, last_modified):
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match:
+        return if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+    since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+    return since is not None and int(last_modified) <= since
+
+
+def _range_applies(request, etag, last_modified):
+    if_range = request.headers.get("If-Range")
+    if not if_range:
+        return True
+    if if_range.strip() == etag and not etag.startswith("W/"):
+        return True
+    date = parse_http_date_safe(if_range)
+    return date is not None and int(last_modified) <= date
+
+
+def parse_range(header, size):
+    """(inicio, fin) inclusivos del rango pedido, None si no es un rango de bytes simple, o ValueError si no cabe."""
+    match = RANGE_RE.match((header or "").replace(" ", ""))
+    if not match or match.groups() == ("", ""):
+        return None
+    start, end = match.groups()
+    if start == "":
+        # Sufijo: los últimos N bytes
+        length = int(end)
+        if length == 0:
+            raise ValueError("Rango vacío")
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError("Rango fuera del archivo")
+    return start, end
+
+
+def _read_range(file, start, length):
+    try:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def call_after(chunks, callback):
+    """Entrega `chunks` y llama a `callback()` solo si se enviaron todos (no si el cliente cortó la descarga)."""
+    yield from chunks
+    callback()
+
+
+def validator_headers(artifact):
+    return {
+        "ETag": artifact_etag(artifact),
+        "Last-Modified": http_date(artifact.created_at.timestamp()),
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, no-cache",
+    }
+
+
+def not_modified_response(request, artifact):
+    """304 si el cliente ya tiene esta versión del artefacto; None si hay que entregarlo."""
+    if not _not_modified(request, artifact_etag(artifact), artifact.created_at.timestamp()):
+        return None
+    response = HttpResponseNotModified()
+    for key, value in validator_headers(artifact).items():
+        response[key] = value
+    return response
+
+
+def serve_artifact(request, artifact, filename, store):
+    """Respuesta 200/206/304/416 del artefacto, leída por este proceso (ver encabezado del módulo)."""
+    etag = artifact_etag(artifact)
+    last_modified = artifact.created_at.timestamp()
+    headers = validator_headers(artifact)
+    ExportArtifact.objects.filter(pk=artifact.pk).update(last_used_at=timezone.now())
+
+    not_modified = not_modified_response(request, artifact)
+    if not_modified:
+        return not_modified
+
+    size = artifact.size
+    byte_range = None
+    if "Range" in request.headers and _range_applies(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.headers["Range"], size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            for key, value in headers.items():
+                response[key] = value
+            return response
+
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1
+    response = StreamingHttpResponse(
+        _read_range(store.open(artifact.path), start, length),
+        status=206 if byte_range else 200,
+        content_type="application/octet-stream",
+    )
+    response["Content-Length"] = str(length)
+    if byte_range:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    for key, value in headers.items():
+        response[key] = value
+    return response
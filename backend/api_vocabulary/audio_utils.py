@@ -1,32 +1,101 @@
 # audio_utils.py
-# Utilidades para generar audios con gTTS
-# 🔄 Este módulo es temporal y será reemplazado por Google Cloud TTS en producción
+# Utilidades para generar audios (el motor TTS de cada idioma se define en tts_backends.py)
+# Los audios se guardan como AudioAsset direccionados por contenido: cada (texto, idioma) se sintetiza una sola vez.
 
-from gtts import gTTS
-from io import BytesIO
+import hashlib
 from django.core.files.base import ContentFile
-from .models import SharedVocabularyWord, CustomWordContent  # Necesario para acceder a source_lang y target_lang dinámicamente
+from django.db import IntegrityError, transaction
+from .models import SharedVocabularyWord, CustomWordContent, AudioAsset, audio_asset_path  # Necesario para acceder a source_lang y target_lang dinámicamente
 import sys
+from .tts_backends import tts_for_language
+
+DEFAULT_VOICE = "default"
+DEFAULT_FORMAT = "mp3"
+
+
+def audio_asset_key(text, lang_code, voice=DEFAULT_VOICE, audio_format=DEFAULT_FORMAT):
+    raw = f"{text.strip()}\x1f{lang_code}\x1f{voice}\x1f{audio_format}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _asset_spec(text, language):
+    backend, lang_code, voice = tts_for_language(language)
+    voice_label = backend.voice_label(voice)
+    key = audio_asset_key(text, lang_code, voice_label, backend.audio_format)
+    return backend, lang_code, voice, voice_label, key
+
+
+def store_audio_blob(text, language):
+    """
+    Sintetiza (con el motor TTS configurado para el idioma) y sube el audio a su ruta derivada del hash,
+    si aún no está en el storage. Solo toca el storage (no la base de datos), así que puede ejecutarse
+    en un hilo del pipeline. Devuelve los datos para registrar el AudioAsset con register_audio_asset().
+    """
+    text = text.strip()
+    if not text:
+        raise ValueError("El texto está vacío. No se puede generar audio.")
+
+    backend, lang_code, voice, voice_label, key = _asset_spec(text, language)
+    storage = AudioAsset._meta.get_field("file").storage
+    name = audio_asset_path(key, backend.audio_format)
+
+    # El archivo puede existir aunque falte la fila (p. ej. se borró el registro): no se vuelve a sintetizar
+    if storage.exists(name):
+        size = storage.size(name)
+    else:
+        audio_bytes = backend.synthesize(text, lang_code, voice)
+        name = storage.save(name, ContentFile(audio_bytes))
+        size = len(audio_bytes)
+
+    return {
+        "key": key, "name": name, "size": size,
+        "text": text, "lang_code": lang_code, "voice": voice_label, "format": backend.audio_format,
+    }
+
+
+def register_audio_asset(blob):
+    asset = AudioAsset.objects.filter(key=blob["key"]).first()
+    if asset:
+        return asset
+
+    asset = AudioAsset(
+        key=blob["key"], text=blob["text"], lang_code=blob["lang_code"],
+        voice=blob["voice"], format=blob["format"], size=blob["size"]
+    )
+    asset.file.name = blob["name"]
+    try:
+        with transaction.atomic():
+            asset.save()
+    except IntegrityError:
+        # Otro proceso registró el mismo audio a la vez; el contenido es idéntico
+        asset = AudioAsset.objects.get(key=blob["key"])
+    return asset
+
+
+def get_or_create_audio_asset(text, language):
+    """
+    Devuelve el AudioAsset del texto en el idioma (con su motor y voz), sintetizándolo y subiéndolo solo si no existe.
+    """
+    asset = AudioAsset.objects.filter(key=_asset_spec(text.strip(), language)[-1]).first()
+    if asset:
+        return asset
+    return register_audio_asset(store_audio_blob(text, language))
+
 
 def generate_gtts_audio_for_word(word_obj):
     """
-    Genera el audio de una palabra utilizando gTTS.
-    Usa el idioma definido por source_lang.code del usuario.
+    Genera el audio de una palabra con el motor TTS del idioma (gTTS por defecto).
+    Usa el idioma definido por source_lang del usuario.
     """
-    lang_code = word_obj.source_lang.code if word_obj.source_lang else "en"
     if not word_obj.word.strip():
         raise ValueError("La palabra está vacía. No se puede generar audio.")
-    
-    try:
-        tts = gTTS(text=word_obj.word, lang=lang_code)
-        audio_buffer = BytesIO()
-        tts.write_to_fp(audio_buffer)
-        audio_buffer.seek(0)
 
-        filename = f"{word_obj.word}_word.mp3"
-        word_obj.audio_word.save(filename, ContentFile(audio_buffer.read()))
+    try:
+        asset = get_or_create_audio_asset(word_obj.word, word_obj.source_lang)
+        word_obj.audio_word_asset = asset
+        word_obj.audio_word.name = asset.file.name
         word_obj.save()
-        return filename
+        return asset.file.name.split("/")[-1]
 
     except Exception as e:
         print(f"[ERROR] Error al generar/guardar audio de la palabra '{word_obj.word}': {e}", file=sys.stderr)
@@ -36,22 +105,16 @@ def generate_gtts_audio_for_sentence(word_obj):
     """
     Genera el audio de la frase de ejemplo usando el idioma de origen seleccionado por el usuario.
     """
-    lang_code = word_obj.source_lang.code if word_obj.source_lang else "en"
-
     if not word_obj.example_sentence or not word_obj.example_sentence.strip():
         raise ValueError("La frase está vacía. No se puede generar audio.")
 
     try:
-        tts = gTTS(text=word_obj.example_sentence, lang=lang_code)
-        audio_buffer = BytesIO()
-        tts.write_to_fp(audio_buffer)
-        audio_buffer.seek(0)
-
-        filename = f"{word_obj.word}_sentence.mp3"
-        word_obj.audio_sentence.save(filename, ContentFile(audio_buffer.read()))
+        asset = get_or_create_audio_asset(word_obj.example_sentence, word_obj.source_lang)
+        word_obj.audio_sentence_asset = asset
+        word_obj.audio_sentence.name = asset.file.name
         word_obj.save()
-        return filename
+        return asset.file.name.split("/")[-1]
 
     except Exception as e:
         print(f"[ERROR] Error al generar/guardar audio de la frase de ejemplo para '{word_obj.word}': {e}", file=sys.stderr)
-        raise
\ No newline at end of file
+        raise
@@ -0,0 +1,53 @@
+# cache_stats.py
+# Contadores de aciertos/fallos de las cachés (traducciones, etc.), guardados en CacheCounter
+# para que sean globales entre workers de gunicorn y sirvan para dimensionar cada caché.
+# También decide cuándo una escritura en una caché en tabla comprueba su límite (eviction_due).
+
+import random
+import sys
+
+from django.conf import settings
+from django.db.models import F
+
+from .models import CacheCounter
+
+
+def record_cache_event(name, hits=0, misses=0, evictions=0):
+    if not (hits or misses or evictions):
+        return
+    try:
+        updated = CacheCounter.objects.filter(name=name).update(
+            hits=F("hits") + hits,
+            misses=F("misses") + misses,
+            evictions=F("evictions") + evictions,
+        )
+        if not updated:
+            counter, created = CacheCounter.objects.get_or_create(name=name)
+            CacheCounter.objects.filter(pk=counter.pk).update(
+                hits=F("hits") + hits,
+                misses=F("misses") + misses,
+                evictions=F("evictions") + evictions,
+            )
+    except Exception as e:
+        # Las estadísticas nunca deben romper el flujo principal
+        print(f"[ERROR] No se pudieron registrar las estadísticas de la caché '{name}': {e}", file=sys.stderr)
+
+
+def eviction_due():
+    """
+    True en una fracción CACHE_EVICTION_SAMPLE_RATE de las escrituras: contar la tabla en cada inserción
+    costaría más cuanto más grande es la caché, y el límite se respeta igual con un pequeño margen.
+    """
+    return random.random() < settings.CACHE_EVICTION_SAMPLE_RATE
+
+
+def get_cache_stats():
+    return {
+        counter.name: {
+            "hits": counter.hits,
+            "misses": counter.misses,
+            "evictions": counter.evictions,
+            "hit_rate": round(counter.hit_rate, 4),
+        }
+        for counter in CacheCounter.objects.order_by("name")
+    }
@@ -0,0 +1,195 @@
+# export_store.py
+# Almacén de los .apkg generados: disco local (MEDIA_ROOT/generated_apkg) o S3 (ExportStorage), según EXPORT_STORAGE.
+# Con S3 las exportaciones funcionan en despliegues de varias instancias sin disco compartido.
+#
+# - Los nombres son relativos al almacén: user_<id>/<archivo>.apkg
+# - El archivo se escribe primero en una ruta local de preparación (.part) y se publica al terminar:
+#   os.replace() si el almacén es local, subida al bucket si es remoto.
+# - Cada archivo publicado queda en el índice ExportArtifact (tamaño, último uso). La retención se aplica
+#   sobre el índice: por edad, por cuota de bytes de cada usuario y por cuota global (LRU).
+
+import os
+import sys
+import tempfile
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from api_vocabulary.models import DeckBuild, DownloadHistory, ExportArtifact
+
+
+class ExportStore:
+    def __init__(self, storage=None):
+        self.storage = storage or _default_storage()
+
+    def name_for(self, user_id, filename):
+        return f"user_{user_id}/{filename}"
+
+    def local_path(self, name):
+        """Ruta en disco del artefacto si el almacén es local; None si es remoto."""
+        try:
+            return self.storage.path(name)
+        except NotImplementedError:
+            return None
+
+    def staging_path(self, name):
+        """Ruta local única donde se escribe el archivo antes de publicarlo (en el mismo disco si el almacén es local)."""
+        base = self.local_path(name) or os.path.join(tempfile.gettempdir(), "aiflashlang_exports", name)
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        return f"{base}.{uuid.uuid4().hex}.part"
+
+    def publish(self, staging_path, name):
+        """Mueve el archivo preparado a su nombre definitivo y devuelve su tamaño en bytes."""
+        size = os.path.getsize(staging_path)
+        local = self.local_path(name)
+        if local:
+            os.replace(staging_path, local)
+            return size
+        try:
+            with open(staging_path, "rb") as f:
+                self.storage.save(name, File(f))
+        finally:
+            os.remove(staging_path)
+        return size
+
+    def signed_url(self, name, expire, filename=None):
+        """URL firmada y temporal para descargar directamente del bucket; None si el almacén es local."""
+        if self.local_path(name) or not getattr(self.storage, "querystring_auth", False):
+            return None
+        parameters = {"ResponseContentDisposition": f'attachment; filename="{filename}"'} if filename else None
+        return self.storage.url(name, parameters=parameters, expire=expire)
+
+    def open(self, name):
+        return self.storage.open(name, "rb")
+
+    def exists(self, name):
+        return self.storage.exists(name)
+
+    def delete(self, name):
+        self.storage.delete(name)
+
+
+def _default_storage():
+    if settings.EXPORT_STORAGE == "s3":
+        from config.storages import ExportStorage
+
+        return ExportStorage()
+    return FileSystemStorage(location=os.path.join(settings.MEDIA_ROOT, "generated_apkg"))
+
+
+def get_export_store():
+    return ExportStore()
+
+
+def delete_artifacts(artifacts, store=None):
+    """
+    Borra los artefactos del almacén y del índice. El historial de descargas deja de apuntar a ellos
+    y los DeckBuild que los usaban como base vuelven a leer los audios del storage.
+    Devuelve (cantidad, bytes liberados).
+    """
+    store = store or get_export_store()
+    artifacts = list(artifacts)
+    for artifact in artifacts:
+        try:
+            store.delete(artifact.path)
+        except Exception as e:
+            print(f"[ERROR] No se pudo borrar el artefacto {artifact.path}: {str(e)}", file=sys.stderr)
+
+    paths = [artifact.path for artifact in artifacts]
+    DownloadHistory.objects.filter(artifact__in=artifacts).update(file_path="")
+    DeckBuild.objects.filter(archive_path__in=paths).update(archive_path="", media={})
+    ExportArtifact.objects.filter(pk__in=[artifact.pk for artifact in artifacts]).delete()
+    return len(artifacts), sum(artifact.size for artifact in artifacts)
+
+
+def _over_quota(queryset, max_bytes, exclude=None):
+    """Artefactos menos usados de `queryset` que hay que borrar para quedar dentro de max_bytes."""
+    total = queryset.aggregate(total=Sum("size"))["total"] or 0
+    victims = []
+    if total <= max_bytes:
+        return victims
+    candidates = queryset.exclude(pk=exclude.pk) if exclude else queryset
+    for artifact in candidates.order_by("last_used_at"):
+        if total <= max_bytes:
+            break
+        victims.append(artifact)
+        total -= artifact.size
+    return victims
+
+
+def enforce_user_quota(user, keep=None, store=None):
+    """Expulsa los .apkg menos usados del usuario si superan EXPORT_USER_QUOTA_BYTES (nunca `keep`)."""
+    victims = _over_quota(ExportArtifact.objects.filter(user=user), settings.EXPORT_USER_QUOTA_BYTES, exclude=keep)
+    if not victims:
+        return 0, 0
+    deleted, freed = delete_artifacts(victims, store)
+    print(f"[LOG] Cuota de exportaciones de {user.username}: {deleted} artefactos expulsados ({freed} bytes)", file=sys.stderr)
+    return deleted, freed
+
+
+def sweep_artifacts(now=None, store=None, dry_run=False):
+    """
+    Aplica la retención completa: expira por edad (EXPORT_MAX_AGE_DAYS; EXPORT_ONE_OFF_MAX_AGE_HOURS para los
+    .apkg no reutilizables), luego la cuota de cada usuario y al final la cuota global, siempre del menos usado
+    al más usado. Devuelve {motivo: [artefactos]}.
+    """
+    now = now or timezone.now()
+    store = store or get_export_store()
+    removed = {}
+
+    expired = ExportArtifact.objects.filter(
+        Q(last_used_at__lt=now - timedelta(days=settings.EXPORT_MAX_AGE_DAYS))
+        | Q(fingerprint="", created_at__lt=now - timedelta(hours=settings.EXPORT_ONE_OFF_MAX_AGE_HOURS))
+    )
+    removed["expired"] = list(expired)
+    excluded = {artifact.pk for artifact in removed["expired"]}
+
+    removed["user_quota"] = []
+    over_users = (
+        ExportArtifact.objects.exclude(pk__in=excluded)
+        .values("user").annotate(total=Sum("size")).filter(total__gt=settings.EXPORT_USER_QUOTA_BYTES)
+    )
+    for row in over_users:
+        queryset = ExportArtifact.objects.filter(user=row["user"]).exclude(pk__in=excluded)
+        removed["user_quota"].extend(_over_quota(queryset, settings.EXPORT_USER_QUOTA_BYTES))
+    excluded |= {artifact.pk for artifact in removed["user_quota"]}
+
+    removed["global_quota"] = _over_quota(
+        ExportArtifact.objects.exclude(pk__in=excluded), settings.EXPORT_GLOBAL_QUOTA_BYTES
+    )
+
+    if not dry_run:
+        for artifacts in removed.values():
+            if artifacts:
+                delete_artifacts(artifacts, store)
+    return removed
+
+
+def sweep_orphans(min_age_seconds=3600, store=None, dry_run=False):
+    """
+    Borra los archivos del almacén que no están en el índice (exportaciones anteriores al índice y .part
+    de procesos interrumpidos) con más de `min_age_seconds`. Recorre el almacén: solo para el comando de limpieza.
+    """
+    store = store or get_export_store()
+    indexed = set(ExportArtifact.objects.values_list("path", flat=True))
+    cutoff = timezone.now() - timedelta(seconds=min_age_seconds)
+    orphans = []
+    try:
+        folders, _ = store.storage.listdir("")
+    except FileNotFoundError:
+        return orphans
+    for folder in folders:
+        _, files = store.storage.listdir(folder)
+        for filename in files:
+            name = f"{folder}/{filename}"
+            if name in indexed or store.storage.get_modified_time(name) >= cutoff:
+                continue
+            orphans.append(name)
+            if not dry_run:
+                store.delete(name)
+    return orphans
@@ -1,11 +1,25 @@
+import functools
 import genanki
 import random
 
+FLASHLANG_MODEL_ID = 1607392319
+# Subir al cambiar las plantillas o cómo se renderizan las notas: invalida los .apkg cacheados
+TEMPLATE_VERSION = 1
+
+
 def get_flashlang_model(allow_duplicates=False):
-    model_id = 1607392319
     if allow_duplicates:
-        model_id = random.randrange(1 << 30, 1 << 31)
+        return _build_model(random.randrange(1 << 30, 1 << 31))
+    # El modelo estable se construye una sola vez por proceso (plantillas y campos requeridos incluidos)
+    return _stable_model()
+
+
+@functools.lru_cache(maxsize=1)
+def _stable_model():
+    return _build_model(FLASHLANG_MODEL_ID)
+
 
+def _build_model(model_id):
     return genanki.Model(
         model_id=model_id,
         name="AIFlashLang Model",
@@ -0,0 +1,145 @@
+# generation_pipeline.py
+# Pipeline de generación por palabra como un pequeño grafo de dependencias:
+#
+#   llm ──┬── translation
+#         └── sentence_audio
+#   word_audio (no depende de nada: arranca de inmediato)
+#
+# Las etapas de I/O puro (audio → TTS + storage) corren en un pool de hilos. Las que usan la base de datos
+# (OpenAI y Translate consultan sus cachés) corren en el hilo que llama, porque las conexiones de Django
+# son por hilo. Al final se hace una única escritura en la base de datos.
+
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+
+from .audio_utils import register_audio_asset, store_audio_blob
+
+
+class Stage:
+    def __init__(self, name, fn, deps=(), in_caller_thread=False):
+        self.name = name
+        self.fn = fn  # fn(results) → resultado de la etapa
+        self.deps = tuple(deps)
+        self.in_caller_thread = in_caller_thread
+
+
+def run_stages(stages, max_workers=None, on_stage_done=None):
+    """
+    Ejecuta las etapas respetando sus dependencias, en paralelo cuando es posible.
+    Devuelve (results, timings), con timings[name] = {"start", "end", "duration"} en segundos desde el inicio.
+    Si una etapa falla, no se lanzan las pendientes y se propaga su excepción.
+    """
+    max_workers = settings.GENERATION_PIPELINE_WORKERS if max_workers is None else max_workers
+    pending = {stage.name: stage for stage in stages}
+    results, timings = {}, {}
+    t0 = time.perf_counter()
+
+    def execute(stage):
+        start = time.perf_counter() - t0
+        value = stage.fn(results)
+        end = time.perf_counter() - t0
+        return value, {"start": round(start, 3), "end": round(end, 3), "duration": round(end - start, 3)}
+
+    def finish(stage, value, timing):
+        results[stage.name] = value
+        timings[stage.name] = timing
+        if on_stage_done:
+            on_stage_done(stage.name, len(results), len(stages))
+
+    # Sin workers: ejecución secuencial en orden de dependencias (útil en tests y para depurar)
+    if max_workers <= 0:
+        while pending:
+            stage = next(s for s in pending.values() if all(d in results for d in s.deps))
+            del pending[stage.name]
+            finish(stage, *execute(stage))
+        return results, timings
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="generation") as pool:
+        running = {}
+        try:
+            while pending or running:
+                ready = [s for s in pending.values() if all(d in results for d in s.deps)]
+                for stage in ready:
+                    if not stage.in_caller_thread:
+                        del pending[stage.name]
+                        running[pool.submit(execute, stage)] = stage
+
+                inline = next((s for s in ready if s.in_caller_thread), None)
+                if inline:
+                    del pending[inline.name]
+                    finish(inline, *execute(inline))
+                    continue
+
+                if not running:
+                    raise RuntimeError(f"Dependencias imposibles de resolver: {', '.join(pending)}")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    finish(stage, *future.result())
+        except Exception:
+            for future in running:
+                future.cancel()
+            raise
+
+    return results, timings
+
+
+def run_generation_pipeline(content, generate_llm, translate, llm_result=None, translated_sentence=None,
+                            on_stage_done=None):
+    """
+    Genera frase, traducción y audios de un SharedVocabularyWord / CustomWordContent y lo guarda con un solo save().
+    - generate_llm(): → (example_sentence, translation); se omite si llega llm_result (generación por lote).
+    - translate(sentence): → traducción de la frase; se omite si llega translated_sentence.
+    Devuelve los tiempos por etapa.
+    """
+    if not content.word.strip():
+        raise ValueError("La palabra está vacía. No se puede generar audio.")
+
+    # El idioma se resuelve aquí: si la FK no estaba cargada, leerla en un hilo del pool abriría otra conexión
+    language = content.source_lang
+    stages = [
+        Stage("llm", lambda r: tuple(llm_result) if llm_result else tuple(generate_llm()), in_caller_thread=True),
+        Stage("word_audio", lambda r: store_audio_blob(content.word, language)),
+        Stage(
+            "translation",
+            lambda r: translated_sentence if translated_sentence is not None else translate(r["llm"][0]),
+            deps=["llm"],
+            in_caller_thread=True,
+        ),
+        Stage("sentence_audio", lambda r: store_audio_blob(r["llm"][0], language), deps=["llm"]),
+    ]
+
+    t0 = time.perf_counter()
+    results, timings = run_stages(stages, on_stage_done=on_stage_done)
+
+    # 💾 Única escritura final
+    save_start = time.perf_counter() - t0
+    example_sentence, translation = results["llm"]
+    word_asset = register_audio_asset(results["word_audio"])
+    sentence_asset = register_audio_asset(results["sentence_audio"])
+
+    content.translation = translation
+    content.example_sentence = example_sentence
+    content.example_translation = results["translation"]
+    content.audio_word_asset = word_asset
+    content.audio_word.name = word_asset.file.name
+    content.audio_sentence_asset = sentence_asset
+    content.audio_sentence.name = sentence_asset.file.name
+    content.save()
+
+    save_end = time.perf_counter() - t0
+    timings["save"] = {"start": round(save_start, 3), "end": round(save_end, 3), "duration": round(save_end - save_start, 3)}
+    timings["total"] = round(save_end, 3)
+    timings["serial"] = round(sum(t["duration"] for name, t in timings.items() if isinstance(t, dict)), 3)
+
+    print(
+        f"[TIMING] '{content.word}': "
+        + " ".join(f"{name}={t['duration']}s" for name, t in timings.items() if isinstance(t, dict))
+        + f" | total={timings['total']}s (serie={timings['serial']}s)",
+        file=sys.stderr
+    )
+    return timings
@@ -0,0 +1,289 @@
+# jobs.py
+# Colas de trabajos respaldadas por PostgreSQL (sin broker): generación de palabras y exportaciones .apkg.
+# El request solo encola; los comandos `manage.py process_generation_jobs` / `process_export_jobs`
+# reclaman y ejecutan los trabajos.
+
+import os
+import socket
+import sys
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import DownloadHistory, ExportJob, GenerationJob, UserVocabularyWord
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue_generation_job(user, word, source_lang, target_lang, context="", deck=""):
+    """
+    Crea (o reutiliza) un trabajo pendiente para la palabra indicada.
+    Si el usuario ya tiene un trabajo activo para la misma combinación, se devuelve ese mismo.
+    """
+    active = GenerationJob.objects.filter(
+        user=user,
+        word=word,
+        source_lang=source_lang,
+        target_lang=target_lang,
+        context=context or "",
+        status__in=[GenerationJob.STATUS_PENDING, GenerationJob.STATUS_RUNNING],
+    ).first()
+    if active:
+        return active
+
+    return GenerationJob.objects.create(
+        user=user,
+        word=word,
+        source_lang=source_lang,
+        target_lang=target_lang,
+        context=context or "",
+        deck=deck,
+    )
+
+
+def claim_next_job(worker_id, model=GenerationJob):
+    """
+    Reclama el siguiente trabajo pendiente (GenerationJob o ExportJob). SKIP LOCKED permite varios workers
+    en paralelo sin que dos de ellos tomen la misma fila.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            model.objects.select_for_update(skip_locked=True)
+            .filter(status=model.STATUS_PENDING, run_after__lte=now)
+            .order_by("run_after", "id")
+            .first()
+        )
+        if not job:
+            return None
+
+        job.status = model.STATUS_RUNNING
+        job.stage = "starting"
+        job.attempts += 1
+        job.locked_by = worker_id
+        job.started_at = now
+        job.heartbeat_at = now
+        job.save(update_fields=["status", "stage", "attempts", "locked_by", "started_at", "heartbeat_at"])
+    return job
+
+
+def update_job_progress(job, stage, progress):
+    job.stage = stage
+    job.progress = progress
+    job.heartbeat_at = timezone.now()
+    job.save(update_fields=["stage", "progress", "heartbeat_at"])
+
+
+def requeue_stale_jobs(stale_after_seconds, model=GenerationJob):
+    """
+    Devuelve a la cola los trabajos cuyo worker dejó de dar señales (p. ej. murió el proceso).
+    Los que ya agotaron sus intentos se marcan como fallidos.
+    """
+    cutoff = timezone.now() - timedelta(seconds=stale_after_seconds)
+    max_attempts = _max_attempts(model)
+    stale = model.objects.filter(status=model.STATUS_RUNNING, heartbeat_at__lt=cutoff)
+
+    failed = stale.filter(attempts__gte=max_attempts).update(
+        status=model.STATUS_FAILED,
+        stage="failed",
+        error="El worker dejó de responder.",
+        finished_at=timezone.now(),
+    )
+    requeued = stale.filter(attempts__lt=max_attempts).update(
+        status=model.STATUS_PENDING,
+        stage="queued",
+        locked_by="",
+    )
+    return requeued, failed
+
+
+def _max_attempts(model):
+    if model is ExportJob:
+        return settings.EXPORT_JOB_MAX_ATTEMPTS
+    return settings.GENERATION_JOB_MAX_ATTEMPTS
+
+
+def run_generation_job(job):
+    """
+    Ejecuta un trabajo ya reclamado: genera el contenido (compartido o personalizado)
+    y crea el UserVocabularyWord final.
+    """
+    from .views import UserVocabularyWordViewSet  # Evita import circular (views encola trabajos)
+
+    creator = UserVocabularyWordViewSet()
+    # Cada etapa terminada del pipeline avanza el progreso entre 10% y 90%
+    creator.on_stage_done = lambda stage, done, total: update_job_progress(job, stage, 10 + 80 * done // total)
+
+    try:
+        update_job_progress(job, "generating", 10)
+        content = creator.resolve_word_content(
+            job.user, job.word, job.source_lang, job.target_lang, job.context
+        )
+
+        update_job_progress(job, "saving", 90)
+        user_word = UserVocabularyWord.objects.create(user=job.user, deck=job.deck, **content)
+
+        job.user_word = user_word
+        job.stage_timings = getattr(creator, "last_stage_timings", None) or {}
+        job.status = GenerationJob.STATUS_DONE
+        job.stage = "done"
+        job.progress = 100
+        job.error = ""
+        job.finished_at = timezone.now()
+        job.save(update_fields=["user_word", "stage_timings", "status", "stage", "progress", "error", "finished_at"])
+
+    except Exception as e:
+        print(f"[ERROR] Trabajo de generación {job.id} falló (intento {job.attempts}): {e}", file=sys.stderr)
+        job.error = _error_message(e)
+
+        # Los errores de validación (duplicados, etc.) no se arreglan reintentando
+        retryable = not isinstance(e, serializers.ValidationError)
+        if retryable and job.attempts < settings.GENERATION_JOB_MAX_ATTEMPTS:
+            job.status = GenerationJob.STATUS_PENDING
+            job.stage = "queued"
+            job.locked_by = ""
+            job.run_after = timezone.now() + timedelta(seconds=30 * job.attempts)
+        else:
+            job.status = GenerationJob.STATUS_FAILED
+            job.stage = "failed"
+            job.finished_at = timezone.now()
+        job.save(update_fields=["error", "status", "stage", "locked_by", "run_after", "finished_at"])
+
+    return job
+
+
+def enqueue_export_job(user, deck_name="", ids=None, allow_duplicates=False, since_last_download=False):
+    """
+    Crea (o reutiliza) una exportación pendiente. Si el usuario ya tiene una activa con los mismos
+    parámetros, se devuelve esa misma.
+    """
+    ids = sorted(ids) if ids else None
+    active = ExportJob.objects.filter(
+        user=user,
+        deck_name=deck_name,
+        allow_duplicates=allow_duplicates,
+        since_last_download=since_last_download,
+        status__in=[ExportJob.STATUS_PENDING, ExportJob.STATUS_RUNNING],
+    )
+    # En un JSONField, word_ids=None compararía con el JSON null; sin IDs la columna es NULL
+    active = active.filter(word_ids=ids) if ids else active.filter(word_ids__isnull=True)
+    active = active.first()
+    if active:
+        return active
+
+    return ExportJob.objects.create(
+        user=user, deck_name=deck_name, word_ids=ids, allow_duplicates=allow_duplicates,
+        since_last_download=since_last_download
+    )
+
+
+class ExportProgress:
+    """
+    Recibe el avance de la exportación ("notes"/"media", hechos, total) y lo guarda en el trabajo.
+    Guarda como mucho una vez por segundo (y siempre al completar una etapa); cada guardado es un heartbeat.
+    """
+    # Renderizar notas: 5-20%; reunir audios y armar el zip: 20-95%
+    RANGES = {"notes": (5, 20), "media": (20, 95)}
+
+    def __init__(self, job, min_interval=1.0):
+        self.job = job
+        self.min_interval = min_interval
+        self.last_saved = 0.0
+
+    def __call__(self, stage, done, total):
+        start, end = self.RANGES[stage]
+        if stage == "notes":
+            self.job.notes_rendered, self.job.notes_total = done, total
+        else:
+            self.job.media_fetched, self.job.media_total = done, total
+        self.job.stage = stage
+        self.job.progress = start + (end - start) * done // max(total, 1)
+
+        now = time.monotonic()
+        if done < total and now - self.last_saved < self.min_interval:
+            return
+        self.last_saved = now
+        self.job.heartbeat_at = timezone.now()
+        self.job.save(update_fields=[
+            "stage", "progress", "notes_rendered", "notes_total", "media_fetched", "media_total", "heartbeat_at"
+        ])
+
+
+def run_export_job(job):
+    """
+    Ejecuta una exportación ya reclamada: construye el .apkg y lo publica en el almacén de exportaciones.
+    El artefacto queda en job.artifact y la descarga en job.history, pendiente hasta que el usuario la baje.
+    """
+    from .anki_exporter import prepare_apkg_export  # anki_exporter importa modelos y servicios pesados
+
+    try:
+        update_job_progress(job, "notes", 5)
+        export = prepare_apkg_export(
+            job.user, deck_name=job.deck_name, ids=job.word_ids,
+            allow_duplicates=job.allow_duplicates, since_last_download=job.since_last_download,
+            on_progress=ExportProgress(job)
+        )
+        failed = []
+        if not export.cached:
+            # Siempre se guarda: el cliente lo descarga después desde el artefacto
+            for _ in export.stream(failed=failed, one_off=True):
+                pass
+
+        job.artifact = export.artifact
+        job.history = export.record_download(delivered=False)
+        job.failed_media = sorted(failed, key=lambda item: item["file"])
+        job.status = ExportJob.STATUS_DONE
+        job.stage = "done"
+        job.progress = 100
+        job.error = ""
+        job.finished_at = timezone.now()
+        job.save(update_fields=[
+            "artifact", "history", "failed_media", "status", "stage", "progress", "error", "finished_at"
+        ])
+
+    except Exception as e:
+        print(f"[ERROR] Exportación {job.id} falló (intento {job.attempts}): {e}", file=sys.stderr)
+        job.error = _error_message(e)
+
+        # Un mazo sin palabras no se arregla reintentando
+        retryable = not isinstance(e, ValueError)
+        if retryable and job.attempts < settings.EXPORT_JOB_MAX_ATTEMPTS:
+            job.status = ExportJob.STATUS_PENDING
+            job.stage = "queued"
+            job.locked_by = ""
+            job.run_after = timezone.now() + timedelta(seconds=30 * job.attempts)
+        else:
+            job.status = ExportJob.STATUS_FAILED
+            job.stage = "failed"
+            job.finished_at = timezone.now()
+        job.save(update_fields=["error", "status", "stage", "locked_by", "run_after", "finished_at"])
+
+    return job
+
+
+def confirm_export_download(job):
+    """
+    El usuario descargó el artefacto del trabajo: su descarga pasa a contar para las exportaciones delta
+    (una sola vez, con la fecha de la primera entrega).
+    """
+    if job.history_id:
+        DownloadHistory.objects.filter(pk=job.history_id, delivered=False).update(
+            delivered=True, created_at=timezone.now()
+        )
+
+
+def _error_message(exc):
+    if isinstance(exc, serializers.ValidationError):
+        detail = exc.detail
+        if isinstance(detail, dict):
+            return " ".join(str(v[0] if isinstance(v, list) else v) for v in detail.values())
+        if isinstance(detail, list):
+            return " ".join(str(v) for v in detail)
+        return str(detail)
+    return str(exc)
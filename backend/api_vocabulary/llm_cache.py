@@ -0,0 +1,91 @@
+# llm_cache.py
+# Caché de completions de OpenAI en la tabla LLMResponseCache, con TTL y expulsión LRU.
+# Si el mismo prompt (mismo modelo y parámetros) ya se respondió, no se vuelve a llamar al LLM.
+
+import hashlib
+import json
+import sys
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .cache_stats import eviction_due, record_cache_event
+from .models import LLMResponseCache
+from .providers import get_provider
+
+CACHE_NAME = "llm"
+
+
+def _hash(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def cached_chat_completion(get_client, model, messages, parse, bypass_cache=False, **params):
+    """
+    Devuelve parse(contenido) para la completion de `messages`.
+    - get_client: callable que devuelve el cliente de OpenAI (solo se llama si hay que ir a la red).
+    - parse: convierte el texto de la respuesta en un valor serializable a JSON; si lanza una
+      excepción la respuesta no se guarda en caché.
+    - bypass_cache: fuerza la regeneración (no lee la caché, pero guarda el nuevo resultado).
+    """
+    prompt_hash = _hash(messages)
+    key = _hash({"model": model, "prompt": prompt_hash, "params": params})
+    enabled = settings.LLM_CACHE_ENABLED
+
+    if enabled and not bypass_cache:
+        entry = LLMResponseCache.objects.filter(key=key, expires_at__gt=timezone.now()).first()
+        if entry:
+            print(f"[LOG] Respuesta de OpenAI servida desde caché ({prompt_hash[:12]})", file=sys.stderr)
+            LLMResponseCache.objects.filter(pk=entry.pk).update(hits=F("hits") + 1, last_used_at=timezone.now())
+            record_cache_event(CACHE_NAME, hits=1)
+            return entry.parsed
+        record_cache_event(CACHE_NAME, misses=1)
+
+    response = get_provider("openai").call(
+        lambda: get_client().chat.completions.create(model=model, messages=messages, **params)
+    )
+    content = response.choices[0].message.content.strip()
+    parsed = parse(content)
+
+    if enabled:
+        now = timezone.now()
+        LLMResponseCache.objects.update_or_create(
+            key=key,
+            defaults={
+                "model": model,
+                "prompt_hash": prompt_hash,
+                "raw_response": content,
+                "parsed": parsed,
+                "expires_at": now + timedelta(seconds=settings.LLM_CACHE_TTL_SECONDS),
+                "last_used_at": now,
+            },
+        )
+        if eviction_due():
+            evict_llm_cache()
+
+    return parsed
+
+
+def evict_llm_cache(max_entries=None):
+    """
+    Borra las entradas expiradas y, si la tabla sigue por encima del máximo,
+    las usadas hace más tiempo hasta quedar en el 90% del límite.
+    """
+    max_entries = max_entries or settings.LLM_CACHE_MAX_ENTRIES
+    now = timezone.now()
+    total = LLMResponseCache.objects.count()
+    if total <= max_entries:
+        return 0
+
+    deleted, _ = LLMResponseCache.objects.filter(expires_at__lte=now).delete()
+    remaining = total - deleted
+    if remaining > max_entries:
+        excess = remaining - int(max_entries * 0.9)
+        oldest = list(LLMResponseCache.objects.order_by("last_used_at", "id").values_list("id", flat=True)[:excess])
+        lru_deleted, _ = LLMResponseCache.objects.filter(id__in=oldest).delete()
+        deleted += lru_deleted
+
+    record_cache_event(CACHE_NAME, evictions=deleted)
+    return deleted
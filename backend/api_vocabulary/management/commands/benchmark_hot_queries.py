@@ -0,0 +1,236 @@
+import re
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models.signals import post_delete
+
+from api_vocabulary.models import (
+    CustomWordContent, Deck, DownloadHistory, Language, SharedVocabularyWord, UserVocabularyWord,
+    context_digest, normalize_deck_key
+)
+from api_vocabulary.search import normalize_search_key
+from api_vocabulary.signals import count_deleted_word
+from users.models import CustomUser
+
+BENCH_PREFIX = "bench_hot_"
+BATCH_SIZE = 10000
+DECKS_PER_USER = 10
+
+# Índices de la migración 0023 (download_user_deck_idx pasó a deck_key en 0025): con --compare se miden las
+# consultas con y sin ellos
+NEW_INDEXES = [
+    "user_word_user_deckname_idx",
+    "user_word_user_created_idx",
+    "download_user_created_idx",
+    "download_user_deck_idx",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Siembra un volumen grande de datos de prueba (por defecto 1000 usuarios x 1000 palabras = 1M filas, más un "
+        "usuario con 100k palabras) y mide las consultas de los endpoints más usados para un usuario típico y para el "
+        "grande. Con --compare también las mide sin los índices de la migración 0023 (se borran dentro de una "
+        "transacción que se revierte: bloquea las tablas, solo para entornos de prueba)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--words-per-user", type=int, default=1000)
+        parser.add_argument("--large-user-words", type=int, default=100000, help="Palabras del usuario grande.")
+        parser.add_argument("--custom-per-user", type=int, default=50, help="CustomWordContent con contexto por usuario.")
+        parser.add_argument("--downloads-per-user", type=int, default=200, help="Filas de DownloadHistory por usuario.")
+        parser.add_argument("--repeat", type=int, default=7, help="Ejecuciones por consulta (se informa la mediana).")
+        parser.add_argument("--skip-seed", action="store_true", help="Usa los datos sembrados en una ejecución anterior.")
+        parser.add_argument("--compare", action="store_true", help="Mide también sin los índices nuevos (antes/después).")
+        parser.add_argument("--cleanup", action="store_true", help="Borra los datos sembrados y termina.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("El benchmark necesita PostgreSQL (usa EXPLAIN y DDL transaccional).")
+
+        if options["cleanup"]:
+            # Sin el receptor de borrado: los mazos se borran con sus usuarios y el DELETE puede ir en bloque
+            post_delete.disconnect(count_deleted_word, sender=UserVocabularyWord)
+            try:
+                deleted, _ = CustomUser.objects.filter(username__startswith=BENCH_PREFIX).delete()
+            finally:
+                post_delete.connect(count_deleted_word, sender=UserVocabularyWord)
+            deleted += CustomWordContent.objects.filter(word__startswith=BENCH_PREFIX).delete()[0]
+            deleted += SharedVocabularyWord.objects.filter(word__startswith=BENCH_PREFIX).delete()[0]
+            self.stdout.write(f"Datos de benchmark borrados ({deleted} filas).")
+            return
+
+        if not options["skip_seed"]:
+            self.seed(options)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        users = CustomUser.objects.filter(username__startswith=BENCH_PREFIX)
+        typical = users.exclude(username=f"{BENCH_PREFIX}large").order_by("id").last()
+        large = users.filter(username=f"{BENCH_PREFIX}large").first()
+        if not typical:
+            raise CommandError("No hay datos sembrados: ejecuta el comando sin --skip-seed.")
+        queries = self.hot_queries(typical, "típico")
+        if large:
+            queries.update(self.hot_queries(large, "grande"))
+
+        after = {name: self.measure(query, options["repeat"]) for name, (query, _) in queries.items()}
+        before = self.measure_without_new_indexes(queries, options["repeat"]) if options["compare"] else {}
+
+        self.stdout.write(f"{'consulta':<40} {'antes':>10} {'después':>10}  plan (después)")
+        for name, (elapsed, plan) in after.items():
+            previous = f"{before[name][0]:8.2f}ms" if name in before else f"{'-':>10}"
+            self.stdout.write(f"{name:<40} {previous} {elapsed:8.2f}ms  {plan}")
+
+    # ---------- Siembra ----------
+
+    def seed(self, options):
+        english, _ = Language.objects.get_or_create(code="en", defaults={"name": "English"})
+        spanish, _ = Language.objects.get_or_create(code="es", defaults={"name": "Spanish"})
+        words_per_user = options["words_per_user"]
+        started = time.monotonic()
+
+        shared_total = max(words_per_user, options["large_user_words"])
+        existing = set(
+            SharedVocabularyWord.objects.filter(word__startswith=BENCH_PREFIX).values_list("word", flat=True)
+        )
+        shared = [
+            SharedVocabularyWord(
+                word=word, source_lang=english, target_lang=spanish, translation=f"(n) {word}",
+                example_sentence=f"This is {word}.", example_translation=f"Esto es {word}.",
+                search_key=normalize_search_key(word, f"(n) {word}")
+            )
+            for word in (f"{BENCH_PREFIX}{i}" for i in range(shared_total)) if word not in existing
+        ]
+        SharedVocabularyWord.objects.bulk_create(shared, batch_size=BATCH_SIZE)
+        shared_ids = list(
+            SharedVocabularyWord.objects.filter(word__startswith=BENCH_PREFIX).order_by("id").values_list("id", flat=True)
+        )
+
+        seeded = set(CustomUser.objects.filter(username__startswith=BENCH_PREFIX).values_list("username", flat=True))
+        for u in range(options["users"]):
+            if f"{BENCH_PREFIX}{u}" not in seeded:
+                self.seed_user(f"{BENCH_PREFIX}{u}", shared_ids[:words_per_user], options, english, spanish)
+            if (u + 1) % 50 == 0:
+                print(f"[LOG] Benchmark: {u + 1}/{options['users']} usuarios sembrados", file=sys.stderr)
+        if options["large_user_words"] and f"{BENCH_PREFIX}large" not in seeded:
+            self.seed_user(f"{BENCH_PREFIX}large", shared_ids[:options["large_user_words"]], options, english, spanish)
+
+        self.stdout.write(f"Siembra lista en {time.monotonic() - started:.1f}s")
+
+    def seed_user(self, username, shared_ids, options, english, spanish):
+        user = CustomUser.objects.create_user(
+            username=username, email=f"{username}@example.invalid", password=None, is_active=True
+        )
+        decks = Deck.objects.bulk_create([
+            Deck(user=user, name=f"Deck {d}", key=normalize_deck_key(f"Deck {d}"), word_count=0)
+            for d in range(DECKS_PER_USER)
+        ])
+        words = [
+            UserVocabularyWord(
+                user=user, shared_word_id=shared_id, deck=decks[i % DECKS_PER_USER].name,
+                deck_ref=decks[i % DECKS_PER_USER]
+            )
+            for i, shared_id in enumerate(shared_ids)
+        ]
+        for c in range(options["custom_per_user"]):
+            context = f"{username} context {c} " + "lorem ipsum " * 40
+            custom = CustomWordContent(
+                word=f"{BENCH_PREFIX}custom{c}", source_lang=english, target_lang=spanish, context=context,
+                context_hash=context_digest(context), translation="(n) x",
+                search_key=normalize_search_key(f"{BENCH_PREFIX}custom{c}", "(n) x")
+            )
+            words.append(UserVocabularyWord(user=user, custom_content=custom, deck=decks[0].name, deck_ref=decks[0]))
+        CustomWordContent.objects.bulk_create([w.custom_content for w in words if w.custom_content], batch_size=BATCH_SIZE)
+        UserVocabularyWord.objects.bulk_create(words, batch_size=BATCH_SIZE)
+        for deck in decks:
+            deck.word_count = sum(1 for w in words if w.deck_ref is deck)
+        Deck.objects.bulk_update(decks, ["word_count"])
+
+        DownloadHistory.objects.bulk_create([
+            DownloadHistory(
+                user=user, deck_name=decks[d % DECKS_PER_USER].name, deck_key=decks[d % DECKS_PER_USER].key,
+                word_ids="", file_path=""
+            )
+            for d in range(options["downloads_per_user"])
+        ], batch_size=BATCH_SIZE)
+
+    # ---------- Medición ----------
+
+    def hot_queries(self, user, label):
+        """{nombre: (consulta actual, variante previa a 0023 o None)}; cada consulta es un queryset sin evaluar."""
+        words = UserVocabularyWord.objects.filter(user=user)
+        deck = Deck.objects.filter(user=user).order_by("id").first()
+        ids = list(words.order_by("?").values_list("id", flat=True)[:200])
+        custom = CustomWordContent.objects.filter(uservocabularyword__user=user).order_by("id").first()
+        queries = {
+            "vocabulary: primera página": (words.order_by("-created_at", "-id")[:100], None),
+            "vocabulary: ?deck=": (words.filter(deck_ref__key=deck.key), None),
+            "export: por mazo": (
+                words.filter(deck_ref__key=deck.key).order_by("id"), words.filter(deck=deck.name).order_by("id")
+            ),
+            "export: por ids": (words.filter(id__in=ids), None),
+            "historial: última del mazo": (
+                DownloadHistory.objects.filter(user=user, deck_key=deck.key).order_by("-created_at")[:1],
+                DownloadHistory.objects.filter(user=user, deck_name=deck.name).order_by("-created_at")[:1],
+            ),
+            "historial: del usuario": (DownloadHistory.objects.filter(user=user).order_by("-created_at")[:50], None),
+            "custom: por contexto": (
+                CustomWordContent.objects.filter(
+                    word=custom.word, source_lang=custom.source_lang_id, target_lang=custom.target_lang_id,
+                    context_hash=custom.context_hash
+                ),
+                CustomWordContent.objects.filter(
+                    word=custom.word, source_lang=custom.source_lang_id, target_lang=custom.target_lang_id,
+                    context=custom.context
+                ),
+            ),
+            "mazos": (Deck.objects.filter(user=user, word_count__gt=0).order_by("name"), None),
+        }
+        return {f"[{label}] {name}": query for name, query in queries.items()}
+
+    def measure(self, queryset, repeat):
+        """(mediana en ms, recorridos del plan) de evaluar `queryset` `repeat` veces."""
+        scans = re.findall(r"((?:Parallel )?(?:Seq|Index|Index Only|Bitmap Heap|Bitmap Index) Scan[^(]*)", queryset.explain())
+        plan = ", ".join(dict.fromkeys(scan.strip() for scan in scans))
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), plan
+
+    def measure_without_new_indexes(self, queries, repeat):
+        results = {}
+        with self.rolled_back():
+            with connection.cursor() as cursor:
+                # Las FK son diferidas: se comprueban ya para que el ALTER TABLE no encuentre eventos pendientes
+                cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+                for index in NEW_INDEXES:
+                    cursor.execute(f"DROP INDEX IF EXISTS {index}")
+                # Antes de 0023 la unicidad de CustomWordContent indexaba el contexto completo
+                cursor.execute("ALTER TABLE api_vocabulary_customwordcontent DROP CONSTRAINT IF EXISTS unique_custom_content_context")
+                cursor.execute(
+                    "CREATE INDEX bench_custom_context_idx ON api_vocabulary_customwordcontent "
+                    "(word, source_lang_id, target_lang_id, context)"
+                )
+            for name, (query, previous) in queries.items():
+                results[name] = self.measure(previous if previous is not None else query, repeat)
+        return results
+
+    @contextmanager
+    def rolled_back(self):
+        class Rollback(Exception):
+            pass
+
+        try:
+            with transaction.atomic():
+                yield
+                raise Rollback
+        except Rollback:
+            pass
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from api_vocabulary.cache_stats import get_cache_stats
+from api_vocabulary.llm_cache import evict_llm_cache
+from api_vocabulary.media_cache import get_media_cache
+from api_vocabulary.models import CacheCounter, LLMResponseCache, TranslationCache
+from api_vocabulary.translation_service import evict_translation_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Muestra los aciertos/fallos de las cachés y el tamaño de las tablas de caché. Con --evict aplica antes "
+        "el límite de entradas de las cachés en tabla (las escrituras solo lo comprueban por muestreo)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Reinicia los contadores después de mostrarlos.")
+        parser.add_argument("--evict", action="store_true", help="Expulsa las entradas que superan el límite.")
+
+    def handle(self, *args, **options):
+        if options["evict"]:
+            self.stdout.write(f"TranslationCache: {evict_translation_cache()} entradas expulsadas")
+            self.stdout.write(f"LLMResponseCache: {evict_llm_cache()} entradas expulsadas")
+
+        stats = get_cache_stats()
+        if not stats:
+            self.stdout.write("Sin estadísticas registradas todavía.")
+
+        for name, counter in stats.items():
+            self.stdout.write(
+                f"{name}: {counter['hits']} hits, {counter['misses']} misses, "
+                f"{counter['evictions']} evictions, hit rate {counter['hit_rate']:.1%}"
+            )
+
+        self.stdout.write(f"TranslationCache: {TranslationCache.objects.count()} entradas")
+        self.stdout.write(f"LLMResponseCache: {LLMResponseCache.objects.count()} entradas")
+        media_cache = get_media_cache()
+        if media_cache:
+            self.stdout.write(f"Caché de media: {media_cache.size()} / {media_cache.max_bytes} bytes")
+
+        if options["reset"]:
+            CacheCounter.objects.update(hits=0, misses=0, evictions=0)
+            self.stdout.write("Contadores reiniciados.")
@@ -0,0 +1,61 @@
+import signal
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api_vocabulary.jobs import claim_next_job, default_worker_id, requeue_stale_jobs, run_export_job
+from api_vocabulary.models import ExportJob
+
+
+class Command(BaseCommand):
+    help = "Procesa las exportaciones .apkg encoladas en la base de datos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Procesa los trabajos pendientes y termina.")
+        parser.add_argument("--max-jobs", type=int, default=0, help="Termina después de N trabajos (0 = sin límite).")
+        parser.add_argument("--sleep", type=float, default=1.0, help="Segundos de espera cuando la cola está vacía.")
+        parser.add_argument(
+            "--stale-after", type=int, default=300,
+            help="Segundos sin heartbeat tras los cuales una exportación en proceso se vuelve a encolar."
+        )
+
+    def handle(self, *args, **options):
+        worker_id = default_worker_id()
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        print(f"[WORKER] {worker_id} procesando exportaciones", file=sys.stderr)
+        processed = 0
+        last_recovery = 0.0
+
+        while not self.stopping:
+            close_old_connections()
+
+            if time.monotonic() - last_recovery > 60:
+                requeued, failed = requeue_stale_jobs(options["stale_after"], model=ExportJob)
+                if requeued or failed:
+                    print(f"[WORKER] Exportaciones recuperadas: {requeued}, marcadas como fallidas: {failed}", file=sys.stderr)
+                last_recovery = time.monotonic()
+
+            job = claim_next_job(worker_id, model=ExportJob)
+            if not job:
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+                continue
+
+            job = run_export_job(job)
+            processed += 1
+            print(f"[WORKER] Exportación {job.id} ({job.deck_name}) → {job.status}", file=sys.stderr)
+
+            if options["max_jobs"] and processed >= options["max_jobs"]:
+                break
+
+        self.stdout.write(f"Exportaciones procesadas: {processed}")
+
+    def _stop(self, signum, frame):
+        print("[WORKER] Señal recibida, terminando después de la exportación actual...", file=sys.stderr)
+        self.stopping = True
@@ -0,0 +1,60 @@
+import signal
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api_vocabulary.jobs import claim_next_job, default_worker_id, requeue_stale_jobs, run_generation_job
+
+
+class Command(BaseCommand):
+    help = "Procesa los trabajos de generación de palabras encolados en la base de datos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Procesa los trabajos pendientes y termina.")
+        parser.add_argument("--max-jobs", type=int, default=0, help="Termina después de N trabajos (0 = sin límite).")
+        parser.add_argument("--sleep", type=float, default=1.0, help="Segundos de espera cuando la cola está vacía.")
+        parser.add_argument(
+            "--stale-after", type=int, default=300,
+            help="Segundos sin heartbeat tras los cuales un trabajo en proceso se vuelve a encolar."
+        )
+
+    def handle(self, *args, **options):
+        worker_id = default_worker_id()
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        print(f"[WORKER] {worker_id} procesando trabajos de generación", file=sys.stderr)
+        processed = 0
+        last_recovery = 0.0
+
+        while not self.stopping:
+            close_old_connections()
+
+            if time.monotonic() - last_recovery > 60:
+                requeued, failed = requeue_stale_jobs(options["stale_after"])
+                if requeued or failed:
+                    print(f"[WORKER] Trabajos recuperados: {requeued}, marcados como fallidos: {failed}", file=sys.stderr)
+                last_recovery = time.monotonic()
+
+            job = claim_next_job(worker_id)
+            if not job:
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+                continue
+
+            job = run_generation_job(job)
+            processed += 1
+            print(f"[WORKER] Trabajo {job.id} ({job.word}) → {job.status}", file=sys.stderr)
+
+            if options["max_jobs"] and processed >= options["max_jobs"]:
+                break
+
+        self.stdout.write(f"Trabajos procesados: {processed}")
+
+    def _stop(self, signum, frame):
+        print("[WORKER] Señal recibida, terminando después del trabajo actual...", file=sys.stderr)
+        self.stopping = True
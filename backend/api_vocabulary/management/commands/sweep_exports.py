@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from api_vocabulary.export_store import get_export_store, sweep_artifacts, sweep_orphans
+
+
+class Command(BaseCommand):
+    help = "Aplica la retención de los .apkg generados: expiración por edad y cuotas por usuario y global (LRU)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Muestra qué se borraría sin borrar nada.")
+        parser.add_argument(
+            "--orphans", action="store_true",
+            help="Recorre el almacén y borra también los archivos que no están en el índice."
+        )
+        parser.add_argument(
+            "--orphan-min-age", type=int, default=3600,
+            help="Segundos de antigüedad mínima de un archivo huérfano (los más nuevos pueden estar en preparación)."
+        )
+
+    def handle(self, *args, **options):
+        store = get_export_store()
+        removed = sweep_artifacts(store=store, dry_run=options["dry_run"])
+        for reason, artifacts in removed.items():
+            freed = sum(artifact.size for artifact in artifacts)
+            self.stdout.write(f"{reason}: {len(artifacts)} artefactos ({freed} bytes)")
+
+        if options["orphans"]:
+            orphans = sweep_orphans(options["orphan_min_age"], store=store, dry_run=options["dry_run"])
+            self.stdout.write(f"huérfanos: {len(orphans)} archivos")
+
+        if options["dry_run"]:
+            self.stdout.write("Simulación: no se borró nada.")
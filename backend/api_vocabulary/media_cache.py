@@ -0,0 +1,136 @@
+# media_cache.py
+# Caché en disco de los audios remotos usados por la exportación .apkg, compartida entre exportaciones
+# y entre workers de gunicorn. La clave es el nombre en el storage más el hash de contenido del audio
+# (los AudioAsset lo llevan en su propio nombre), así que un archivo cacheado nunca queda obsoleto.
+#
+# - Escrituras atómicas: se escribe en tmp/ y se mueve con os.replace() (mismo sistema de archivos).
+# - LRU: cada acierto actualiza el mtime; al superar el presupuesto de bytes se borran los menos usados
+#   hasta quedar en el 90%. Solo un proceso expulsa a la vez (flock sobre .lock).
+# - Se conserva el nombre base del archivo: es el que usan las etiquetas [sound:...] de las notas.
+
+import fcntl
+import hashlib
+import os
+import re
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+
+CACHE_NAME = "media"
+
+# audio/assets/ab/<sha256>.mp3 → el hash de contenido es parte del nombre
+ASSET_NAME_RE = re.compile(r"(?:^|/)assets/[0-9a-f]{2}/(?P<hash>[0-9a-f]{64})\.\w+$")
+
+
+def content_hash_for(name):
+    match = ASSET_NAME_RE.search(name)
+    return match.group("hash") if match else ""
+
+
+class MediaCache:
+    def __init__(self, root=None, max_bytes=None):
+        self.root = str(root or settings.MEDIA_CACHE_DIR)
+        self.max_bytes = max_bytes or settings.MEDIA_CACHE_MAX_BYTES
+        self.objects_dir = os.path.join(self.root, "objects")
+        self.tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def path_for(self, name):
+        key = hashlib.sha256(f"{name}\x1f{content_hash_for(name)}".encode("utf-8")).hexdigest()
+        return os.path.join(self.objects_dir, key[:2], key, os.path.basename(name))
+
+    def get(self, name):
+        """Ruta del archivo cacheado (y lo marca como recién usado), o None si no está."""
+        path = self.path_for(name)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, name, stream, deadline=None):
+        """
+        Guarda el contenido de `stream` (read(n) + close()) y devuelve la ruta final.
+        Si se supera `deadline` (time.monotonic()) se descarta la escritura.
+        """
+        path = self.path_for(name)
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while True:
+                    chunk = stream.read(64 * 1024)
+                    if not chunk:
+                        break
+                    if deadline and time.monotonic() > deadline:
+                        raise TimeoutError(f"se superaron {settings.APKG_MEDIA_FILE_TIMEOUT}s")
+                    f.write(chunk)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Si otro worker guardó el mismo archivo a la vez, el contenido es idéntico
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        finally:
+            stream.close()
+        return path
+
+    def _entries(self):
+        for dirpath, _, filenames in os.walk(self.objects_dir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """
+        Borra los archivos usados hace más tiempo hasta quedar en el 90% del presupuesto.
+        Los usados en los últimos MEDIA_CACHE_MIN_AGE segundos no se tocan (pueden estar en un mazo en curso).
+        Devuelve el número de archivos borrados (0 si otro proceso ya está expulsando).
+        """
+        lock_path = os.path.join(self.root, ".lock")
+        with open(lock_path, "w") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return 0
+            try:
+                entries = sorted(self._entries(), key=lambda entry: entry[2])
+                total = sum(size for _, size, _ in entries)
+                if total <= self.max_bytes:
+                    return 0
+
+                target = int(self.max_bytes * 0.9)
+                protected_since = time.time() - settings.MEDIA_CACHE_MIN_AGE
+                deleted = 0
+                for path, size, mtime in entries:
+                    if total <= target or mtime >= protected_since:
+                        break
+                    try:
+                        os.remove(path)
+                        os.rmdir(os.path.dirname(path))
+                    except OSError:
+                        pass
+                    total -= size
+                    deleted += 1
+
+                print(f"[LOG] Caché de media: {deleted} archivos expulsados ({total} bytes)", file=sys.stderr)
+                return deleted
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def get_media_cache():
+    """Caché configurada, o None si está desactivada."""
+    if not settings.MEDIA_CACHE_ENABLED:
+        return None
+    return MediaCache()
@@ -0,0 +1,67 @@
+# media_resolver.py
+# Resuelve los audios de la exportación .apkg directamente desde el backend de almacenamiento:
+# - Disco local (FileSystemStorage): se usa la ruta del archivo tal cual, sin copiarlo.
+# - Remoto (S3): se lee con la API del storage (get_object por streaming), nunca a través del CDN.
+
+import os
+import time
+
+from django.conf import settings
+
+CHUNK_SIZE = 64 * 1024
+
+
+def local_path(filefield):
+    """Ruta en disco del archivo si el storage es local y el archivo existe; None en otro caso."""
+    if not filefield or not filefield.name:
+        return None
+    try:
+        path = filefield.storage.path(filefield.name)
+    except NotImplementedError:
+        return None  # Storage remoto: no tiene rutas locales
+    return path if os.path.exists(path) else None
+
+
+def is_local(filefield):
+    try:
+        filefield.storage.path(filefield.name)
+        return True
+    except NotImplementedError:
+        return False
+
+
+def open_remote(filefield):
+    """Abre el archivo remoto como flujo de lectura (read(n) + close())."""
+    storage = filefield.storage
+    if hasattr(storage, "bucket_name") and hasattr(storage, "connection"):
+        # S3: get_object devuelve el cuerpo por streaming; storage.open() lo descargaría entero a memoria
+        from storages.utils import clean_name
+
+        key = storage._normalize_name(clean_name(filefield.name))
+        return storage.connection.meta.client.get_object(Bucket=storage.bucket_name, Key=key)["Body"]
+    return storage.open(filefield.name, "rb")
+
+
+def copy_remote(filefield, dest_dir):
+    """
+    Copia un archivo remoto a dest_dir por bloques, con un tiempo máximo por archivo.
+    Conserva el nombre base (es el que usan las etiquetas [sound:...] de las notas).
+    """
+    local = os.path.join(dest_dir, os.path.basename(filefield.name))
+    partial = local + ".part"
+    deadline = time.monotonic() + settings.APKG_MEDIA_FILE_TIMEOUT
+
+    stream = open_remote(filefield)
+    try:
+        with open(partial, "wb") as f:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"se superaron {settings.APKG_MEDIA_FILE_TIMEOUT}s")
+                f.write(chunk)
+    finally:
+        stream.close()
+    os.replace(partial, local)
+    return local
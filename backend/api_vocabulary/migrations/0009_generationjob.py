@@ -0,0 +1,44 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_vocabulary', '0008_downloadhistory'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenerationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('word', models.CharField(max_length=100)),
+                ('context', models.TextField(blank=True, default='')),
+                ('deck', models.CharField(max_length=100)),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('running', 'En proceso'), ('done', 'Completado'), ('failed', 'Fallido')], default='pending', max_length=10)),
+                ('stage', models.CharField(default='queued', max_length=50)),
+                ('progress', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('locked_by', models.CharField(blank=True, default='', max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('source_lang', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api_vocabulary.language')),
+                ('target_lang', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api_vocabulary.language')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='generation_jobs', to=settings.AUTH_USER_MODEL)),
+                ('user_word', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api_vocabulary.uservocabularyword')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'run_after'], name='genjob_status_run_after_idx')],
+            },
+        ),
+    ]
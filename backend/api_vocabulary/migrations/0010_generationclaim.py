@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:11
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_vocabulary', '0009_generationjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenerationClaim',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('word', models.CharField(max_length=100)),
+                ('owner', models.CharField(max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('heartbeat_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('source_lang', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api_vocabulary.language')),
+                ('target_lang', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api_vocabulary.language')),
+            ],
+        ),
+    ]
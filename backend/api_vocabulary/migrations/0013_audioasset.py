@@ -0,0 +1,49 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:17
+
+import api_vocabulary.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_vocabulary', '0012_llmresponsecache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AudioAsset',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('text', models.TextField()),
+                ('lang_code', models.CharField(max_length=10)),
+                ('voice', models.CharField(default='default', max_length=50)),
+                ('format', models.CharField(default='mp3', max_length=10)),
+                ('file', models.FileField(upload_to=api_vocabulary.models.audio_asset_upload_to)),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='customwordcontent',
+            name='audio_sentence_asset',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api_vocabulary.audioasset'),
+        ),
+        migrations.AddField(
+            model_name='customwordcontent',
+            name='audio_word_asset',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api_vocabulary.audioasset'),
+        ),
+        migrations.AddField(
+            model_name='sharedvocabularyword',
+            name='audio_sentence_asset',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api_vocabulary.audioasset'),
+        ),
+        migrations.AddField(
+            model_name='sharedvocabularyword',
+            name='audio_word_asset',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api_vocabulary.audioasset'),
+        ),
+    ]
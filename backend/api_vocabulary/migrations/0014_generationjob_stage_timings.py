@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_vocabulary', '0013_audioasset'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='stage_timings',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
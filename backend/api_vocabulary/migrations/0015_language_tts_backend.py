@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_vocabulary', '0014_generationjob_stage_timings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='language',
+            name='tts_backend',
+            field=models.CharField(blank=True, choices=[('gtts', 'gtts'), ('pyttsx3', 'pyttsx3')], default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='language',
+            name='tts_voice',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+    ]
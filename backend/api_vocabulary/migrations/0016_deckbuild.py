@@ -0,0 +1,32 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_vocabulary', '0015_language_tts_backend'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeckBuild',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('deck_name', models.CharField(max_length=255)),
+                ('deck_id', models.BigIntegerField()),
+                ('notes', models.JSONField(blank=True, default=dict)),
+                ('media', models.JSONField(blank=True, default=dict)),
+                ('archive_path', models.CharField(blank=True, default='', max_length=500)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deck_builds', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'deck_name')},
+            },
+        ),
+    ]
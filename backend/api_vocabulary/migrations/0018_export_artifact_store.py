@@ -0,0 +1,55 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def relativize_paths(apps, schema_editor):
+    # Las rutas pasan a ser nombres dentro del almacén de exportaciones: user_<id>/<archivo>.apkg
+    ExportArtifact = apps.get_model('api_vocabulary', 'ExportArtifact')
+    DeckBuild = apps.get_model('api_vocabulary', 'DeckBuild')
+    for artifact in ExportArtifact.objects.filter(path__contains='generated_apkg/'):
+        artifact.path = artifact.path.split('generated_apkg/', 1)[1]
+        artifact.save(update_fields=['path'])
+    for build in DeckBuild.objects.filter(archive_path__contains='generated_apkg/'):
+        build.archive_path = build.archive_path.split('generated_apkg/', 1)[1]
+        build.save(update_fields=['archive_path'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_vocabulary', '0017_updated_at_exportartifact'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='exportartifact',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='downloadhistory',
+            name='artifact',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='downloads', to='api_vocabulary.exportartifact'),
+        ),
+        migrations.AlterField(
+            model_name='exportartifact',
+            name='fingerprint',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='exportartifact',
+            index=models.Index(fields=['user', 'last_used_at'], name='exportartifact_user_lru_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exportartifact',
+            index=models.Index(fields=['last_used_at'], name='exportartifact_lru_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='exportartifact',
+            constraint=models.UniqueConstraint(condition=models.Q(('fingerprint', ''), _negated=True), fields=('user', 'fingerprint'), name='exportartifact_user_fingerprint'),
+        ),
+        migrations.RunPython(relativize_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_vocabulary', '0018_export_artifact_store'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportartifact',
+            name='sha256',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('deck_name', models.CharField(blank=True, default='', max_length=255)),
+                ('word_ids', models.JSONField(blank=True, null=True)),
+                ('allow_duplicates', models.BooleanField(default=False)),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('running', 'En proceso'), ('done', 'Completado'), ('failed', 'Fallido')], default='pending', max_length=10)),
+                ('stage', models.CharField(default='queued', max_length=50)),
+                ('progress', models.PositiveSmallIntegerField(default=0)),
+                ('notes_total', models.PositiveIntegerField(default=0)),
+                ('notes_rendered', models.PositiveIntegerField(default=0)),
+                ('media_total', models.PositiveIntegerField(default=0)),
+                ('media_fetched', models.PositiveIntegerField(default=0)),
+                ('failed_media', models.JSONField(blank=True, default=list)),
+                ('error', models.TextField(blank=True, default='')),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('locked_by', models.CharField(blank=True, default='', max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('artifact', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api_vocabulary.exportartifact')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='export_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'run_after'], name='exportjob_status_run_after_idx')],
+            },
+        ),
+    ]
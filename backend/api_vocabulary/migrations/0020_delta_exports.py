@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_vocabulary', '0019_exportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='downloadhistory',
+            name='delta',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='exportjob',
+            name='since_last_download',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:51
+
+import re
+import sys
+import unicodedata
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models, transaction
+
+TRIGRAM_INDEXES = {
+    'api_vocabulary_sharedvocabularyword': 'shared_word_search_key_trgm',
+    'api_vocabulary_customwordcontent': 'custom_content_search_key_trgm',
+}
+
+
+def normalize_search_key(*texts):
+    # Copia de api_vocabulary.search.normalize_search_key tal como era en esta migración
+    text = " ".join(t for t in texts if t)
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def backfill_search_keys(apps, schema_editor):
+    for model_name in ('SharedVocabularyWord', 'CustomWordContent'):
+        model = apps.get_model('api_vocabulary', model_name)
+        batch = []
+        for content in model.objects.only('id', 'word', 'translation').iterator(chunk_size=2000):
+            content.search_key = normalize_search_key(content.word, content.translation)
+            batch.append(content)
+            if len(batch) >= 2000:
+                model.objects.bulk_update(batch, ['search_key'])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ['search_key'])
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # Índices GIN de trigramas: solo en PostgreSQL y si el servidor permite instalar pg_trgm
+    # (sin la extensión la búsqueda funciona igual, con un recorrido secuencial)
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except Exception as e:
+        print(f"[ERROR] pg_trgm no disponible; la búsqueda no tendrá índice de trigramas: {e}", file=sys.stderr)
+        return
+    for table, index in TRIGRAM_INDEXES.items():
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {index} ON {table} USING gin (search_key gin_trgm_ops)')
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for index in TRIGRAM_INDEXES.values():
+        schema_editor.execute(f'DROP INDEX IF EXISTS {index}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_vocabulary', '0020_delta_exports'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customwordcontent',
+            name='search_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=400),
+        ),
+        migrations.AddField(
+            model_name='sharedvocabularyword',
+            name='search_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=400),
+        ),
+        migrations.RunPython(backfill_search_keys, migrations.RunPython.noop),
+        # Los índices quedan en el estado de las migraciones (Meta.indexes), pero en la base solo se crean si
+        # pg_trgm está disponible: por eso no se usa TrigramExtension() + AddIndex directamente
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='sharedvocabularyword',
+                    index=django.contrib.postgres.indexes.GinIndex(
+                        django.contrib.postgres.indexes.OpClass(models.F('search_key'), name='gin_trgm_ops'),
+                        name='shared_word_search_key_trgm',
+                    ),
+                ),
+                migrations.AddIndex(
+                    model_name='customwordcontent',
+                    index=django.contrib.postgres.indexes.GinIndex(
+                        django.contrib.postgres.indexes.OpClass(models.F('search_key'), name='gin_trgm_ops'),
+                        name='custom_content_search_key_trgm',
+                    ),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+            ],
+        ),
+    ]
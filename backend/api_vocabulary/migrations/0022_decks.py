@@ -0,0 +1,70 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:53
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def backfill_decks(apps, schema_editor):
+    # Un Deck por (usuario, nombre normalizado) con los contadores calculados de una vez
+    Deck = apps.get_model('api_vocabulary', 'Deck')
+    UserVocabularyWord = apps.get_model('api_vocabulary', 'UserVocabularyWord')
+
+    groups = {}
+    rows = (
+        UserVocabularyWord.objects.values('user_id', 'deck')
+        .annotate(words=Count('id'), last=Max('created_at')).order_by('user_id', 'deck')
+    )
+    for row in rows:
+        group = groups.setdefault((row['user_id'], row['deck'].strip().casefold()), {
+            'name': row['deck'].strip(), 'names': [], 'words': 0, 'last': row['last'],
+        })
+        group['names'].append(row['deck'])
+        group['words'] += row['words']
+        group['last'] = max(group['last'], row['last'])
+
+    for (user_id, key), group in groups.items():
+        deck = Deck.objects.create(
+            user_id=user_id, name=group['name'], key=key,
+            word_count=group['words'], last_modified=group['last']
+        )
+        UserVocabularyWord.objects.filter(user_id=user_id, deck__in=group['names']).update(deck_ref=deck)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_vocabulary', '0021_word_search_keys'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Deck',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('key', models.CharField(max_length=100)),
+                ('word_count', models.PositiveIntegerField(default=0)),
+                ('last_modified', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='decks', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='uservocabularyword',
+            name='deck_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='words', to='api_vocabulary.deck'),
+        ),
+        migrations.AddIndex(
+            model_name='uservocabularyword',
+            index=models.Index(fields=['user', 'deck_ref'], name='user_word_user_deck_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='deck',
+            constraint=models.UniqueConstraint(fields=('user', 'key'), name='unique_deck_key_per_user'),
+        ),
+        migrations.RunPython(backfill_decks, migrations.RunPython.noop),
+    ]
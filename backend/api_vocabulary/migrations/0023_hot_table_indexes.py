@@ -0,0 +1,61 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:57
+
+import hashlib
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_context_hash(apps, schema_editor):
+    CustomWordContent = apps.get_model('api_vocabulary', 'CustomWordContent')
+    if schema_editor.connection.vendor == 'postgresql':
+        # En la base, sin traer los contextos a Python (mismo resultado que models.context_digest)
+        schema_editor.execute(
+            "UPDATE api_vocabulary_customwordcontent "
+            "SET context_hash = encode(sha256(convert_to(context, 'UTF8')), 'hex')"
+        )
+        return
+    for content in CustomWordContent.objects.only('id', 'context').iterator(chunk_size=2000):
+        content.context_hash = hashlib.sha256(content.context.encode('utf-8')).hexdigest()
+        content.save(update_fields=['context_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_vocabulary', '0022_decks'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='customwordcontent',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='customwordcontent',
+            name='context_hash',
+            field=models.CharField(default='', editable=False, max_length=64),
+        ),
+        migrations.RunPython(backfill_context_hash, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='downloadhistory',
+            index=models.Index(fields=['user', '-created_at'], name='download_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='downloadhistory',
+            index=models.Index(fields=['user', 'deck_name', '-created_at'], name='download_user_deck_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uservocabularyword',
+            index=models.Index(fields=['user', 'deck'], name='user_word_user_deckname_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uservocabularyword',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='user_word_user_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='customwordcontent',
+            constraint=models.UniqueConstraint(fields=('word', 'source_lang', 'target_lang', 'context_hash'), name='unique_custom_content_context'),
+        ),
+    ]
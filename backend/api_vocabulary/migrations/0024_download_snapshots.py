@@ -0,0 +1,37 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_snapshots(apps, schema_editor):
+    # Descargas anteriores: la mejor aproximación al momento en que se leyeron las palabras
+    DownloadHistory = apps.get_model('api_vocabulary', 'DownloadHistory')
+    DownloadHistory.objects.filter(snapshot_at__isnull=True).update(snapshot_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_vocabulary', '0023_hot_table_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='downloadhistory',
+            name='delivered',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='downloadhistory',
+            name='snapshot_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='exportjob',
+            name='history',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api_vocabulary.downloadhistory'),
+        ),
+        migrations.RunPython(backfill_snapshots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def normalize_deck_key(name):
+    # Copia de api_vocabulary.models.normalize_deck_key tal como era en esta migración
+    return (name or '').strip().casefold()
+
+
+def backfill_deck_keys(apps, schema_editor):
+    for model_name in ('DownloadHistory', 'DeckBuild'):
+        model = apps.get_model('api_vocabulary', model_name)
+        batch = []
+        for row in model.objects.only('id', 'deck_name').iterator(chunk_size=2000):
+            row.deck_key = normalize_deck_key(row.deck_name)
+            batch.append(row)
+            if len(batch) >= 2000:
+                model.objects.bulk_update(batch, ['deck_key'])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ['deck_key'])
+
+    # "General" y "general " pasan a ser el mismo mazo: se conserva el DeckBuild más reciente
+    DeckBuild = apps.get_model('api_vocabulary', 'DeckBuild')
+    seen = set()
+    duplicates = []
+    for build in DeckBuild.objects.only('id', 'user_id', 'deck_key').order_by('-updated_at', '-id'):
+        if (build.user_id, build.deck_key) in seen:
+            duplicates.append(build.id)
+        seen.add((build.user_id, build.deck_key))
+    DeckBuild.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_vocabulary', '0024_download_snapshots'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='downloadhistory',
+            name='download_user_deck_idx',
+        ),
+        migrations.AlterUniqueTogether(
+            name='deckbuild',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='deckbuild',
+            name='deck_key',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='downloadhistory',
+            name='deck_key',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_deck_keys, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='deckbuild',
+            unique_together={('user', 'deck_key')},
+        ),
+        migrations.AddIndex(
+            model_name='downloadhistory',
+            index=models.Index(fields=['user', 'deck_key', '-created_at'], name='download_user_deck_idx'),
+        ),
+    ]
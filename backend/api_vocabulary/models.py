@@ -1,5 +1,13 @@
+import hashlib
+
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models import F
 from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from .tts_backends import TTS_BACKEND_CHOICES
+from .search import normalize_search_key
 
 if not settings.DEBUG:
     from config.storages import MediaStorage
@@ -7,11 +15,72 @@ if not settings.DEBUG:
 class Language(models.Model):
     code = models.CharField(max_length=10, unique=True)  # ej: "en", "es", "fr"
     name = models.CharField(max_length=100)  # ej: "English", "Español", "Français"
+    # 🔊 Motor TTS y voz de este idioma (vacío = TTS_DEFAULT_BACKEND y la voz por defecto del motor)
+    tts_backend = models.CharField(max_length=20, choices=TTS_BACKEND_CHOICES, blank=True, default="")
+    tts_voice = models.CharField(max_length=100, blank=True, default="")  # gTTS: tld ("com.mx"); pyttsx3: id de voz
 
     def __str__(self):
         return f"{self.name} ({self.code})"
 
-class SharedVocabularyWord(models.Model):
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        cache.delete(LANGUAGE_MAP_CACHE_KEY)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        cache.delete(LANGUAGE_MAP_CACHE_KEY)
+        return result
+
+LANGUAGE_MAP_CACHE_KEY = "api_vocabulary:language_map"
+
+def language_map():
+    """{id: {"code", "name"}} de todos los idiomas, cacheado (las listas compactas solo devuelven el id)."""
+    def build():
+        return {str(pk): {"code": code, "name": name} for pk, code, name in Language.objects.values_list("id", "code", "name")}
+    return cache.get_or_set(LANGUAGE_MAP_CACHE_KEY, build, settings.LANGUAGE_MAP_CACHE_SECONDS)
+
+def audio_asset_path(key, audio_format):
+    # Ruta derivada del hash: el mismo audio siempre vive en el mismo archivo y nunca se pisa con otro
+    return f"audio/assets/{key[:2]}/{key}.{audio_format}"
+
+def audio_asset_upload_to(instance, filename):
+    return audio_asset_path(instance.key, instance.format)
+
+class AudioAsset(models.Model):
+    """
+    Audio direccionado por contenido: key = sha256(texto, idioma, voz, formato).
+    Se sintetiza y se sube una sola vez y lo reutilizan todas las palabras (de cualquier par de idiomas).
+    """
+    key = models.CharField(max_length=64, unique=True)
+    text = models.TextField()
+    lang_code = models.CharField(max_length=10)
+    voice = models.CharField(max_length=50, default="default")
+    format = models.CharField(max_length=10, default="mp3")
+    file = models.FileField(
+        upload_to=audio_asset_upload_to,
+        storage=MediaStorage() if not settings.DEBUG else None
+    )
+    size = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.text[:40]} ({self.lang_code}, {self.voice}, {self.format})"
+
+class SearchableContent(models.Model):
+    """Contenido con search_key: palabra y traducción normalizadas (ver search.py), recalculada en cada save()."""
+    search_key = models.CharField(max_length=400, blank=True, default="", editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        self.search_key = normalize_search_key(self.word, self.translation)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"word", "translation"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "search_key"}
+        super().save(*args, **kwargs)
+
+class SharedVocabularyWord(SearchableContent):
     word = models.CharField(max_length=100)
     source_lang = models.ForeignKey(Language, on_delete=models.CASCADE, related_name="shared_words_as_source")
     target_lang = models.ForeignKey(Language, on_delete=models.CASCADE, related_name="shared_words_as_target")
@@ -30,10 +99,21 @@ class SharedVocabularyWord(models.Model):
         null=True,
         storage=MediaStorage() if not settings.DEBUG else None
     )
+    audio_word_asset = models.ForeignKey(
+        AudioAsset, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    audio_sentence_asset = models.ForeignKey(
+        AudioAsset, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
     image_url = models.CharField(max_length=500, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)  # 🔁 Versión del contenido (invalida los .apkg cacheados)
 
     class Meta:
         unique_together = ("word", "source_lang", "target_lang")
+        indexes = [
+            # Trigramas de search_key para la búsqueda con ?scope=shared (solo existe si hay pg_trgm, migración 0021)
+            GinIndex(OpClass(F("search_key"), name="gin_trgm_ops"), name="shared_word_search_key_trgm"),
+        ]
 
     def __str__(self):
         return f"{self.word} ({self.source_lang} → {self.target_lang})"
@@ -48,13 +128,14 @@ class SharedVocabularyWord(models.Model):
 
     @property
     def word_audio_path(self):
-        from django.conf import settings
-        return str(settings.MEDIA_ROOT / self.audio_word.name) if self.audio_word else None
+        # Ruta local del audio (None si el storage es remoto o el archivo no existe)
+        from .media_resolver import local_path
+        return local_path(self.audio_word)
 
     @property
     def example_audio_path(self):
-        from django.conf import settings
-        return str(settings.MEDIA_ROOT / self.audio_sentence.name) if self.audio_sentence else None
+        from .media_resolver import local_path
+        return local_path(self.audio_sentence)
 
     @property
     def image_filename(self):
@@ -65,6 +146,30 @@ class SharedVocabularyWord(models.Model):
         from django.conf import settings
         return str(settings.MEDIA_ROOT / self.image_url) if self.image_url else None
 
+def normalize_deck_key(name):
+    """Clave del mazo: el nombre sin espacios en los extremos y sin distinguir mayúsculas ("General" = "general ")."""
+    return (name or "").strip().casefold()
+
+class Deck(models.Model):
+    """
+    Mazo del usuario, derivado de UserVocabularyWord.deck (que sigue siendo el nombre que envía el cliente).
+    word_count y last_modified se mantienen con las señales de signals.py al crear, mover o borrar palabras.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="decks")
+    name = models.CharField(max_length=100)  # Nombre con el que se creó el mazo
+    key = models.CharField(max_length=100)  # normalize_deck_key(name)
+    word_count = models.PositiveIntegerField(default=0)
+    last_modified = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="unique_deck_key_per_user"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.name} ({self.word_count})"
+
 class UserVocabularyWord(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -85,15 +190,33 @@ class UserVocabularyWord(models.Model):
         blank=True
     )
     deck = models.CharField(max_length=100)
+    deck_ref = models.ForeignKey(
+        Deck, on_delete=models.SET_NULL, null=True, blank=True, related_name="words"
+    )  # Lo asigna signals.py a partir de `deck`
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         unique_together = ("user", "shared_word", "custom_content")
+        indexes = [
+            models.Index(fields=["user", "deck_ref"], name="user_word_user_deck_idx"),
+            # Exportación por nombre de mazo (filter(user, deck=...))
+            models.Index(fields=["user", "deck"], name="user_word_user_deckname_idx"),
+            # Listado y paginación por cursor: WHERE user ORDER BY created_at DESC, id DESC
+            models.Index(fields=["user", "-created_at", "-id"], name="user_word_user_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.deck} - {self.shared_word or self.custom_content}"
+
+    @property
+    def content(self):
+        """Contenido que se muestra y se exporta: el personalizado si existe, si no el compartido."""
+        return self.custom_content or self.shared_word
     
-class CustomWordContent(models.Model):
+def context_digest(context):
+    return hashlib.sha256((context or "").encode("utf-8")).hexdigest()
+
+class CustomWordContent(SearchableContent):
     word = models.CharField(max_length=100)
     source_lang = models.ForeignKey(
         Language, on_delete=models.CASCADE, related_name="custom_source_words"
@@ -117,10 +240,34 @@ class CustomWordContent(models.Model):
         null=True,
         storage=MediaStorage() if not settings.DEBUG else None
     )
+    audio_word_asset = models.ForeignKey(
+        AudioAsset, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    audio_sentence_asset = models.ForeignKey(
+        AudioAsset, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
     image_url = models.CharField(max_length=500, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)  # 🔁 Versión del contenido (invalida los .apkg cacheados)
+
+    # sha256 del contexto: la unicidad no indexa el TextField completo (sin límite de largo)
+    context_hash = models.CharField(max_length=64, default="", editable=False)
 
     class Meta:
-        unique_together = ("word", "source_lang", "target_lang", "context")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["word", "source_lang", "target_lang", "context_hash"], name="unique_custom_content_context"
+            ),
+        ]
+        indexes = [
+            GinIndex(OpClass(F("search_key"), name="gin_trgm_ops"), name="custom_content_search_key_trgm"),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.context_hash = context_digest(self.context)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "context" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "context_hash"}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.word} - custom with context"
@@ -135,13 +282,14 @@ class CustomWordContent(models.Model):
 
     @property
     def word_audio_path(self):
-        from django.conf import settings
-        return str(settings.MEDIA_ROOT / self.audio_word.name) if self.audio_word else None
+        # Ruta local del audio (None si el storage es remoto o el archivo no existe)
+        from .media_resolver import local_path
+        return local_path(self.audio_word)
 
     @property
     def example_audio_path(self):
-        from django.conf import settings
-        return str(settings.MEDIA_ROOT / self.audio_sentence.name) if self.audio_sentence else None
+        from .media_resolver import local_path
+        return local_path(self.audio_sentence)
 
     @property
     def image_filename(self):
@@ -155,9 +303,271 @@ class CustomWordContent(models.Model):
 class DownloadHistory(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     deck_name = models.CharField(max_length=255)
+    deck_key = models.CharField(max_length=255, default="", editable=False)  # normalize_deck_key(deck_name)
     word_ids = models.TextField(help_text="Lista separada por comas de los IDs de palabras exportadas")
     file_path = models.CharField(max_length=500)
+    artifact = models.ForeignKey(
+        "ExportArtifact", on_delete=models.SET_NULL, null=True, blank=True, related_name="downloads"
+    )  # Vacío (y file_path = "") si el .apkg ya fue expulsado del almacén
+    delta = models.BooleanField(default=False)  # Solo palabras nuevas/modificadas (word_ids = mazo completo)
+    # Momento en que se leyeron las palabras exportadas: el próximo delta incluye lo modificado después
+    snapshot_at = models.DateTimeField(null=True, blank=True)
+    delivered = models.BooleanField(default=True)  # False mientras el .apkg de un ExportJob no se descargó
+    created_at = models.DateTimeField(auto_now_add=True)  # Cuándo llegó la descarga al usuario
+
+    class Meta:
+        indexes = [
+            # Historial del usuario (más reciente primero) y última descarga de un mazo (exportación delta)
+            models.Index(fields=["user", "-created_at"], name="download_user_created_idx"),
+            models.Index(fields=["user", "deck_key", "-created_at"], name="download_user_deck_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.deck_key = normalize_deck_key(self.deck_name)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "deck_name" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "deck_key"}
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.deck_name} ({self.created_at})"
+
+class DeckBuild(models.Model):
+    """
+    Último .apkg completo de un mazo (usuario, clave del mazo): id de Anki estable, filas de notas ya renderizadas
+    y dónde quedó cada audio dentro del archivo. La siguiente exportación del mazo solo procesa el delta.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="deck_builds")
+    deck_name = models.CharField(max_length=255)
+    deck_key = models.CharField(max_length=255, default="", editable=False)  # normalize_deck_key(deck_name)
+    deck_id = models.BigIntegerField()
+    notes = models.JSONField(default=dict, blank=True)  # id de UserVocabularyWord → {"guid", "fields", "media"}
+    media = models.JSONField(default=dict, blank=True)  # nombre en el storage → entrada del zip en archive_path
+    archive_path = models.CharField(max_length=500, blank=True, default="")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("user", "deck_key")
+
+    def save(self, *args, **kwargs):
+        self.deck_key = normalize_deck_key(self.deck_name)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "deck_name" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "deck_key"}
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.deck_name} ({len(self.notes)} notas)"
+
+class ExportArtifact(models.Model):
+    """
+    Índice de los .apkg guardados en el almacén de exportaciones (export_store.py).
+    Reutilizables: fingerprint = sha256(versión de plantilla, mazo, y por cada palabra su fuente y updated_at);
+    si cambia el contenido cambia el fingerprint, así que nunca se sirve un mazo viejo.
+    De un solo uso (allow_duplicates o con audios faltantes): fingerprint vacío, expiran antes.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="export_artifacts")
+    deck_name = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64, blank=True, default="")
+    path = models.CharField(max_length=500)  # Nombre dentro del almacén: user_<id>/<archivo>.apkg
+    size = models.PositiveBigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True, default="")  # Hash del contenido (ETag de la descarga)
+    created_at = models.DateTimeField(auto_now_add=True)  # Última publicación (Last-Modified de la descarga)
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "fingerprint"], condition=~models.Q(fingerprint=""), name="exportartifact_user_fingerprint"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["user", "last_used_at"], name="exportartifact_user_lru_idx"),
+            models.Index(fields=["last_used_at"], name="exportartifact_lru_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.deck_name} ({self.fingerprint[:12]})"
+
+class GenerationJob(models.Model):
+    """
+    Trabajo de generación de contenido (OpenAI + Translate + TTS) procesado fuera del request.
+    La cola vive en PostgreSQL: los workers reclaman filas con SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pendiente"),
+        (STATUS_RUNNING, "En proceso"),
+        (STATUS_DONE, "Completado"),
+        (STATUS_FAILED, "Fallido"),
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="generation_jobs"
+    )
+    word = models.CharField(max_length=100)
+    source_lang = models.ForeignKey(Language, on_delete=models.CASCADE, related_name="+")
+    target_lang = models.ForeignKey(Language, on_delete=models.CASCADE, related_name="+")
+    context = models.TextField(blank=True, default="")
+    deck = models.CharField(max_length=100)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    stage = models.CharField(max_length=50, default="queued")
+    progress = models.PositiveSmallIntegerField(default=0)  # 0-100
+    error = models.TextField(blank=True, default="")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    locked_by = models.CharField(max_length=100, blank=True, default="")
+    user_word = models.ForeignKey(
+        UserVocabularyWord,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+"
+    )
+    stage_timings = models.JSONField(default=dict, blank=True)  # ⏱️ Tiempos por etapa del pipeline (segundos)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="genjob_status_run_after_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.word} ({self.source_lang_id} → {self.target_lang_id}) - {self.status}"
+
+
+class ExportJob(models.Model):
+    """
+    Exportación .apkg procesada fuera del request (misma cola en PostgreSQL que GenerationJob).
+    El progreso se reporta como notas renderizadas y audios reunidos; el resultado es un ExportArtifact.
+    """
+    STATUS_PENDING = GenerationJob.STATUS_PENDING
+    STATUS_RUNNING = GenerationJob.STATUS_RUNNING
+    STATUS_DONE = GenerationJob.STATUS_DONE
+    STATUS_FAILED = GenerationJob.STATUS_FAILED
+    STATUS_CHOICES = GenerationJob.STATUS_CHOICES
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="export_jobs"
+    )
+    deck_name = models.CharField(max_length=255, blank=True, default="")
+    word_ids = models.JSONField(null=True, blank=True)  # Lista de IDs de UserVocabularyWord (o todo el mazo)
+    allow_duplicates = models.BooleanField(default=False)
+    since_last_download = models.BooleanField(default=False)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    stage = models.CharField(max_length=50, default="queued")
+    progress = models.PositiveSmallIntegerField(default=0)  # 0-100
+    notes_total = models.PositiveIntegerField(default=0)
+    notes_rendered = models.PositiveIntegerField(default=0)
+    media_total = models.PositiveIntegerField(default=0)
+    media_fetched = models.PositiveIntegerField(default=0)
+    failed_media = models.JSONField(default=list, blank=True)  # [{"file": nombre, "reason": motivo}]
+    error = models.TextField(blank=True, default="")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    locked_by = models.CharField(max_length=100, blank=True, default="")
+    artifact = models.ForeignKey(
+        ExportArtifact, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    history = models.ForeignKey(
+        DownloadHistory, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )  # Se marca como entregada cuando el usuario descarga el artefacto
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="exportjob_status_run_after_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.deck_name or '(todas)'} - {self.user_id} - {self.status}"
+
+
+class GenerationClaim(models.Model):
+    """
+    Registro de generaciones en curso (single-flight) por clave de contenido (word, source_lang, target_lang).
+    Solo existe mientras alguien genera el contenido; los demás requests esperan a que desaparezca.
+    """
+    key = models.CharField(max_length=64, unique=True)  # sha256 de la clave de contenido
+    word = models.CharField(max_length=100)
+    source_lang = models.ForeignKey(Language, on_delete=models.CASCADE, related_name="+")
+    target_lang = models.ForeignKey(Language, on_delete=models.CASCADE, related_name="+")
+    owner = models.CharField(max_length=100)
+    created_at = models.DateTimeField(auto_now_add=True)
+    heartbeat_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.word} ({self.source_lang_id} → {self.target_lang_id}) - {self.owner}"
+
+
+class TranslationCache(models.Model):
+    """
+    Caché persistente de traducciones, direccionada por contenido:
+    key = sha256(texto normalizado, idioma origen, idioma destino).
+    """
+    key = models.CharField(max_length=64, unique=True)
+    source_code = models.CharField(max_length=10)
+    target_code = models.CharField(max_length=10)
+    source_text = models.TextField()
+    translated_text = models.TextField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)  # Para la expulsión LRU
+
+    def __str__(self):
+        return f"{self.source_text[:40]} ({self.source_code} → {self.target_code})"
+
+
+class CacheCounter(models.Model):
+    """
+    Contadores globales de aciertos/fallos/expulsiones por caché (compartidos entre procesos).
+    """
+    name = models.CharField(max_length=50, unique=True)
+    hits = models.PositiveBigIntegerField(default=0)
+    misses = models.PositiveBigIntegerField(default=0)
+    evictions = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __str__(self):
+        return f"{self.name}: {self.hits} hits / {self.misses} misses"
+
+
+class LLMResponseCache(models.Model):
+    """
+    Caché de respuestas de OpenAI: key = sha256(modelo, prompt, parámetros).
+    Guarda la respuesta cruda y el resultado ya interpretado para no volver a llamar al LLM.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    model = models.CharField(max_length=50)
+    prompt_hash = models.CharField(max_length=64)
+    raw_response = models.TextField()
+    parsed = models.JSONField(null=True, blank=True)
+    hits = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)  # Para la expulsión LRU
 
     def __str__(self):
-        return f"{self.user.username} - {self.deck_name} ({self.created_at})"
\ No newline at end of file
+        return f"{self.model} - {self.prompt_hash[:12]}"
@@ -0,0 +1,27 @@
+# pagination.py
+# Paginación por cursor (keyset) para las listas que crecen con el uso, como /api/vocabulary/.
+# El orden es (-created_at, -id) y el cursor guarda la posición en created_at: cada página es un WHERE + LIMIT,
+# sin COUNT(*), así que cuesta lo mismo en la página 1 que en la 50. CursorPagination de DRF solo posiciona
+# sobre el primer campo; las palabras creadas en el mismo instante se saltan con un offset dentro del cursor
+# (id solo hace estable ese orden), que se mantiene pequeño salvo que haya muchas con el mismo created_at.
+#
+# Es opcional: solo se pagina si el cliente manda ?cursor= o ?page_size=. Sin esos parámetros la
+# respuesta sigue siendo la lista completa de siempre (el frontend actual la consume así).
+
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class OptionalCursorPagination(CursorPagination):
+    ordering = ("-created_at", "-id")
+    page_size_query_param = "page_size"
+
+    def __init__(self):
+        self.page_size = settings.VOCABULARY_PAGE_SIZE
+        self.max_page_size = settings.VOCABULARY_MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
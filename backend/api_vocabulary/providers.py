@@ -0,0 +1,253 @@
+# providers.py
+# Registro de proveedores externos (OpenAI, Google Translate, TTS, descargas de media y el bucket S3).
+# Cada proveedor tiene un único cliente por proceso con conexiones keep-alive, timeouts explícitos,
+# reintentos con backoff y jitter, y un circuit breaker: si el proveedor está caído se falla de
+# inmediato con ProviderUnavailable (HTTP 503) en vez de bloquear workers de gunicorn.
+
+import os
+import random
+import sys
+import threading
+import time
+
+import httpx
+import openai
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class ProviderUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Un servicio externo no está disponible. Intenta de nuevo en unos momentos."
+    default_code = "provider_unavailable"
+
+
+class CircuitBreaker:
+    """
+    closed → open tras `failure_threshold` fallos seguidos; open rechaza llamadas durante `reset_timeout`
+    segundos; después deja pasar una llamada de prueba (half-open) que lo cierra o lo vuelve a abrir.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, name, failure_threshold=None, reset_timeout=None):
+        self.name = name
+        self.failure_threshold = failure_threshold or settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout or settings.CIRCUIT_BREAKER_RESET_SECONDS
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    raise ProviderUnavailable(f"El servicio '{self.name}' no está disponible (circuito abierto).")
+                self.state = self.HALF_OPEN
+            elif self.state == self.HALF_OPEN:
+                # Ya hay una llamada de prueba en curso
+                raise ProviderUnavailable(f"El servicio '{self.name}' no está disponible (circuito abierto).")
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(f"[ERROR] Circuito abierto para '{self.name}' tras {self.failures} fallos", file=sys.stderr)
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def reset(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+
+class Provider:
+    def __init__(self, name, factory=None, is_retryable=None):
+        self.name = name
+        self._factory = factory
+        self._is_retryable = is_retryable or (lambda exc: False)
+        self._client = None
+        self._lock = threading.Lock()
+        self.breaker = CircuitBreaker(name)
+
+    @property
+    def timeout(self):
+        # (connect, read) en segundos
+        return tuple(settings.PROVIDER_TIMEOUTS[self.name])
+
+    def client(self):
+        """Cliente compartido del proveedor, creado la primera vez que se usa (nunca al importar)."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory(self)
+        return self._client
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Ejecuta fn(*args, **kwargs) con reintentos y circuit breaker.
+        Los errores transitorios (red, timeouts, 429/5xx) se reintentan; si se agotan los intentos
+        o el circuito está abierto se lanza ProviderUnavailable. El resto de errores se propagan tal cual.
+        """
+        max_retries = settings.PROVIDER_MAX_RETRIES
+        for attempt in range(max_retries + 1):
+            self.breaker.before_call()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if not self._is_retryable(e):
+                    self.breaker.record_success()  # El proveedor respondió: el error es de la petición
+                    raise
+                self.breaker.record_failure()
+                print(f"[ERROR] '{self.name}' falló (intento {attempt + 1}/{max_retries + 1}): {e}", file=sys.stderr)
+                if attempt == max_retries:
+                    raise ProviderUnavailable(f"El servicio '{self.name}' no respondió: {e}") from e
+                # Backoff exponencial con jitter completo
+                time.sleep(random.uniform(0, settings.PROVIDER_RETRY_BACKOFF * (2 ** attempt)))
+            else:
+                self.breaker.record_success()
+                return result
+
+    def reset(self):
+        self.breaker.reset()
+
+
+# ---- Clasificación de errores transitorios ----
+
+def _is_retryable_openai(exc):
+    return isinstance(exc, (
+        openai.APIConnectionError,  # Incluye APITimeoutError
+        openai.RateLimitError,
+        openai.InternalServerError,
+    ))
+
+
+def _is_retryable_http(exc):
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    return False
+
+
+def _is_retryable_google(exc):
+    from google.api_core import exceptions as google_exceptions
+    from google.auth.exceptions import TransportError
+
+    return _is_retryable_http(exc) or isinstance(exc, (
+        google_exceptions.TooManyRequests,
+        google_exceptions.InternalServerError,
+        google_exceptions.BadGateway,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.GatewayTimeout,
+        TransportError,
+    ))
+
+
+def _is_retryable_gtts(exc):
+    from gtts.tts import gTTSError
+
+    if isinstance(exc, gTTSError):
+        # Sin respuesta = fallo de conexión/timeout
+        return exc.rsp is None or exc.rsp.status_code == 429 or exc.rsp.status_code >= 500
+    return _is_retryable_http(exc)
+
+
+def _is_retryable_storage(exc):
+    from botocore.exceptions import ClientError, ConnectionError as BotoConnectionError
+
+    if isinstance(exc, BotoConnectionError):  # Incluye timeouts de conexión y lectura
+        return True
+    if isinstance(exc, ClientError):
+        error = exc.response.get("Error", {})
+        http_status = exc.response.get("ResponseMetadata", {}).get("HTTPStatusCode") or 0
+        return http_status == 429 or http_status >= 500 or error.get("Code") in ("SlowDown", "Throttling", "RequestTimeout")
+    return False
+
+
+# ---- Fábricas de clientes ----
+
+def _pooled_session(session=None):
+    session = session or requests.Session()
+    # Sin reintentos en el adaptador: los maneja Provider.call con backoff y circuit breaker
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=settings.PROVIDER_POOL_SIZE, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _build_openai(provider):
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        print("[ERROR] Falta OPENAI_API_KEY", file=sys.stderr)  # Debugging line
+        raise Exception("La API Key de OpenAI no está definida en las variables de entorno.")
+
+    connect, read = provider.timeout
+    return openai.OpenAI(
+        api_key=api_key,
+        max_retries=0,
+        timeout=httpx.Timeout(read, connect=connect),
+        http_client=httpx.Client(limits=httpx.Limits(
+            max_connections=settings.PROVIDER_POOL_SIZE,
+            max_keepalive_connections=settings.PROVIDER_POOL_SIZE,
+        )),
+    )
+
+
+def _build_translate(provider):
+    import google.auth
+    from google.auth.transport.requests import AuthorizedSession
+    from google.cloud import translate_v2 as gcloud_translate
+
+    timeout = provider.timeout
+
+    class TimeoutSession(AuthorizedSession):
+        # El cliente v2 fija timeout=60 en cada request; se sustituye por el configurado
+        def request(self, method, url, *args, **kwargs):
+            kwargs["timeout"] = timeout
+            return super().request(method, url, *args, **kwargs)
+
+    credentials, _ = google.auth.default(scopes=gcloud_translate.Client.SCOPE)
+    return gcloud_translate.Client(credentials=credentials, _http=_pooled_session(TimeoutSession(credentials)))
+
+
+def _build_session(provider):
+    return _pooled_session()
+
+
+PROVIDERS = {
+    provider.name: provider
+    for provider in (
+        Provider("openai", _build_openai, _is_retryable_openai),
+        Provider("translate", _build_translate, _is_retryable_google),
+        Provider("tts", is_retryable=_is_retryable_gtts),  # gTTS abre su propia sesión; solo timeouts y breaker
+        Provider("media", _build_session, _is_retryable_http),
+        Provider("storage", is_retryable=_is_retryable_storage),  # El cliente boto3 lo crea cada storage (config/storages.py)
+    )
+}
+
+
+def get_provider(name):
+    return PROVIDERS[name]
+
+
+def http_get(url, stream=False):
+    """GET con la sesión compartida de descargas (timeouts, reintentos y circuit breaker)."""
+    provider = get_provider("media")
+
+    def fetch():
+        response = provider.client().get(url, timeout=provider.timeout, stream=stream)
+        response.raise_for_status()
+        return response
+
+    return provider.call(fetch)
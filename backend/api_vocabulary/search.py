@@ -0,0 +1,93 @@
+# search.py
+# Búsqueda de palabras sobre una clave normalizada (search_key): minúsculas, sin acentos y con los espacios
+# colapsados, calculada al guardar. "cafe" encuentra "Café" y la comparación es un LIKE sobre una sola columna,
+# sin LOWER()/UPPER() por fila.
+#
+# Con la extensión pg_trgm (migración 0021, si el servidor la tiene) esa columna lleva un índice GIN de
+# trigramas: el LIKE '%texto%' usa el índice aunque el comodín vaya al principio, y los resultados se ordenan
+# también por similitud. Sin pg_trgm se busca igual (sin índice) y el orden es exacta > prefijo > contiene.
+
+import re
+import sys
+import unicodedata
+from functools import lru_cache
+
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Coalesce, Greatest, Length
+
+MIN_QUERY_LENGTH = 2
+# En todo el vocabulario compartido (?scope=shared): el índice de trigramas no acota un LIKE de menos de 3 caracteres
+MIN_SHARED_QUERY_LENGTH = 3
+
+
+def normalize_search_key(*texts):
+    """Clave de búsqueda: textos unidos, sin acentos, en minúsculas y con un solo espacio entre palabras."""
+    text = " ".join(t for t in texts if t)
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+@lru_cache(maxsize=1)
+def trigram_available():
+    """True si pg_trgm está instalada en la base (se consulta una vez por proceso)."""
+    if connection.vendor != "postgresql":
+        return False
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            return cursor.fetchone() is not None
+    except Exception as e:
+        print(f"[ERROR] No se pudo comprobar pg_trgm: {e}", file=sys.stderr)
+        return False
+
+
+def _match_rank(field, key):
+    """0 = la palabra es exactamente la búsqueda, 1 = empieza por ella, 2 = la contiene en otra parte."""
+    return Case(
+        When(**{field: key}, then=Value(0)),
+        When(**{f"{field}__startswith": f"{key} "}, then=Value(0)),
+        When(**{f"{field}__startswith": key}, then=Value(1)),
+        default=Value(2),
+        output_field=IntegerField(),
+    )
+
+
+def rank_queryset(queryset, key, fields):
+    """
+    Ordena por relevancia sobre las columnas search_key de `fields` (la primera no nula de cada fila):
+    tipo de coincidencia, similitud de trigramas si hay pg_trgm y, a igualdad, la clave más corta.
+    """
+    search_key = Coalesce(*[F(field) for field in fields]) if len(fields) > 1 else F(fields[0])
+    queryset = queryset.annotate(
+        match_rank=Case(
+            *[When(**{f"{field}__isnull": False}, then=_match_rank(field, key)) for field in fields],
+            default=Value(2),
+            output_field=IntegerField(),
+        ),
+        key_length=Length(search_key),
+    )
+    if trigram_available():
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        similarity = [TrigramSimilarity(field, key) for field in fields]
+        queryset = queryset.annotate(similarity=Greatest(*similarity) if len(similarity) > 1 else similarity[0])
+        return queryset.order_by("match_rank", F("similarity").desc(nulls_last=True), "key_length", "-id")
+    return queryset.order_by("match_rank", "key_length", "-id")
+
+
+def search_user_vocabulary(queryset, query):
+    """Palabras del usuario (`queryset` de UserVocabularyWord) cuya palabra o traducción contiene `query`."""
+    key = normalize_search_key(query)
+    matches = queryset.filter(
+        Q(custom_content__isnull=True, shared_word__search_key__contains=key)
+        | Q(custom_content__search_key__contains=key)
+    )
+    return rank_queryset(matches, key, ["custom_content__search_key", "shared_word__search_key"])
+
+
+def search_shared_words(queryset, query):
+    """Vocabulario compartido (`queryset` de SharedVocabularyWord) que contiene `query`, por relevancia."""
+    key = normalize_search_key(query)
+    return rank_queryset(queryset.filter(search_key__contains=key), key, ["search_key"])
@@ -1,5 +1,19 @@
 from rest_framework import serializers
-from .models import SharedVocabularyWord, CustomWordContent, UserVocabularyWord, Language
+from django.urls import reverse
+from .models import SharedVocabularyWord, CustomWordContent, UserVocabularyWord, Language, GenerationJob, ExportJob, Deck
+
+class SparseFieldsetMixin:
+    """
+    Con ?fields=id,deck,... (context["fields"]) el serializer solo arma esos campos; los nombres
+    desconocidos se ignoran. Los campos descartados no se calculan, no solo se ocultan.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.context.get("fields")
+        if requested:
+            for name in set(self.fields) - set(requested):
+                self.fields.pop(name)
+
 
 class LanguageSerializer(serializers.ModelSerializer):
     class Meta:
@@ -33,7 +47,7 @@ class CustomWordContentSerializer(serializers.ModelSerializer):
         ]
 
 
-class UserVocabularyWordSerializer(serializers.ModelSerializer):
+class UserVocabularyWordSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     # Entrada: campos auxiliares para crear palabras nuevas
     word = serializers.CharField(write_only=True, required=False)
     source_lang = serializers.PrimaryKeyRelatedField(queryset=Language.objects.all(), write_only=True, required=False)
@@ -99,4 +113,76 @@ class UserVocabularyWordSerializer(serializers.ModelSerializer):
         validated_data.pop("source_lang", None)
         validated_data.pop("target_lang", None)
         validated_data.pop("context", None)
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+
+class UserVocabularyWordCompactSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    Representación plana para listas (?view=compact): el contenido efectivo (personalizado o compartido)
+    sin anidar, y los idiomas como id (el detalle está en /api/languages/map/, cacheado).
+    """
+    word = serializers.CharField(source="content.word", read_only=True, allow_null=True)
+    source_lang = serializers.IntegerField(source="content.source_lang_id", read_only=True, allow_null=True)
+    target_lang = serializers.IntegerField(source="content.target_lang_id", read_only=True, allow_null=True)
+    context = serializers.CharField(source="custom_content.context", read_only=True, allow_null=True)
+    translation = serializers.CharField(source="content.translation", read_only=True, allow_null=True)
+    example_sentence = serializers.CharField(source="content.example_sentence", read_only=True, allow_null=True)
+    example_translation = serializers.CharField(source="content.example_translation", read_only=True, allow_null=True)
+    audio_word = serializers.FileField(source="content.audio_word", read_only=True, allow_null=True)
+    audio_sentence = serializers.FileField(source="content.audio_sentence", read_only=True, allow_null=True)
+    image_url = serializers.CharField(source="content.image_url", read_only=True, allow_null=True)
+
+    class Meta:
+        model = UserVocabularyWord
+        fields = [
+            "id", "deck", "created_at", "shared_word_id", "custom_content_id",
+            "word", "source_lang", "target_lang", "context", "translation",
+            "example_sentence", "example_translation", "audio_word", "audio_sentence", "image_url"
+        ]
+        read_only_fields = fields
+
+
+class DeckSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Deck
+        fields = ["id", "name", "word_count", "last_modified", "created_at"]
+        read_only_fields = fields
+
+
+class GenerationJobSerializer(serializers.ModelSerializer):
+    # Resultado final: la palabra creada, cuando el trabajo termina
+    user_word = UserVocabularyWordSerializer(read_only=True)
+
+    class Meta:
+        model = GenerationJob
+        fields = [
+            "id", "status", "stage", "progress", "error",
+            "word", "source_lang", "target_lang", "context", "deck",
+            "attempts", "stage_timings", "created_at", "started_at", "finished_at",
+            "user_word"
+        ]
+        read_only_fields = fields
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    # URL de descarga del .apkg cuando el trabajo termina (admite Range para retomar descargas)
+    download_url = serializers.SerializerMethodField()
+    size = serializers.IntegerField(source="artifact.size", read_only=True, allow_null=True)
+
+    class Meta:
+        model = ExportJob
+        fields = [
+            "id", "status", "stage", "progress", "error",
+            "deck_name", "word_ids", "allow_duplicates", "since_last_download",
+            "notes_rendered", "notes_total", "media_fetched", "media_total", "failed_media",
+            "attempts", "created_at", "started_at", "finished_at",
+            "download_url", "size"
+        ]
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if obj.status != ExportJob.STATUS_DONE or not obj.artifact_id:
+            return None
+        url = reverse("export-job-download", args=[obj.id])
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request else url
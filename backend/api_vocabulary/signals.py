@@ -0,0 +1,48 @@
+# signals.py
+# Mantiene la tabla Deck sincronizada con UserVocabularyWord.deck (se registra en apps.ready):
+# - Al guardar una palabra se resuelve su mazo por clave normalizada (creándolo si no existe) y se asigna deck_ref.
+# - Al crearla, moverla de mazo o borrarla se ajusta word_count con F() (sin leer y reescribir el contador)
+#   y se actualiza last_modified.
+# Las operaciones en bloque que no disparan señales (bulk_create, queryset.update) no actualizan los mazos.
+
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from api_vocabulary.models import Deck, UserVocabularyWord, normalize_deck_key
+
+
+def _adjust(deck_id, delta):
+    if deck_id:
+        Deck.objects.filter(pk=deck_id).update(word_count=F("word_count") + delta, last_modified=timezone.now())
+
+
+@receiver(post_init, sender=UserVocabularyWord)
+def remember_loaded_deck(sender, instance, **kwargs):
+    # Mazo con el que se cargó la fila: permite saber en post_save si la palabra cambió de mazo.
+    # Se lee de __dict__ para no disparar una consulta por fila si el queryset difirió estos campos.
+    instance._loaded_deck = (instance.__dict__.get("deck"), instance.__dict__.get("deck_ref_id"))
+
+
+@receiver(pre_save, sender=UserVocabularyWord)
+def resolve_deck(sender, instance, **kwargs):
+    if instance.deck_ref_id and instance._loaded_deck == (instance.deck, instance.deck_ref_id):
+        return
+    key = normalize_deck_key(instance.deck)
+    deck, _ = Deck.objects.get_or_create(user_id=instance.user_id, key=key, defaults={"name": instance.deck.strip()})
+    instance.deck_ref = deck
+
+
+@receiver(post_save, sender=UserVocabularyWord)
+def count_saved_word(sender, instance, created, **kwargs):
+    previous_deck_id = None if created else instance._loaded_deck[1]
+    if previous_deck_id != instance.deck_ref_id:
+        _adjust(previous_deck_id, -1)
+        _adjust(instance.deck_ref_id, 1)
+    instance._loaded_deck = (instance.deck, instance.deck_ref_id)
+
+
+@receiver(post_delete, sender=UserVocabularyWord)
+def count_deleted_word(sender, instance, **kwargs):
+    _adjust(instance.__dict__.get("deck_ref_id"), -1)
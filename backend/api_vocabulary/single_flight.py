@@ -0,0 +1,143 @@
+# single_flight.py
+# Deduplicación de generaciones concurrentes de SharedVocabularyWord.
+# El primer request que reclama la clave genera el contenido; los demás esperan su resultado.
+# Mientras genera, un hilo renueva el heartbeat del claim; solo un claim sin señales durante
+# SINGLE_FLIGHT_STALE_SECONDS (proceso muerto) lo puede tomar otro.
+# ⚠️ Debe llamarse fuera de transaction.atomic(): el claim tiene que ser visible para otros procesos.
+
+import hashlib
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .models import GenerationClaim, SharedVocabularyWord
+
+POLL_INTERVAL = 0.25  # segundos entre comprobaciones mientras se espera a otro generador
+HEARTBEATS_PER_STALE_WINDOW = 4  # renovaciones del claim dentro de SINGLE_FLIGHT_STALE_SECONDS
+
+
+class GenerationWaitTimeout(Exception):
+    pass
+
+
+def content_key(word, source_lang, target_lang):
+    raw = f"{word}|{source_lang.code}|{target_lang.code}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def get_or_generate_shared(word, source_lang, target_lang, generate):
+    """
+    Devuelve el SharedVocabularyWord listo para (word, source_lang, target_lang).
+    Si no existe, `generate(shared)` se ejecuta exactamente una vez aunque lleguen varios requests a la vez.
+    """
+    key = content_key(word, source_lang, target_lang)
+    owner = f"{os.getpid()}:{threading.get_ident()}:{uuid.uuid4().hex[:8]}"
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT_TIMEOUT
+
+    while True:
+        shared = _ready_shared(word, source_lang, target_lang)
+        if shared:
+            return shared
+
+        if _try_claim(key, owner, word, source_lang, target_lang):
+            try:
+                # Doble comprobación: otro pudo terminar entre nuestra consulta y el claim
+                shared = _ready_shared(word, source_lang, target_lang)
+                if shared:
+                    return shared
+                with _heartbeat(key, owner):
+                    return _generate(word, source_lang, target_lang, generate)
+            finally:
+                GenerationClaim.objects.filter(key=key, owner=owner).delete()
+
+        print(f"[SINGLE-FLIGHT] Esperando la generación en curso de '{word}'", file=sys.stderr)
+        _wait_for_release(key, deadline)
+        if time.monotonic() >= deadline:
+            raise GenerationWaitTimeout(f"Tiempo de espera agotado generando '{word}'.")
+
+
+def _ready_shared(word, source_lang, target_lang):
+    # Una fila sin frase de ejemplo es un resto de una generación fallida: no está lista
+    return (
+        SharedVocabularyWord.objects.filter(
+            word=word, source_lang=source_lang, target_lang=target_lang
+        )
+        .exclude(example_sentence="")
+        .first()
+    )
+
+
+def _try_claim(key, owner, word, source_lang, target_lang):
+    try:
+        with transaction.atomic():
+            GenerationClaim.objects.create(
+                key=key, owner=owner, word=word, source_lang=source_lang, target_lang=target_lang
+            )
+        return True
+    except IntegrityError:
+        pass
+
+    # El dueño anterior dejó de dar señales (proceso muerto): tomamos su lugar
+    cutoff = timezone.now() - timedelta(seconds=settings.SINGLE_FLIGHT_STALE_SECONDS)
+    taken = GenerationClaim.objects.filter(key=key, heartbeat_at__lt=cutoff).update(
+        owner=owner, heartbeat_at=timezone.now()
+    )
+    return taken == 1
+
+
+@contextmanager
+def _heartbeat(key, owner):
+    """
+    Renueva heartbeat_at del claim desde un hilo mientras dura el bloque: una generación lenta (OpenAI con
+    reintentos, traducción y dos TTS) puede superar SINGLE_FLIGHT_STALE_SECONDS y no debe parecer abandonada.
+    """
+    stop = threading.Event()
+    interval = settings.SINGLE_FLIGHT_STALE_SECONDS / HEARTBEATS_PER_STALE_WINDOW
+
+    def beat():
+        try:
+            while not stop.wait(interval):
+                if not GenerationClaim.objects.filter(key=key, owner=owner).update(heartbeat_at=timezone.now()):
+                    print(f"[ERROR] Se perdió el claim de single-flight {key[:12]}", file=sys.stderr)
+                    return
+        except Exception as e:
+            print(f"[ERROR] No se pudo renovar el claim de single-flight: {e}", file=sys.stderr)
+        finally:
+            connection.close()  # Conexión propia del hilo
+
+    thread = threading.Thread(target=beat, name="single-flight-heartbeat", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _wait_for_release(key, deadline):
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        if not GenerationClaim.objects.filter(key=key).exists():
+            return
+
+
+def _generate(word, source_lang, target_lang, generate):
+    shared, created = SharedVocabularyWord.objects.get_or_create(
+        word=word, source_lang=source_lang, target_lang=target_lang
+    )
+    try:
+        generate(shared)
+    except Exception:
+        # No dejamos filas a medio generar que luego se reutilizarían vacías
+        if created:
+            shared.delete()
+        raise
+    return shared
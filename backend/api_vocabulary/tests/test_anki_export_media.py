@@ -0,0 +1,135 @@
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest.mock import Mock, PropertyMock
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import TestCase, override_settings
+from api_vocabulary.anki_exporter import fetch_media_files, generate_apkg_for_user
+from api_vocabulary.models import Language, SharedVocabularyWord, UserVocabularyWord
+from users.models import CustomUser
+
+
+class RemoteStorage:
+    """Storage sin rutas locales (como S3); registra la concurrencia de las lecturas."""
+    def __init__(self, broken=()):
+        self.broken = broken
+        self.active = self.peak = 0
+        self.opened = []
+        self.lock = threading.Lock()
+
+    def path(self, name):
+        raise NotImplementedError
+
+    def open(self, name, mode="rb"):
+        with self.lock:
+            self.opened.append(name)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.05)
+        with self.lock:
+            self.active -= 1
+        if name in self.broken:
+            raise FileNotFoundError(f"{name} no existe")
+        return io.BytesIO(name.encode() * 10000)
+
+
+def filefield(name, storage):
+    field = Mock(storage=storage)
+    field.name = name
+    type(field).url = PropertyMock(side_effect=AssertionError("no debe usarse la URL del CDN"))
+    return field
+
+
+@override_settings(MEDIA_CACHE_ENABLED=False)
+class FetchMediaFilesTests(TestCase):
+    def setUp(self):
+        self.dest = tempfile.mkdtemp()
+        self.media_root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dest, ignore_errors=True)
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_local_files_are_used_in_place(self):
+        storage = FileSystemStorage(location=self.media_root)
+        storage.save("audio/assets/ab/house.mp3", ContentFile(b"mp3"))
+
+        paths, failed = fetch_media_files(
+            [filefield("audio/assets/ab/house.mp3", storage), filefield("audio/assets/cd/gone.mp3", storage)], self.dest
+        )
+
+        self.assertEqual(paths, [os.path.join(self.media_root, "audio/assets/ab/house.mp3")])
+        self.assertEqual([item["file"] for item in failed], ["gone.mp3"])
+        self.assertEqual(os.listdir(self.dest), [])
+
+    def test_remote_files_are_streamed_in_parallel_and_failures_are_reported(self):
+        storage = RemoteStorage(broken={"audio/broken.mp3"})
+        fields = [filefield(f"audio/assets/{i}.mp3", storage) for i in range(6)] + [filefield("audio/broken.mp3", storage)]
+
+        paths, failed = fetch_media_files(fields, self.dest, max_workers=4)
+
+        self.assertEqual(len(paths), 6)
+        self.assertEqual(failed, [{"file": "broken.mp3", "reason": "audio/broken.mp3 no existe"}])
+        self.assertGreater(storage.peak, 1)
+        self.assertLessEqual(storage.peak, 4)
+        with open(os.path.join(self.dest, "0.mp3"), "rb") as f:
+            self.assertEqual(f.read(), b"audio/assets/0.mp3" * 10000)
+        self.assertFalse([name for name in os.listdir(self.dest) if name.endswith(".part")])
+
+    def test_shared_audio_is_read_once(self):
+        storage = RemoteStorage()
+        fields = [filefield("audio/assets/same.mp3", storage), filefield("audio/assets/same.mp3", storage), None]
+
+        paths, failed = fetch_media_files(fields, self.dest)
+
+        self.assertEqual(storage.opened, ["audio/assets/same.mp3"])
+        self.assertEqual((len(paths), failed), (1, []))
+
+    def test_s3_objects_are_read_with_get_object(self):
+        storage = Mock(bucket_name="bucket", spec=["bucket_name", "connection", "path", "_normalize_name"])
+        storage.path.side_effect = NotImplementedError
+        storage._normalize_name.side_effect = lambda name: f"audio/{name}"
+        client = storage.connection.meta.client
+        client.get_object.return_value = {"Body": io.BytesIO(b"mp3 bytes")}
+
+        paths, failed = fetch_media_files([filefield("assets/ab/house.mp3", storage)], self.dest)
+
+        client.get_object.assert_called_once_with(Bucket="bucket", Key="audio/assets/ab/house.mp3")
+        with open(paths[0], "rb") as f:
+            self.assertEqual(f.read(), b"mp3 bytes")
+
+
+class ExportMissingMediaTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+
+        self.user = CustomUser.objects.create_user(username="exporter", password="pass", email="e@example.com", is_active=True)
+        english = Language.objects.create(code="en", name="English")
+        spanish = Language.objects.create(code="es", name="Spanish")
+        shared = SharedVocabularyWord.objects.create(
+            word="house", source_lang=english, target_lang=spanish, translation="(n) casa",
+            example_sentence="This is my house.", example_translation="Esta es mi casa."
+        )
+        shared.audio_word.name = "audio/assets/ab/house.mp3"
+        shared.save()
+        UserVocabularyWord.objects.create(user=self.user, shared_word=shared, deck="General")
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_missing_audio_is_reported_and_the_deck_is_not_reused(self):
+        # El audio apunta a un archivo que no está en MEDIA_ROOT
+        first_path, _, first_failed = generate_apkg_for_user(self.user, deck_name="General")
+        second_path, _, second_failed = generate_apkg_for_user(self.user, deck_name="General")
+
+        self.assertEqual(first_failed, [{"file": "house.mp3", "reason": "El archivo no existe en el almacenamiento."}])
+        # Un mazo incompleto no queda en la ruta reutilizable: se reintenta en la siguiente exportación
+        self.assertEqual(second_failed, first_failed)
+        self.assertNotEqual(first_path, second_path)
@@ -0,0 +1,311 @@
+import io
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import zipfile
+from unittest.mock import patch
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from rest_framework.test import APITestCase
+from api_vocabulary.anki_exporter import generate_apkg_for_user, prepare_apkg_export
+from api_vocabulary.genanki_utils.model import get_flashlang_model
+from api_vocabulary.jobs import claim_next_job, run_export_job
+from api_vocabulary.models import Language, SharedVocabularyWord, UserVocabularyWord, DownloadHistory, DeckBuild, ExportArtifact, ExportJob
+from users.models import CustomUser
+
+URL = "/api/vocabulary/download-apkg/?deck_name=General"
+
+
+class StreamingApkgTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+
+        self.user = CustomUser.objects.create_user(username="streamer", password="pass", email="s@example.com", is_active=True)
+        self.client.force_authenticate(user=self.user)
+        english = Language.objects.create(code="en", name="English")
+        spanish = Language.objects.create(code="es", name="Spanish")
+        for word in ("house", "car"):
+            shared = SharedVocabularyWord.objects.create(
+                word=word, source_lang=english, target_lang=spanish, translation="(n) x",
+                example_sentence=f"My {word}.", example_translation="Mi x."
+            )
+            shared.audio_word.name = default_storage.save(f"audio/{word}.mp3", ContentFile(word.encode() * 1000))
+            shared.save()
+            UserVocabularyWord.objects.create(user=self.user, shared_word=shared, deck="General")
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_apkg_is_streamed_as_a_valid_package(self):
+        response = self.client.get(URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('filename="aiflashlang_General.apkg"', response["Content-Disposition"])
+
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        self.assertIsNone(archive.testzip())
+        media = json.loads(archive.read("media"))
+        self.assertEqual(sorted(media.values()), ["car.mp3", "house.mp3"])
+        for idx, name in media.items():
+            self.assertEqual(archive.read(idx), name.split(".")[0].encode() * 1000)
+
+        # Los audios van antes que la colección: el primer byte no espera a construir el mazo
+        self.assertEqual(archive.namelist()[-1], "collection.anki2")
+        with tempfile.NamedTemporaryFile(suffix=".anki2") as db_file:
+            db_file.write(archive.read("collection.anki2"))
+            db_file.flush()
+            self.assertEqual(sqlite3.connect(db_file.name).execute("SELECT COUNT(*) FROM notes").fetchone()[0], 2)
+
+    def test_complete_stream_is_kept_and_reused(self):
+        first = b"".join(self.client.get(URL).streaming_content)
+        second = self.client.get(URL)
+
+        self.assertEqual(b"".join(second.streaming_content), first)
+        self.assertEqual(DownloadHistory.objects.filter(user=self.user).count(), 2)
+        folder = os.path.join(self.media_root, "generated_apkg", f"user_{self.user.id}")
+        self.assertEqual([name for name in os.listdir(folder) if name.endswith(".part")], [])
+
+
+def read_collection(path):
+    with zipfile.ZipFile(path) as archive, tempfile.NamedTemporaryFile(suffix=".anki2") as db_file:
+        db_file.write(archive.read("collection.anki2"))
+        db_file.flush()
+        conn = sqlite3.connect(db_file.name)
+        guids = dict(conn.execute("SELECT sfld, guid FROM notes"))
+        deck_ids = {row[0] for row in conn.execute("SELECT DISTINCT did FROM cards")}
+        conn.close()
+        media = json.loads(archive.read("media"))
+        audio = {name: archive.read(idx) for idx, name in media.items()}
+    return guids, deck_ids, audio
+
+
+class IncrementalDeckBuildTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+
+        self.user = CustomUser.objects.create_user(username="builder", password="pass", email="b@example.com", is_active=True)
+        self.english = Language.objects.create(code="en", name="English")
+        self.spanish = Language.objects.create(code="es", name="Spanish")
+        for word in ("house", "car"):
+            self.add_word(word)
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def store_name(self, path):
+        return os.path.relpath(path, os.path.join(self.media_root, "generated_apkg"))
+
+    def add_word(self, word):
+        shared = SharedVocabularyWord.objects.create(
+            word=word, source_lang=self.english, target_lang=self.spanish, translation="(n) x",
+            example_sentence=f"My {word}.", example_translation="Mi x."
+        )
+        shared.audio_word.name = default_storage.save(f"audio/assets/ab/{word}.mp3", ContentFile(word.encode() * 100))
+        shared.save()
+        return UserVocabularyWord.objects.create(user=self.user, shared_word=shared, deck="General")
+
+    def test_model_is_built_once(self):
+        self.assertIs(get_flashlang_model(), get_flashlang_model())
+        self.assertIsNot(get_flashlang_model(allow_duplicates=True), get_flashlang_model())
+
+    def test_new_words_are_added_on_top_of_the_previous_build(self):
+        first_path, _, _ = generate_apkg_for_user(self.user, deck_name="General")
+        first_guids, first_decks, _ = read_collection(first_path)
+        build = DeckBuild.objects.get(user=self.user, deck_name="General")
+        self.assertEqual((build.archive_path, len(build.notes)), (self.store_name(first_path), 2))
+
+        # Los audios ya empaquetados se copian del .apkg anterior: el storage solo se lee para la palabra nueva
+        default_storage.delete("audio/assets/ab/house.mp3")
+        default_storage.delete("audio/assets/ab/car.mp3")
+        self.add_word("tree")
+        second_path, _, failed = generate_apkg_for_user(self.user, deck_name="General")
+
+        self.assertEqual(failed, [])
+        guids, deck_ids, audio = read_collection(second_path)
+        self.assertEqual(deck_ids, first_decks)
+        self.assertEqual({word: guids[word] for word in first_guids}, first_guids)
+        self.assertEqual(audio, {"house.mp3": b"house" * 100, "car.mp3": b"car" * 100, "tree.mp3": b"tree" * 100})
+        build.refresh_from_db()
+        self.assertEqual((build.archive_path, len(build.notes), len(build.media)), (self.store_name(second_path), 3, 3))
+
+    def test_export_by_ids_does_not_replace_the_deck_build(self):
+        '''Una selección de palabras se publica, pero el DeckBuild sigue siendo el del mazo completo'''
+        full_path, _, _ = generate_apkg_for_user(self.user, deck_name="General")
+        house = UserVocabularyWord.objects.get(shared_word__word="house")
+
+        subset_path, _, _ = generate_apkg_for_user(self.user, ids=[house.id])
+
+        self.assertNotEqual(subset_path, full_path)
+        self.assertTrue(ExportArtifact.objects.filter(user=self.user, path=self.store_name(subset_path)).exists())
+        build = DeckBuild.objects.get(user=self.user)
+        self.assertEqual((build.archive_path, len(build.notes)), (self.store_name(full_path), 2))
+
+    def test_removed_words_leave_the_build(self):
+        generate_apkg_for_user(self.user, deck_name="General")
+        UserVocabularyWord.objects.filter(shared_word__word="car").delete()
+
+        path, _, _ = generate_apkg_for_user(self.user, deck_name="General")
+
+        guids, _, audio = read_collection(path)
+        self.assertEqual(list(guids), ["house"])
+        self.assertEqual(list(audio), ["house.mp3"])
+        self.assertEqual(list(DeckBuild.objects.get(user=self.user).media), ["audio/assets/ab/house.mp3"])
+
+    def test_reuse_follows_content_changes(self):
+        first_path, _, _ = generate_apkg_for_user(self.user, deck_name="General")
+        with patch("api_vocabulary.anki_exporter.stream_apkg") as mock_stream:
+            again_path, _, _ = generate_apkg_for_user(self.user, deck_name="General")
+        mock_stream.assert_not_called()
+        self.assertEqual(again_path, first_path)
+
+        # Regenerar el contenido de una palabra invalida el .apkg cacheado
+        shared = SharedVocabularyWord.objects.get(word="car")
+        shared.translation = "(n) coche"
+        shared.save()
+        updated_path, _, _ = generate_apkg_for_user(self.user, deck_name="General")
+
+        self.assertNotEqual(updated_path, first_path)
+        with zipfile.ZipFile(updated_path) as archive, tempfile.NamedTemporaryFile(suffix=".anki2") as db_file:
+            db_file.write(archive.read("collection.anki2"))
+            db_file.flush()
+            fields = dict(sqlite3.connect(db_file.name).execute("SELECT sfld, flds FROM notes"))
+        self.assertIn("(n) coche", fields["car"])
+        self.assertEqual(ExportArtifact.objects.filter(user=self.user).count(), 2)
+
+    def test_missing_artifact_file_is_rebuilt(self):
+        path, _, _ = generate_apkg_for_user(self.user, deck_name="General")
+        os.remove(path)
+
+        rebuilt_path, _, failed = generate_apkg_for_user(self.user, deck_name="General")
+
+        self.assertEqual((rebuilt_path, failed), (path, []))
+        self.assertTrue(os.path.exists(rebuilt_path))
+        self.assertEqual(ExportArtifact.objects.get(user=self.user).size, os.path.getsize(path))
+
+
+class DeltaExportTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+
+        self.user = CustomUser.objects.create_user(username="delta", password="pass", email="d@example.com", is_active=True)
+        self.client.force_authenticate(user=self.user)
+        self.english = Language.objects.create(code="en", name="English")
+        self.spanish = Language.objects.create(code="es", name="Spanish")
+        self.words = [self.add_word(word) for word in ("house", "car")]
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def add_word(self, word):
+        shared = SharedVocabularyWord.objects.create(
+            word=word, source_lang=self.english, target_lang=self.spanish, translation="(n) x",
+            example_sentence=f"My {word}.", example_translation="Mi x."
+        )
+        shared.audio_word.name = default_storage.save(f"audio/assets/ab/{word}.mp3", ContentFile(word.encode() * 100))
+        shared.save()
+        return UserVocabularyWord.objects.create(user=self.user, shared_word=shared, deck="General")
+
+    def test_only_new_and_changed_words_are_exported_with_the_same_guids(self):
+        full_path, _, _ = generate_apkg_for_user(self.user, deck_name="General")
+        full_guids, full_decks, _ = read_collection(full_path)
+        build = DeckBuild.objects.get(user=self.user)
+
+        tree = self.add_word("tree")
+        shared = SharedVocabularyWord.objects.get(word="car")
+        shared.translation = "(n) coche"
+        shared.save()
+        delta_path, _, failed = generate_apkg_for_user(self.user, deck_name="General", since_last_download=True)
+
+        guids, deck_ids, audio = read_collection(delta_path)
+        self.assertEqual(failed, [])
+        self.assertEqual(set(guids), {"car", "tree"})
+        self.assertEqual(guids["car"], full_guids["car"])
+        self.assertEqual(deck_ids, full_decks)
+        self.assertEqual(set(audio), {"car.mp3", "tree.mp3"})
+
+        # El delta no reemplaza el mazo completo: el DeckBuild y el índice reutilizable siguen intactos
+        build_after = DeckBuild.objects.get(user=self.user)
+        self.assertEqual((build_after.archive_path, build_after.notes), (build.archive_path, build.notes))
+        self.assertEqual(ExportArtifact.objects.filter(user=self.user).exclude(fingerprint="").count(), 1)
+
+        history = DownloadHistory.objects.filter(user=self.user).latest("created_at")
+        self.assertTrue(history.delta)
+        expected_ids = sorted([w.id for w in self.words] + [tree.id])
+        self.assertEqual([int(i) for i in history.word_ids.split(",")], expected_ids)
+
+    def test_nothing_new_returns_404_and_first_delta_is_a_full_export(self):
+        response = self.client.get(f"{URL}&since_last_download=true")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("_nuevas", response["Content-Disposition"])
+        b"".join(response.streaming_content)
+        self.assertEqual(DownloadHistory.objects.get(user=self.user).word_ids.count(","), 1)
+
+        response = self.client.get(f"{URL}&since_last_download=true")
+        self.assertEqual(response.status_code, 404)
+
+    def test_form_encoded_flag_requests_a_delta(self):
+        '''Desde un formulario la bandera llega como texto ("true"), igual que en /api/export-jobs/'''
+        b"".join(self.client.get(URL).streaming_content)
+        self.add_word("tree")
+
+        response = self.client.post(
+            "/api/vocabulary/download-apkg/", {"deck_name": "General", "since_last_download": "true"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("_nuevas", response["Content-Disposition"])
+        guids, _, _ = read_collection(io.BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(list(guids), ["tree"])
+
+    def test_aborted_download_is_not_recorded(self):
+        response = self.client.get(URL)
+        next(response.streaming_content)  # El cliente corta la descarga después del primer chunk
+
+        self.assertFalse(DownloadHistory.objects.exists())
+        response = self.client.get(f"{URL}&since_last_download=true")
+        self.assertNotIn("_nuevas", response["Content-Disposition"])
+        b"".join(response.streaming_content)
+
+    def test_words_edited_while_the_deck_is_built_go_in_the_next_delta(self):
+        car = SharedVocabularyWord.objects.get(word="car")
+
+        def edit_car(stage, done, total):
+            if stage == "notes" and done == 1:
+                car.translation = "(n) coche"
+                car.save()
+
+        export = prepare_apkg_export(self.user, deck_name="General", on_progress=edit_car)
+        for _ in export.stream():
+            pass
+        export.record_download()
+
+        delta = prepare_apkg_export(self.user, deck_name="General", since_last_download=True)
+        self.assertEqual([w.shared_word.word for w in delta.user_words], ["car"])
+
+    def test_job_download_counts_once_the_artifact_is_delivered(self):
+        job = ExportJob.objects.create(user=self.user, deck_name="General")
+        run_export_job(claim_next_job("test-worker", model=ExportJob))
+        job.refresh_from_db()
+
+        self.assertFalse(job.history.delivered)
+        self.assertFalse(prepare_apkg_export(self.user, deck_name="General", since_last_download=True).delta)
+
+        response = self.client.get(f"/api/export-jobs/{job.id}/download/")
+        b"".join(response.streaming_content)
+        job.history.refresh_from_db()
+        self.assertTrue(job.history.delivered)
+        with self.assertRaises(ValueError):
+            prepare_apkg_export(self.user, deck_name="General", since_last_download=True)
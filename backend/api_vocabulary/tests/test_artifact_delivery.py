@@ -0,0 +1,100 @@
+import shutil
+import tempfile
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import RequestFactory, TestCase, override_settings
+from api_vocabulary.artifact_delivery import deliver_artifact
+from api_vocabulary.export_store import ExportStore
+from api_vocabulary.models import ExportArtifact
+from users.models import CustomUser
+
+
+class SigningBucket(FileSystemStorage):
+    """Storage remoto (sin rutas locales) que firma URLs como S3."""
+    querystring_auth = True
+
+    def path(self, name):
+        raise NotImplementedError
+
+    def _open(self, name, mode="rb"):
+        return File(open(FileSystemStorage.path(self, name), mode))
+
+    def url(self, name, parameters=None, expire=None, http_method=None):
+        self.signed = (name, parameters, expire)
+        return f"https://bucket.example.com/exports/{name}?X-Amz-Expires={expire}"
+
+
+class ArtifactDeliveryTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.factory = RequestFactory()
+        self.user = CustomUser.objects.create_user(username="deliver", password="pass", email="d@example.com", is_active=True)
+        self.local = ExportStore(FileSystemStorage(location=self.root))
+        self.local.storage.save(f"user_{self.user.id}/deck.apkg", ContentFile(b"apkg" * 100))
+        self.artifact = ExportArtifact.objects.create(
+            user=self.user, deck_name="General", fingerprint="f" * 64, path=f"user_{self.user.id}/deck.apkg",
+            size=400, sha256="a" * 64
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def deliver(self, store, **headers):
+        return deliver_artifact(self.factory.get("/download/", **headers), self.artifact, "deck.apkg", store)
+
+    @override_settings(EXPORT_DELIVERY="x-accel", EXPORT_ACCEL_PREFIX="/protected-exports/")
+    def test_x_accel_hands_the_file_to_the_proxy(self):
+        response = self.deliver(self.local)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected-exports/user_{self.user.id}/deck.apkg")
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], '"' + "a" * 64 + '"')
+        self.assertIn('filename="deck.apkg"', response["Content-Disposition"])
+        self.assertEqual(self.deliver(self.local, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+    @override_settings(EXPORT_DELIVERY="x-sendfile")
+    def test_x_sendfile_uses_the_absolute_path(self):
+        response = self.deliver(self.local)
+        self.assertEqual(response["X-Sendfile"], self.local.local_path(self.artifact.path))
+
+    @override_settings(EXPORT_DELIVERY="auto", EXPORT_PRESIGNED_TTL=120)
+    def test_remote_artifacts_redirect_to_a_short_lived_signed_url(self):
+        bucket = ExportStore(SigningBucket(location=self.root))
+
+        response = self.deliver(bucket)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response["Location"].startswith("https://bucket.example.com/exports/"))
+        name, parameters, expire = bucket.storage.signed
+        self.assertEqual((name, expire), (self.artifact.path, 120))
+        self.assertEqual(parameters, {"ResponseContentDisposition": 'attachment; filename="deck.apkg"'})
+
+        as_json = deliver_artifact(self.factory.get("/download/?redirect=false"), self.artifact, "deck.apkg", bucket)
+        self.assertEqual(as_json.status_code, 200)
+        self.assertIn('"expires_in": 120', as_json.content.decode())
+
+    @override_settings(EXPORT_DELIVERY="x-accel")
+    def test_unsupported_mode_falls_back_to_streaming(self):
+        response = self.deliver(ExportStore(SigningBucket(location=self.root)))
+        self.assertTrue(response.streaming)
+        self.assertEqual(b"".join(response.streaming_content), b"apkg" * 100)
+
+    @override_settings(EXPORT_DELIVERY="auto")
+    def test_local_store_streams_by_default(self):
+        self.assertTrue(self.deliver(self.local).streaming)
+
+    @override_settings(
+        EXPORT_DELIVERY="auto", EXPORT_PRESIGNED_TTL=120,
+        AWS_STORAGE_BUCKET_NAME="exports-bucket", AWS_S3_CUSTOM_DOMAIN="cdn.example.com"
+    )
+    def test_export_storage_signs_urls_despite_the_custom_domain(self):
+        '''El dominio público de los audios no se aplica a los .apkg privados: la redirección sigue firmada'''
+        from config.storages import ExportStorage
+
+        bucket = ExportStore(ExportStorage(access_key="test", secret_key="test", region_name="us-east-1"))
+        location = self.deliver(bucket)["Location"]
+
+        self.assertNotIn("cdn.example.com", location)
+        self.assertIn("X-Amz-Signature=", location)
+        self.assertIn("X-Amz-Expires=120", location)
@@ -0,0 +1,95 @@
+import shutil
+import tempfile
+from unittest.mock import patch
+from django.test import TestCase, override_settings
+from api_vocabulary.audio_utils import generate_gtts_audio_for_word, generate_gtts_audio_for_sentence
+from api_vocabulary.models import Language, SharedVocabularyWord, AudioAsset
+from api_vocabulary.tts_backends import Pyttsx3Backend
+
+
+def fake_synthesize(text, lang_code):
+    return f"{lang_code}:{text}".encode("utf-8")
+
+
+@patch("api_vocabulary.tts_backends.synthesize_gtts", side_effect=fake_synthesize)
+class AudioAssetTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+
+        self.english = Language.objects.create(code="en", name="English")
+        self.spanish = Language.objects.create(code="es", name="Spanish")
+        self.french = Language.objects.create(code="fr", name="French")
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def shared(self, target_lang, sentence="This is my house."):
+        return SharedVocabularyWord.objects.create(
+            word="house", source_lang=self.english, target_lang=target_lang, example_sentence=sentence
+        )
+
+    def test_same_word_is_synthesized_once_across_language_pairs(self, mock_synthesize):
+        to_spanish = self.shared(self.spanish)
+        to_french = self.shared(self.french)
+
+        generate_gtts_audio_for_word(to_spanish)
+        generate_gtts_audio_for_word(to_french)
+
+        mock_synthesize.assert_called_once_with("house", "en")
+        self.assertEqual(AudioAsset.objects.count(), 1)
+        self.assertEqual(to_spanish.audio_word.name, to_french.audio_word.name)
+        self.assertEqual(to_spanish.audio_word_asset_id, to_french.audio_word_asset_id)
+
+    def test_asset_path_is_derived_from_the_content_hash(self, mock_synthesize):
+        shared = self.shared(self.spanish)
+        generate_gtts_audio_for_sentence(shared)
+
+        asset = AudioAsset.objects.get()
+        self.assertEqual(shared.audio_sentence.name, f"audio/assets/{asset.key[:2]}/{asset.key}.mp3")
+        self.assertEqual(asset.size, len(fake_synthesize("This is my house.", "en")))
+        with shared.audio_sentence.open("rb") as f:
+            self.assertEqual(f.read(), b"en:This is my house.")
+
+    def test_different_text_or_language_gets_its_own_asset(self, mock_synthesize):
+        generate_gtts_audio_for_word(self.shared(self.spanish))
+        generate_gtts_audio_for_sentence(self.shared(self.french, sentence="Another sentence."))
+        self.assertEqual(AudioAsset.objects.count(), 2)
+
+    def test_existing_blob_is_not_synthesized_again(self, mock_synthesize):
+        shared = self.shared(self.spanish)
+        generate_gtts_audio_for_word(shared)
+        AudioAsset.objects.all().delete()
+
+        generate_gtts_audio_for_word(self.shared(self.french))
+
+        mock_synthesize.assert_called_once()
+        self.assertEqual(AudioAsset.objects.count(), 1)
+
+    def test_language_selects_its_tts_backend_and_voice(self, mock_synthesize):
+        self.english.tts_backend = "pyttsx3"
+        self.english.tts_voice = "english-us"
+        self.english.save()
+        shared = self.shared(self.spanish)
+
+        with patch.object(Pyttsx3Backend, "synthesize", return_value=b"RIFF....WAVE") as mock_local:
+            generate_gtts_audio_for_word(shared)
+
+        mock_local.assert_called_once_with("house", "en", "english-us")
+        mock_synthesize.assert_not_called()
+        asset = AudioAsset.objects.get()
+        self.assertEqual((asset.format, asset.voice), ("wav", "pyttsx3:english-us"))
+        self.assertTrue(shared.audio_word.name.endswith(".wav"))
+
+    def test_gtts_voice_is_passed_as_accent(self, mock_synthesize):
+        self.spanish.tts_voice = "com.mx"
+        self.spanish.save()
+        shared = SharedVocabularyWord.objects.create(word="casa", source_lang=self.spanish, target_lang=self.english)
+
+        with patch("api_vocabulary.tts_backends.synthesize_gtts", return_value=b"mp3") as mock_accent:
+            generate_gtts_audio_for_word(shared)
+
+        mock_accent.assert_called_once_with("casa", "es", tld="com.mx")
+        self.assertEqual(AudioAsset.objects.get().voice, "com.mx")
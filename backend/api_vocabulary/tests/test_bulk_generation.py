@@ -0,0 +1,95 @@
+import json
+from unittest.mock import Mock, patch
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework import status
+from rest_framework.test import APITestCase
+from users.models import CustomUser
+from api_vocabulary.models import Language, SharedVocabularyWord, UserVocabularyWord
+from api_vocabulary.views import UserVocabularyWordViewSet
+from api_vocabulary.tests.test_generation_pipeline import fake_audio_blob
+
+
+def completion(content):
+    return Mock(choices=[Mock(message=Mock(content=content))])
+
+
+BATCH_RESPONSE = json.dumps({"items": [
+    {"word": "house", "example_sentence": "This is my house.", "translation": "(n) casa"},
+    {"word": "run", "example_sentence": "I run every day.", "translation": "(v.) correr"},
+    # Traducción con forma de oración: debe generarse de forma individual
+    {"word": "blue", "example_sentence": "The sky is blue.", "translation": "El cielo es azul y muy bonito hoy."},
+]})
+
+SINGLE_RESPONSE = "Example sentence:\nMy car is blue.\n\nTranslation:\n(adj.) azul"
+
+
+@patch("api_vocabulary.generation_pipeline.store_audio_blob", side_effect=fake_audio_blob)
+@patch("api_vocabulary.views.UserVocabularyWordViewSet.translate_with_google_cloud", return_value="traducción")
+@patch("api_vocabulary.views.translate_batch", side_effect=lambda texts, source, target: [f"lote:{t}" for t in texts])
+class BulkBatchGenerationTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username="bulkuser", password="pass", email="bulk@example.com", is_active=True
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.english = Language.objects.create(code="en", name="English")
+        self.spanish = Language.objects.create(code="es", name="Spanish")
+
+    def upload(self, words):
+        lines = ["word,source_lang_code,target_lang_code,deck"] + [f"{w},en,es,Lote" for w in words]
+        csv_file = SimpleUploadedFile("words.csv", "\n".join(lines).encode("utf-8"), content_type="text/csv")
+        return self.client.post("/api/bulk-upload-vocabulary/", {"file": csv_file}, format="multipart")
+
+    def test_one_batch_call_with_fallback_for_invalid_items(self, mock_translate_batch, mock_translate, *mocks):
+        client = Mock()
+        client.chat.completions.create.side_effect = [completion(BATCH_RESPONSE), completion(SINGLE_RESPONSE)]
+
+        with patch.object(UserVocabularyWordViewSet, "get_openai_client", return_value=client):
+            response = self.upload(["house", "run", "blue"])
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data["success"], 3)
+        # Una llamada por lote + una individual para el elemento inválido
+        self.assertEqual(client.chat.completions.create.call_count, 2)
+        self.assertEqual(SharedVocabularyWord.objects.get(word="run").translation, "(v.) correr")
+        self.assertEqual(SharedVocabularyWord.objects.get(word="blue").translation, "(adj.) azul")
+        self.assertEqual(UserVocabularyWord.objects.filter(user=self.user, deck="Lote").count(), 3)
+
+        # Las frases del lote se traducen juntas; solo la palabra individual usa Translate por separado
+        mock_translate_batch.assert_called_once()
+        self.assertEqual(SharedVocabularyWord.objects.get(word="run").example_translation, "lote:I run every day.")
+        mock_translate.assert_called_once()
+
+    def test_existing_shared_words_are_not_sent_to_the_batch(self, *mocks):
+        SharedVocabularyWord.objects.create(
+            word="house", source_lang=self.english, target_lang=self.spanish,
+            translation="(n) casa", example_sentence="This is my house.", example_translation="Esta es mi casa."
+        )
+        client = Mock()
+        client.chat.completions.create.return_value = completion(json.dumps({"items": [
+            {"word": "run", "example_sentence": "I run every day.", "translation": "(v.) correr"},
+        ]}))
+
+        with patch.object(UserVocabularyWordViewSet, "get_openai_client", return_value=client):
+            response = self.upload(["house", "run"])
+
+        self.assertEqual(response.data["success"], 2)
+        client.chat.completions.create.assert_called_once()
+        prompt = client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+        self.assertIn('"run"', prompt)
+        self.assertNotIn('"house"', prompt)
+
+
+class ExtractBatchResponseTests(APITestCase):
+    def test_invalid_json_yields_no_items(self):
+        self.assertEqual(UserVocabularyWordViewSet().extract_batch_response_data("no es json", ["house"]), {})
+
+    def test_unknown_and_incomplete_items_are_discarded(self):
+        content = json.dumps({"items": [
+            {"word": "House", "example_sentence": "My house.", "translation": "(n) casa"},
+            {"word": "tree", "example_sentence": "A tree.", "translation": "(n) árbol"},
+            {"word": "run", "example_sentence": "", "translation": "(v.) correr"},
+        ]})
+        result = UserVocabularyWordViewSet().extract_batch_response_data(content, ["house", "run"])
+        self.assertEqual(result, {"house": ("My house.", "(n) casa")})
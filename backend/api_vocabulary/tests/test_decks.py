@@ -0,0 +1,70 @@
+import shutil
+import tempfile
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from api_vocabulary.anki_exporter import prepare_apkg_export
+from api_vocabulary.models import Deck, DeckBuild, Language, SharedVocabularyWord, UserVocabularyWord
+from users.models import CustomUser
+
+
+class DeckTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username="decker", password="pass", email="d@example.com", is_active=True)
+        self.client.force_authenticate(user=self.user)
+        self.english = Language.objects.create(code="en", name="English")
+        self.spanish = Language.objects.create(code="es", name="Spanish")
+        self.count = 0
+
+    def add_word(self, deck, user=None):
+        self.count += 1
+        shared = SharedVocabularyWord.objects.create(
+            word=f"word{self.count}", source_lang=self.english, target_lang=self.spanish, translation="(n) x",
+            example_sentence="", example_translation=""
+        )
+        return UserVocabularyWord.objects.create(user=user or self.user, shared_word=shared, deck=deck)
+
+    def test_counts_follow_create_move_and_delete(self):
+        first = self.add_word("General")
+        self.add_word("general ")
+        travel = self.add_word("Travel")
+
+        general = Deck.objects.get(user=self.user, key="general")
+        self.assertEqual((general.name, general.word_count), ("General", 2))
+        self.assertEqual(first.deck_ref, general)
+
+        travel.deck = "GENERAL"
+        travel.save()
+        first.delete()
+
+        counts = dict(Deck.objects.filter(user=self.user).values_list("key", "word_count"))
+        self.assertEqual(counts, {"general": 2, "travel": 0})
+
+    def test_deck_list_and_filter(self):
+        for _ in range(3):
+            self.add_word("Verbs")
+        self.add_word("Nouns")
+        self.add_word("Verbs", user=CustomUser.objects.create_user(username="other", password="pass", email="o@example.com"))
+
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/decks/")
+
+        self.assertEqual([(d["name"], d["word_count"]) for d in response.data], [("Nouns", 1), ("Verbs", 3)])
+        self.assertEqual(len(self.client.get("/api/vocabulary/", {"deck": "verbs"}).data), 3)
+
+    def test_exports_use_the_deck_key(self):
+        self.add_word("General")
+        self.add_word("general ")
+        self.add_word("Travel")
+
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        with override_settings(MEDIA_ROOT=media_root):
+            export = prepare_apkg_export(self.user, deck_name="GENERAL")
+            for _ in export.stream():
+                pass
+
+        deck = self.client.get("/api/decks/").data[0]
+        self.assertEqual((deck["name"], deck["word_count"]), ("General", len(export.user_words)))
+        self.assertEqual(export.filename, "aiflashlang_General.apkg")
+        self.assertEqual(DeckBuild.objects.get(user=self.user).deck_key, "general")
+        self.assertEqual(self.client.post("/api/export-jobs/", {"deck_name": "general"}).status_code, 202)
@@ -0,0 +1,113 @@
+import io
+import shutil
+import tempfile
+import zipfile
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+from api_vocabulary.jobs import claim_next_job, run_export_job
+from api_vocabulary.models import ExportJob, Language, SharedVocabularyWord, UserVocabularyWord
+from users.models import CustomUser
+
+
+class ExportJobTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+
+        self.user = CustomUser.objects.create_user(username="exportjob", password="pass", email="ej@example.com", is_active=True)
+        self.client.force_authenticate(user=self.user)
+        english = Language.objects.create(code="en", name="English")
+        spanish = Language.objects.create(code="es", name="Spanish")
+        for word in ("house", "car", "tree"):
+            shared = SharedVocabularyWord.objects.create(
+                word=word, source_lang=english, target_lang=spanish, translation="(n) x",
+                example_sentence=f"My {word}.", example_translation="Mi x."
+            )
+            shared.audio_word.name = default_storage.save(f"audio/assets/ab/{word}.mp3", ContentFile(word.encode() * 500))
+            shared.save()
+            UserVocabularyWord.objects.create(user=self.user, shared_word=shared, deck="General")
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def enqueue(self, **data):
+        return self.client.post("/api/export-jobs/", {"deck_name": "General", **data}, format="json")
+
+    def finished_job(self):
+        job_id = self.enqueue().data["id"]
+        run_export_job(claim_next_job("test-worker", model=ExportJob))
+        return self.client.get(f"/api/export-jobs/{job_id}/").data
+
+    def test_post_enqueues_without_building(self):
+        response = self.enqueue()
+        again = self.enqueue()
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], ExportJob.STATUS_PENDING)
+        self.assertIsNone(response.data["download_url"])
+        self.assertEqual(again.data["id"], response.data["id"])
+        self.assertEqual(self.enqueue(deck_name="Vacío").status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_form_flags_are_parsed_as_booleans(self):
+        response = self.client.post(
+            "/api/export-jobs/", {"deck_name": "General", "allow_duplicates": "false", "since_last_download": "true"}
+        )
+
+        job = ExportJob.objects.get(pk=response.data["id"])
+        self.assertEqual((job.allow_duplicates, job.since_last_download), (False, True))
+
+    def test_worker_reports_progress_and_result(self):
+        data = self.finished_job()
+
+        self.assertEqual((data["status"], data["progress"]), (ExportJob.STATUS_DONE, 100))
+        self.assertEqual((data["notes_rendered"], data["notes_total"]), (3, 3))
+        self.assertEqual((data["media_fetched"], data["media_total"]), (3, 3))
+        self.assertEqual(data["failed_media"], [])
+        self.assertTrue(data["download_url"].endswith(f"/api/export-jobs/{data['id']}/download/"))
+
+    def test_download_supports_validators_and_ranges(self):
+        url = self.finished_job()["download_url"]
+
+        full = self.client.get(url)
+        self.assertEqual(full.status_code, status.HTTP_200_OK)
+        body = b"".join(full.streaming_content)
+        self.assertIsNone(zipfile.ZipFile(io.BytesIO(body)).testzip())
+        self.assertEqual(full["Content-Length"], str(len(body)))
+        self.assertEqual(full["Accept-Ranges"], "bytes")
+        etag, last_modified = full["ETag"], full["Last-Modified"]
+
+        # Retomar una descarga cortada
+        partial = self.client.get(url, HTTP_RANGE="bytes=100-", HTTP_IF_RANGE=etag)
+        self.assertEqual(partial.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(partial["Content-Range"], f"bytes 100-{len(body) - 1}/{len(body)}")
+        self.assertEqual(b"".join(partial.streaming_content), body[100:])
+
+        suffix = self.client.get(url, HTTP_RANGE="bytes=-10")
+        self.assertEqual(b"".join(suffix.streaming_content), body[-10:])
+
+        # Si el archivo cambió, If-Range devuelve el archivo completo
+        stale = self.client.get(url, HTTP_RANGE="bytes=100-", HTTP_IF_RANGE='"otro"')
+        self.assertEqual(stale.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, status.HTTP_304_NOT_MODIFIED)
+        unsatisfiable = self.client.get(url, HTTP_RANGE=f"bytes={len(body)}-")
+        self.assertEqual(unsatisfiable.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(unsatisfiable["Content-Range"], f"bytes */{len(body)}")
+
+    def test_download_before_the_job_finishes_is_a_conflict(self):
+        job_id = self.enqueue().data["id"]
+        response = self.client.get(f"/api/export-jobs/{job_id}/download/")
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_jobs_are_private_to_their_owner(self):
+        job_id = self.enqueue().data["id"]
+        other = CustomUser.objects.create_user(username="other", password="pass", email="other@example.com", is_active=True)
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(f"/api/export-jobs/{job_id}/").status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(f"/api/export-jobs/{job_id}/download/").status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,142 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from api_vocabulary.anki_exporter import generate_apkg_for_user
+from api_vocabulary.export_store import ExportStore, enforce_user_quota, sweep_artifacts, sweep_orphans
+from api_vocabulary.models import DeckBuild, DownloadHistory, ExportArtifact, Language, SharedVocabularyWord, UserVocabularyWord
+from users.models import CustomUser
+
+
+class BucketStorage:
+    """Storage sin rutas locales (como S3)."""
+    def __init__(self, location):
+        self.files = FileSystemStorage(location=location)
+
+    def path(self, name):
+        raise NotImplementedError
+
+    def save(self, name, content):
+        return self.files.save(name, content)
+
+    def open(self, name, mode="rb"):
+        return self.files.open(name, mode)
+
+    def exists(self, name):
+        return self.files.exists(name)
+
+    def delete(self, name):
+        self.files.delete(name)
+
+
+@override_settings(EXPORT_USER_QUOTA_BYTES=250, EXPORT_GLOBAL_QUOTA_BYTES=400, EXPORT_MAX_AGE_DAYS=30, EXPORT_ONE_OFF_MAX_AGE_HOURS=24)
+class ExportRetentionTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = ExportStore(FileSystemStorage(location=self.root))
+        self.alice = CustomUser.objects.create_user(username="alice", password="pass", email="a@example.com", is_active=True)
+        self.bob = CustomUser.objects.create_user(username="bob", password="pass", email="b@example.com", is_active=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def artifact(self, user, name, size=100, days_ago=0, fingerprint=None):
+        path = self.store.name_for(user.id, name)
+        self.store.storage.save(path, ContentFile(b"x" * size))
+        used = timezone.now() - timedelta(days=days_ago)
+        artifact = ExportArtifact.objects.create(
+            user=user, deck_name="General", path=path, size=size, fingerprint=name if fingerprint is None else fingerprint
+        )
+        ExportArtifact.objects.filter(pk=artifact.pk).update(created_at=used, last_used_at=used)
+        return ExportArtifact.objects.get(pk=artifact.pk)
+
+    def paths(self):
+        return sorted(ExportArtifact.objects.values_list("path", flat=True))
+
+    def test_user_quota_evicts_least_recently_used(self):
+        old = self.artifact(self.alice, "old.apkg", days_ago=3)
+        self.artifact(self.alice, "mid.apkg", days_ago=2)
+        new = self.artifact(self.alice, "new.apkg", days_ago=1)
+        history = DownloadHistory.objects.create(user=self.alice, deck_name="General", word_ids="1", file_path=old.path, artifact=old)
+        DeckBuild.objects.create(user=self.alice, deck_name="General", deck_id=1, archive_path=old.path, media={"a": "0"})
+
+        enforce_user_quota(self.alice, keep=new, store=self.store)
+
+        self.assertEqual(self.paths(), [f"user_{self.alice.id}/mid.apkg", f"user_{self.alice.id}/new.apkg"])
+        self.assertFalse(self.store.exists(old.path))
+        history.refresh_from_db()
+        self.assertEqual((history.file_path, history.artifact), ("", None))
+        self.assertEqual(DeckBuild.objects.get(user=self.alice).archive_path, "")
+
+    def test_sweep_expires_by_age_then_applies_quotas(self):
+        self.artifact(self.alice, "stale.apkg", days_ago=40)
+        self.artifact(self.alice, "oneoff.apkg", days_ago=2, fingerprint="")
+        self.artifact(self.alice, "a1.apkg", days_ago=5)
+        self.artifact(self.alice, "a2.apkg", days_ago=1)
+        self.artifact(self.bob, "b1.apkg", size=150, days_ago=6)
+        self.artifact(self.bob, "b2.apkg", size=100, days_ago=0)
+
+        removed = sweep_artifacts(store=self.store)
+
+        self.assertEqual(sorted(a.path.split("/")[1] for a in removed["expired"]), ["oneoff.apkg", "stale.apkg"])
+        self.assertEqual(removed["user_quota"], [])
+        # 450 bytes en total > 400: se expulsa el menos usado de todos
+        self.assertEqual([a.path.split("/")[1] for a in removed["global_quota"]], ["b1.apkg"])
+        self.assertEqual(len(self.paths()), 3)
+
+    def test_dry_run_deletes_nothing(self):
+        self.artifact(self.alice, "stale.apkg", days_ago=40)
+        out = StringIO()
+        with override_settings(MEDIA_ROOT=self.root + "/media"):
+            call_command("sweep_exports", "--dry-run", stdout=out)
+        self.assertIn("expired: 1 artefactos (100 bytes)", out.getvalue())
+        self.assertEqual(len(self.paths()), 1)
+
+    def test_orphans_are_removed_after_min_age(self):
+        self.artifact(self.alice, "kept.apkg")
+        self.store.storage.save(f"user_{self.alice.id}/legacy.apkg", ContentFile(b"old"))
+
+        self.assertEqual(sweep_orphans(3600, store=self.store), [])
+        self.assertEqual(sweep_orphans(-1, store=self.store), [f"user_{self.alice.id}/legacy.apkg"])
+        self.assertEqual(sorted(os.listdir(os.path.join(self.root, f"user_{self.alice.id}"))), ["kept.apkg"])
+
+
+class RemoteExportStoreTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.bucket = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+
+        self.user = CustomUser.objects.create_user(username="remote", password="pass", email="r@example.com", is_active=True)
+        english = Language.objects.create(code="en", name="English")
+        spanish = Language.objects.create(code="es", name="Spanish")
+        shared = SharedVocabularyWord.objects.create(
+            word="house", source_lang=english, target_lang=spanish, translation="(n) casa",
+            example_sentence="My house.", example_translation="Mi casa."
+        )
+        UserVocabularyWord.objects.create(user=self.user, shared_word=shared, deck="General")
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        shutil.rmtree(self.bucket, ignore_errors=True)
+
+    def test_artifacts_are_uploaded_and_reused_from_object_storage(self):
+        with patch("api_vocabulary.export_store._default_storage", return_value=BucketStorage(self.bucket)):
+            name, _, failed = generate_apkg_for_user(self.user, deck_name="General")
+            again, _, _ = generate_apkg_for_user(self.user, deck_name="General")
+
+        self.assertEqual((failed, again), ([], name))
+        self.assertTrue(name.startswith(f"user_{self.user.id}/"))
+        self.assertTrue(os.path.exists(os.path.join(self.bucket, name)))
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, "generated_apkg")))
+        history = DownloadHistory.objects.filter(user=self.user)
+        self.assertEqual({h.file_path for h in history}, {name})
@@ -0,0 +1,122 @@
+from unittest.mock import patch
+from rest_framework import status
+from rest_framework.test import APITestCase
+from users.models import CustomUser
+from api_vocabulary.models import CustomWordContent, Language, SharedVocabularyWord, UserVocabularyWord, GenerationJob
+from api_vocabulary.jobs import claim_next_job, run_generation_job
+
+
+def fake_generate_content_for_shared(self, shared):
+    shared.translation = "(n) casa"
+    shared.example_sentence = "This is my house."
+    shared.example_translation = "Esta es mi casa."
+    shared.save()
+
+
+class GenerationJobTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username="jobuser", password="pass", email="job@example.com", is_active=True
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.english = Language.objects.create(code="en", name="English")
+        self.spanish = Language.objects.create(code="es", name="Spanish")
+
+    def enqueue(self, word="house"):
+        return self.client.post("/api/vocabulary/?async=true", {
+            "word": word,
+            "source_lang": self.english.id,
+            "target_lang": self.spanish.id,
+            "deck": "Casa"
+        })
+
+    def test_async_create_returns_job_without_generating(self):
+        '''El POST en modo trabajo responde 202 y no llama a los proveedores externos'''
+        with patch("api_vocabulary.views.UserVocabularyWordViewSet.generate_content_for_shared") as mock_generate:
+            response = self.enqueue()
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], GenerationJob.STATUS_PENDING)
+        mock_generate.assert_not_called()
+        self.assertFalse(UserVocabularyWord.objects.exists())
+
+    def test_duplicate_enqueue_reuses_active_job(self):
+        first = self.enqueue()
+        second = self.enqueue()
+        self.assertEqual(first.data["id"], second.data["id"])
+        self.assertEqual(GenerationJob.objects.count(), 1)
+
+    @patch("api_vocabulary.views.UserVocabularyWordViewSet.generate_content_for_shared", fake_generate_content_for_shared)
+    def test_worker_processes_job_and_status_reports_result(self):
+        job_id = self.enqueue().data["id"]
+
+        job = claim_next_job("test-worker")
+        self.assertEqual(job.id, job_id)
+        self.assertIsNone(claim_next_job("test-worker"))  # Ya no quedan pendientes
+        run_generation_job(job)
+
+        response = self.client.get(f"/api/generation-jobs/{job_id}/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], GenerationJob.STATUS_DONE)
+        self.assertEqual(response.data["progress"], 100)
+        self.assertEqual(response.data["user_word"]["deck"], "Casa")
+        self.assertEqual(response.data["user_word"]["shared_word"]["translation"], "(n) casa")
+        self.assertEqual(SharedVocabularyWord.objects.count(), 1)
+
+    def test_failed_generation_is_retried_then_marked_failed(self):
+        job_id = self.enqueue().data["id"]
+
+        with patch(
+            "api_vocabulary.views.UserVocabularyWordViewSet.generate_content_for_shared",
+            side_effect=Exception("OpenAI caído")
+        ), self.settings(GENERATION_JOB_MAX_ATTEMPTS=1):
+            job = run_generation_job(claim_next_job("test-worker"))
+
+        self.assertEqual(job.id, job_id)
+        self.assertEqual(job.status, GenerationJob.STATUS_FAILED)
+        self.assertIn("OpenAI caído", job.error)
+
+    def test_failed_custom_generation_is_retried_without_leftovers(self):
+        '''Un fallo transitorio no deja el CustomWordContent vacío que bloquearía el reintento'''
+        self.user.is_premium = True
+        self.user.save()
+        GenerationJob.objects.create(
+            user=self.user, word="bank", source_lang=self.english, target_lang=self.spanish,
+            context="by the river", deck="Casa"
+        )
+
+        def fake_generate_content_for_custom(creator, custom):
+            custom.translation = "(n) orilla"
+            custom.example_sentence = "We sat on the bank."
+            custom.save()
+
+        with self.settings(GENERATION_JOB_MAX_ATTEMPTS=2):
+            with patch(
+                "api_vocabulary.views.UserVocabularyWordViewSet.generate_content_for_custom",
+                side_effect=Exception("Translate caído")
+            ):
+                job = run_generation_job(claim_next_job("test-worker"))
+            self.assertEqual(job.status, GenerationJob.STATUS_PENDING)
+            self.assertFalse(CustomWordContent.objects.exists())
+
+            GenerationJob.objects.filter(pk=job.pk).update(run_after=job.created_at)
+            with patch(
+                "api_vocabulary.views.UserVocabularyWordViewSet.generate_content_for_custom",
+                fake_generate_content_for_custom
+            ):
+                job = run_generation_job(claim_next_job("test-worker"))
+
+        self.assertEqual(job.status, GenerationJob.STATUS_DONE)
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(job.user_word.custom_content.translation, "(n) orilla")
+        self.assertEqual(CustomWordContent.objects.count(), 1)
+
+    def test_jobs_are_private_to_their_owner(self):
+        job_id = self.enqueue().data["id"]
+        other = CustomUser.objects.create_user(
+            username="other", password="pass", email="other@example.com", is_active=True
+        )
+        self.client.force_authenticate(user=other)
+        response = self.client.get(f"/api/generation-jobs/{job_id}/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,141 @@
+import threading
+import time
+from unittest.mock import Mock, patch
+from django.db.backends.utils import CursorWrapper
+from django.test import TestCase, override_settings
+from api_vocabulary.audio_utils import audio_asset_key
+from api_vocabulary.generation_pipeline import Stage, run_stages
+from api_vocabulary.models import Language, SharedVocabularyWord, CustomWordContent, GenerationJob
+from api_vocabulary.jobs import run_generation_job
+from api_vocabulary.views import UserVocabularyWordViewSet
+from users.models import CustomUser
+
+
+def fake_audio_blob(text, language):
+    key = audio_asset_key(text, language.code)
+    return {
+        "key": key, "name": f"audio/assets/{key[:2]}/{key}.mp3", "size": 3,
+        "text": text, "lang_code": language.code, "voice": "default", "format": "mp3",
+    }
+
+
+class RunStagesTests(TestCase):
+    def test_independent_stages_overlap_and_dependencies_are_respected(self):
+        caller = threading.current_thread()
+        threads = {}
+
+        def slow(name, value):
+            def fn(results):
+                threads[name] = threading.current_thread()
+                time.sleep(0.2)
+                return value
+            return fn
+
+        stages = [
+            Stage("llm", slow("llm", "sentence"), in_caller_thread=True),
+            Stage("word_audio", slow("word_audio", "word.mp3")),
+            Stage("sentence_audio", lambda r: r["llm"] + ".mp3", deps=["llm"]),
+        ]
+        started = time.perf_counter()
+        results, timings = run_stages(stages, max_workers=2)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(results["sentence_audio"], "sentence.mp3")
+        self.assertIs(threads["llm"], caller)
+        self.assertIsNot(threads["word_audio"], caller)
+        self.assertLess(elapsed, 0.35)  # En serie serían ≥ 0.4 s
+        self.assertGreaterEqual(timings["sentence_audio"]["start"], timings["llm"]["end"])
+
+    def test_failed_stage_propagates_and_skips_dependents(self):
+        dependent = Mock()
+
+        def fail(results):
+            raise RuntimeError("TTS caído")
+
+        stages = [
+            Stage("word_audio", fail),
+            Stage("llm", lambda r: "sentence", in_caller_thread=True),
+            Stage("sentence_audio", dependent, deps=["word_audio"]),
+        ]
+        for workers in (0, 2):
+            with self.assertRaises(RuntimeError):
+                run_stages(stages, max_workers=workers)
+        dependent.assert_not_called()
+
+
+@override_settings(GENERATION_PIPELINE_WORKERS=2)
+@patch("api_vocabulary.generation_pipeline.store_audio_blob", side_effect=fake_audio_blob)
+class GenerationPipelineTests(TestCase):
+    def setUp(self):
+        self.english = Language.objects.create(code="en", name="English")
+        self.spanish = Language.objects.create(code="es", name="Spanish")
+
+    def test_shared_word_is_generated_with_a_single_save(self, mock_blob):
+        shared = SharedVocabularyWord.objects.create(word="house", source_lang=self.english, target_lang=self.spanish)
+        creator = UserVocabularyWordViewSet()
+
+        with patch.object(UserVocabularyWordViewSet, "generate_llm_content_for_shared",
+                          return_value=("This is my house.", "(n) casa")), \
+                patch.object(UserVocabularyWordViewSet, "translate_with_google_cloud", return_value="Esta es mi casa."), \
+                patch.object(SharedVocabularyWord, "save", autospec=True,
+                             side_effect=SharedVocabularyWord.save) as mock_save:
+            creator.generate_content_for_shared(shared)
+
+        mock_save.assert_called_once()
+        shared.refresh_from_db()
+        self.assertEqual(shared.example_translation, "Esta es mi casa.")
+        self.assertEqual(shared.audio_word_asset.text, "house")
+        self.assertEqual(shared.audio_sentence_asset.text, "This is my house.")
+        self.assertEqual(shared.audio_sentence.name, shared.audio_sentence_asset.file.name)
+        self.assertTrue(
+            {"llm", "word_audio", "translation", "sentence_audio", "save"}.issubset(creator.last_stage_timings)
+        )
+
+    def test_custom_content_uses_the_same_pipeline(self, mock_blob):
+        custom = CustomWordContent.objects.create(
+            word="bank", context="river", source_lang=self.english, target_lang=self.spanish
+        )
+        with patch.object(UserVocabularyWordViewSet, "generate_llm_content_for_custom",
+                          return_value=("We sat on the bank.", "(n) orilla")), \
+                patch.object(UserVocabularyWordViewSet, "translate_with_google_cloud", return_value="Nos sentamos en la orilla."):
+            UserVocabularyWordViewSet().generate_content_for_custom(custom)
+
+        custom.refresh_from_db()
+        self.assertEqual(custom.translation, "(n) orilla")
+        self.assertEqual(mock_blob.call_count, 2)
+
+    def test_database_is_only_queried_from_the_caller_thread(self, mock_blob):
+        '''Con la FK source_lang sin cargar, las etapas del pool no consultan la base de datos'''
+        created = SharedVocabularyWord.objects.create(word="house", source_lang=self.english, target_lang=self.spanish)
+        shared = SharedVocabularyWord.objects.get(pk=created.pk)
+        query_threads = set()
+        execute = CursorWrapper.execute
+
+        def recording_execute(cursor, *args, **kwargs):
+            query_threads.add(threading.current_thread())
+            return execute(cursor, *args, **kwargs)
+
+        with patch.object(UserVocabularyWordViewSet, "generate_llm_content_for_shared",
+                          return_value=("This is my house.", "(n) casa")), \
+                patch.object(UserVocabularyWordViewSet, "translate_with_google_cloud", return_value="Esta es mi casa."), \
+                patch.object(CursorWrapper, "execute", recording_execute):
+            UserVocabularyWordViewSet().generate_content_for_shared(shared)
+
+        self.assertEqual(query_threads, {threading.current_thread()})
+        self.assertEqual(mock_blob.call_count, 2)
+
+    def test_job_records_stage_timings(self, mock_blob):
+        user = CustomUser.objects.create_user(username="timer", password="pass", email="t@example.com", is_active=True)
+        job = GenerationJob.objects.create(
+            user=user, word="house", source_lang=self.english, target_lang=self.spanish, deck="General",
+            status=GenerationJob.STATUS_RUNNING, attempts=1
+        )
+        with patch.object(UserVocabularyWordViewSet, "generate_llm_content_for_shared",
+                          return_value=("This is my house.", "(n) casa")), \
+                patch.object(UserVocabularyWordViewSet, "translate_with_google_cloud", return_value="Esta es mi casa."):
+            run_generation_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, GenerationJob.STATUS_DONE)
+        self.assertIn("sentence_audio", job.stage_timings)
+        self.assertIn("total", job.stage_timings)
@@ -0,0 +1,97 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import Mock, patch
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from api_vocabulary.cache_stats import get_cache_stats
+from api_vocabulary.llm_cache import cached_chat_completion
+from api_vocabulary.models import Language, SharedVocabularyWord, LLMResponseCache
+from api_vocabulary.views import UserVocabularyWordViewSet
+
+RESPONSE = "Example sentence:\nThis is my house.\n\nTranslation:\n(n) casa"
+MESSAGES = [{"role": "user", "content": "house"}]
+
+
+def openai_client(content=RESPONSE):
+    client = Mock()
+    client.chat.completions.create.return_value = Mock(choices=[Mock(message=Mock(content=content))])
+    return client
+
+
+class LLMResponseCacheTests(TestCase):
+    def test_repeated_prompt_skips_the_llm(self):
+        client = openai_client()
+        parse = lambda content: content.upper()
+
+        first = cached_chat_completion(lambda: client, "gpt-3.5-turbo", MESSAGES, parse)
+        second = cached_chat_completion(lambda: client, "gpt-3.5-turbo", MESSAGES, parse)
+
+        self.assertEqual(first, second)
+        client.chat.completions.create.assert_called_once()
+        entry = LLMResponseCache.objects.get()
+        self.assertEqual(entry.raw_response, RESPONSE)
+        self.assertEqual(entry.hits, 1)
+        self.assertEqual(get_cache_stats()["llm"]["hits"], 1)
+
+    def test_model_and_parameters_are_part_of_the_key(self):
+        client = openai_client()
+        cached_chat_completion(lambda: client, "gpt-3.5-turbo", MESSAGES, str)
+        cached_chat_completion(lambda: client, "gpt-4", MESSAGES, str)
+        cached_chat_completion(lambda: client, "gpt-3.5-turbo", MESSAGES, str, temperature=0.2)
+        self.assertEqual(client.chat.completions.create.call_count, 3)
+
+    def test_expired_entries_and_bypass_call_the_llm_again(self):
+        client = openai_client()
+        cached_chat_completion(lambda: client, "gpt-3.5-turbo", MESSAGES, str)
+        LLMResponseCache.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        cached_chat_completion(lambda: client, "gpt-3.5-turbo", MESSAGES, str)
+        cached_chat_completion(lambda: client, "gpt-3.5-turbo", MESSAGES, str, bypass_cache=True)
+        self.assertEqual(client.chat.completions.create.call_count, 3)
+        self.assertEqual(LLMResponseCache.objects.count(), 1)
+
+    def test_unparseable_responses_are_not_cached(self):
+        client = openai_client("respuesta inválida")
+
+        def parse(content):
+            raise ValueError("formato inesperado")
+
+        with self.assertRaises(ValueError):
+            cached_chat_completion(lambda: client, "gpt-3.5-turbo", MESSAGES, parse)
+        self.assertFalse(LLMResponseCache.objects.exists())
+
+    def test_entry_count_is_bounded(self):
+        client = openai_client()
+        with self.settings(LLM_CACHE_MAX_ENTRIES=5, CACHE_EVICTION_SAMPLE_RATE=1):
+            for i in range(8):
+                cached_chat_completion(lambda: client, "gpt-3.5-turbo", [{"role": "user", "content": str(i)}], str)
+        self.assertLessEqual(LLMResponseCache.objects.count(), 5)
+
+    def test_limit_is_only_checked_on_sampled_writes(self):
+        client = openai_client()
+        with self.settings(LLM_CACHE_MAX_ENTRIES=5, CACHE_EVICTION_SAMPLE_RATE=0), \
+                patch("api_vocabulary.llm_cache.evict_llm_cache") as mock_evict:
+            for i in range(8):
+                cached_chat_completion(lambda: client, "gpt-3.5-turbo", [{"role": "user", "content": str(i)}], str)
+        mock_evict.assert_not_called()
+        self.assertEqual(LLMResponseCache.objects.count(), 8)
+
+        with self.settings(LLM_CACHE_MAX_ENTRIES=5):
+            call_command("cache_stats", "--evict", stdout=StringIO())
+        self.assertEqual(LLMResponseCache.objects.count(), 4)
+
+    def test_regenerating_a_shared_word_reuses_the_cached_completion(self):
+        english = Language.objects.create(code="en", name="English")
+        spanish = Language.objects.create(code="es", name="Spanish")
+        shared = SharedVocabularyWord.objects.create(word="house", source_lang=english, target_lang=spanish)
+        client = openai_client()
+        creator = UserVocabularyWordViewSet()
+
+        with patch.object(UserVocabularyWordViewSet, "get_openai_client", return_value=client):
+            first = creator.generate_llm_content_for_shared(shared)
+            second = creator.generate_llm_content_for_shared(shared)
+            creator.generate_llm_content_for_shared(shared, bypass_cache=True)
+
+        self.assertEqual(tuple(first), ("This is my house.", "(n) casa"))
+        self.assertEqual(tuple(second), tuple(first))
+        self.assertEqual(client.chat.completions.create.call_count, 2)
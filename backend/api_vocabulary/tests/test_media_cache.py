@@ -0,0 +1,84 @@
+import io
+import os
+import shutil
+import tempfile
+import time
+from django.test import TestCase, override_settings
+from api_vocabulary.anki_exporter import fetch_media_files
+from api_vocabulary.cache_stats import get_cache_stats
+from api_vocabulary.media_cache import MediaCache
+from api_vocabulary.tests.test_anki_export_media import RemoteStorage, filefield
+
+ASSET = "audio/assets/ab/" + "ab" * 32 + ".mp3"
+
+
+class MediaCacheTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_put_is_atomic_and_keeps_the_basename(self):
+        cache = MediaCache(self.root, max_bytes=1024)
+        self.assertIsNone(cache.get(ASSET))
+
+        path = cache.put(ASSET, io.BytesIO(b"mp3"))
+
+        self.assertEqual(os.path.basename(path), os.path.basename(ASSET))
+        self.assertEqual(cache.get(ASSET), path)
+        self.assertEqual(os.listdir(cache.tmp_dir), [])
+
+    def test_timeout_discards_the_partial_file(self):
+        cache = MediaCache(self.root, max_bytes=1024)
+        with self.assertRaises(TimeoutError):
+            cache.put(ASSET, io.BytesIO(b"mp3"), deadline=time.monotonic() - 1)
+        self.assertIsNone(cache.get(ASSET))
+        self.assertEqual(os.listdir(cache.tmp_dir), [])
+
+    @override_settings(MEDIA_CACHE_MIN_AGE=0)
+    def test_least_recently_used_files_are_evicted_to_the_budget(self):
+        cache = MediaCache(self.root, max_bytes=300)
+        now = time.time()
+        for i in range(4):
+            path = cache.put(f"audio/{i}.mp3", io.BytesIO(b"x" * 100))
+            os.utime(path, (now - 100 + i, now - 100 + i))
+        os.utime(cache.path_for("audio/0.mp3"), (now, now))  # Recién usado
+
+        self.assertEqual(cache.evict(), 2)
+        self.assertIsNotNone(cache.get("audio/0.mp3"))
+        self.assertIsNone(cache.get("audio/1.mp3"))
+        self.assertLessEqual(cache.size(), 270)
+
+    def test_recently_used_files_are_never_evicted(self):
+        cache = MediaCache(self.root, max_bytes=100)
+        for i in range(3):
+            cache.put(f"audio/{i}.mp3", io.BytesIO(b"x" * 100))
+        self.assertEqual(cache.evict(), 0)
+
+
+class ExportMediaCacheTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.dest = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_CACHE_ENABLED=True, MEDIA_CACHE_DIR=self.root)
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.root, ignore_errors=True)
+        shutil.rmtree(self.dest, ignore_errors=True)
+
+    def test_second_export_is_served_from_the_cache(self):
+        storage = RemoteStorage()
+        fields = [filefield(ASSET, storage), filefield("audio/legacy/house.mp3", storage)]
+
+        first, _ = fetch_media_files(fields, self.dest)
+        second, _ = fetch_media_files(fields, self.dest)
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(storage.opened), 2)
+        self.assertTrue(all(path.startswith(self.root) for path in second))
+        self.assertEqual(os.listdir(self.dest), [])
+        stats = get_cache_stats()["media"]
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 2))
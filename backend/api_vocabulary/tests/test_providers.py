@@ -0,0 +1,129 @@
+import os
+from unittest.mock import Mock, patch
+import requests
+from botocore.exceptions import ClientError, EndpointConnectionError
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+from api_vocabulary.models import Language
+from api_vocabulary.providers import PROVIDERS, Provider, ProviderUnavailable, get_provider, _is_retryable_http
+from api_vocabulary.views import UserVocabularyWordViewSet
+from users.models import CustomUser
+
+
+def http_error(status_code):
+    return requests.HTTPError(response=Mock(status_code=status_code))
+
+
+@override_settings(PROVIDER_MAX_RETRIES=2, CIRCUIT_BREAKER_FAILURE_THRESHOLD=3, CIRCUIT_BREAKER_RESET_SECONDS=30)
+@patch("api_vocabulary.providers.time.sleep")
+class ProviderCallTests(TestCase):
+    def provider(self):
+        return Provider("media", is_retryable=_is_retryable_http)
+
+    def test_transient_errors_are_retried_with_backoff(self, mock_sleep):
+        fn = Mock(side_effect=[requests.ConnectionError("reset"), http_error(503), "ok"])
+        self.assertEqual(self.provider().call(fn), "ok")
+        self.assertEqual(fn.call_count, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    def test_client_errors_are_not_retried(self, mock_sleep):
+        provider = self.provider()
+        fn = Mock(side_effect=http_error(404))
+        with self.assertRaises(requests.HTTPError):
+            provider.call(fn)
+        fn.assert_called_once()
+        self.assertEqual(provider.breaker.state, "closed")
+
+    def test_exhausted_retries_raise_provider_unavailable(self, mock_sleep):
+        fn = Mock(side_effect=requests.Timeout("lento"))
+        with self.assertRaises(ProviderUnavailable):
+            self.provider().call(fn)
+        self.assertEqual(fn.call_count, 3)
+
+    def test_open_circuit_fails_fast_until_the_reset_timeout(self, mock_sleep):
+        provider = self.provider()
+        with self.assertRaises(ProviderUnavailable):
+            provider.call(Mock(side_effect=requests.Timeout("lento")))
+        self.assertEqual(provider.breaker.state, "open")
+
+        fn = Mock(return_value="ok")
+        with self.assertRaises(ProviderUnavailable):
+            provider.call(fn)
+        fn.assert_not_called()
+
+        # Pasado el tiempo de espera, una llamada de prueba exitosa cierra el circuito
+        with patch("api_vocabulary.providers.time.monotonic", return_value=provider.breaker.opened_at + 31):
+            self.assertEqual(provider.call(fn), "ok")
+        self.assertEqual(provider.breaker.state, "closed")
+
+
+@override_settings(
+    PROVIDER_MAX_RETRIES=2, CIRCUIT_BREAKER_FAILURE_THRESHOLD=5,
+    AWS_STORAGE_BUCKET_NAME="bucket", AWS_S3_CUSTOM_DOMAIN="cdn.example.com"
+)
+@patch("api_vocabulary.providers.time.sleep")
+class StorageProviderTests(TestCase):
+    def setUp(self):
+        from config.storages import ExportStorage
+
+        self.storage = ExportStorage(access_key="test", secret_key="test", region_name="us-east-1")
+
+    def tearDown(self):
+        get_provider("storage").reset()
+
+    def client_error(self, code, http_status):
+        return ClientError({"Error": {"Code": code}, "ResponseMetadata": {"HTTPStatusCode": http_status}}, "HeadObject")
+
+    def test_bucket_calls_go_through_the_storage_provider(self, mock_sleep):
+        '''Los errores transitorios de S3 se reintentan con backoff; botocore no reintenta por su cuenta'''
+        errors = [EndpointConnectionError(endpoint_url="https://s3.amazonaws.com"), self.client_error("SlowDown", 503), True]
+        with patch("storages.backends.s3boto3.S3Boto3Storage.exists", side_effect=errors) as mock_exists:
+            self.assertTrue(self.storage.exists("user_1/deck.apkg"))
+
+        self.assertEqual(mock_exists.call_count, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+        self.assertEqual(self.storage.client_config.retries["max_attempts"], 1)
+
+    def test_access_errors_are_not_retried(self, mock_sleep):
+        with patch("storages.backends.s3boto3.S3Boto3Storage.delete",
+                   side_effect=self.client_error("AccessDenied", 403)) as mock_delete:
+            with self.assertRaises(ClientError):
+                self.storage.delete("user_1/deck.apkg")
+        mock_delete.assert_called_once()
+        self.assertEqual(get_provider("storage").breaker.state, "closed")
+
+
+class ProviderClientTests(TestCase):
+    def tearDown(self):
+        get_provider("openai")._client = None
+
+    def test_openai_client_is_shared_and_does_not_retry_internally(self):
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "sk-test"}):
+            first = UserVocabularyWordViewSet().get_openai_client()
+            second = UserVocabularyWordViewSet().get_openai_client()
+
+        self.assertIs(first, second)
+        self.assertEqual(first.max_retries, 0)
+        self.assertEqual(first.timeout.connect, 5)
+
+
+class ProviderUnavailableResponseTests(APITestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user(username="u503", password="pass", email="u503@example.com", is_active=True)
+        self.client.force_authenticate(user=user)
+        self.english = Language.objects.create(code="en", name="English")
+        self.spanish = Language.objects.create(code="es", name="Spanish")
+
+    def tearDown(self):
+        for provider in PROVIDERS.values():
+            provider.reset()
+
+    def test_degraded_upstream_returns_503(self):
+        with patch.object(UserVocabularyWordViewSet, "generate_llm_content_for_shared",
+                          side_effect=ProviderUnavailable("El servicio 'openai' no está disponible (circuito abierto).")):
+            response = self.client.post("/api/vocabulary/", {
+                "word": "house", "source_lang": self.english.id, "target_lang": self.spanish.id, "deck": "General"
+            }, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
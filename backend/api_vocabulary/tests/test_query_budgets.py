@@ -0,0 +1,93 @@
+from contextlib import contextmanager
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from api_vocabulary.anki_exporter import prepare_apkg_export
+from api_vocabulary.models import (
+    CustomWordContent, DownloadHistory, ExportJob, GenerationJob, Language, SharedVocabularyWord, UserVocabularyWord
+)
+from users.models import CustomUser
+
+
+class QueryBudgetTests(APITestCase):
+    """
+    Consultas por request de las listas y la exportación: deben quedar dentro del presupuesto
+    y no crecer con la cantidad de filas (N+1).
+    """
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username="budget", password="pass", email="q@example.com", is_active=True)
+        self.client.force_authenticate(user=self.user)
+        self.english = Language.objects.create(code="en", name="English")
+        self.spanish = Language.objects.create(code="es", name="Spanish")
+        self.count = 0
+        self.add_words(3)
+
+    def add_words(self, n):
+        for _ in range(n):
+            self.count += 1
+            shared = SharedVocabularyWord.objects.create(
+                word=f"word{self.count}", source_lang=self.english, target_lang=self.spanish, translation="(n) x",
+                example_sentence="Example.", example_translation="Ejemplo."
+            )
+            word = UserVocabularyWord.objects.create(user=self.user, shared_word=shared, deck="General")
+            custom = CustomWordContent.objects.create(
+                word=f"custom{self.count}", source_lang=self.english, target_lang=self.spanish, context="ctx",
+                translation="(n) x", example_sentence="Example.", example_translation="Ejemplo."
+            )
+            UserVocabularyWord.objects.create(user=self.user, custom_content=custom, deck="General")
+            GenerationJob.objects.create(
+                user=self.user, word=shared.word, source_lang=self.english, target_lang=self.spanish,
+                status=GenerationJob.STATUS_DONE, user_word=word
+            )
+            ExportJob.objects.create(user=self.user, deck_name="General")
+            DownloadHistory.objects.create(user=self.user, deck_name="General", word_ids=str(word.id))
+
+    @contextmanager
+    def assertQueriesWithin(self, budget):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        self.assertLessEqual(
+            len(context), budget,
+            "\n".join(query["sql"] for query in context.captured_queries)
+        )
+
+    def assertConstantQueries(self, budget, request):
+        """`request()` cumple el presupuesto y hace las mismas consultas con el triple de filas."""
+        with self.assertQueriesWithin(budget) as small:
+            request()
+        self.add_words(6)
+        with self.assertQueriesWithin(budget) as large:
+            request()
+        self.assertEqual(len(small), len(large))
+
+    def get_ok(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_vocabulary_list(self):
+        self.assertConstantQueries(1, lambda: self.get_ok("/api/vocabulary/"))
+
+    def test_vocabulary_compact_page(self):
+        self.assertConstantQueries(1, lambda: self.get_ok("/api/vocabulary/?view=compact&page_size=50"))
+
+    def test_generation_jobs_list(self):
+        self.assertConstantQueries(1, lambda: self.get_ok("/api/generation-jobs/"))
+
+    def test_export_jobs_list(self):
+        self.assertConstantQueries(1, lambda: self.get_ok("/api/export-jobs/"))
+
+    def test_prepare_export(self):
+        # Palabras, índice de artefactos y DeckBuild; los GUID y las notas no consultan la base
+        self.assertConstantQueries(3, lambda: prepare_apkg_export(self.user, deck_name="General"))
+
+    def test_admin_changelists(self):
+        admin_user = CustomUser.objects.create_superuser(username="root", password="pass", email="root@example.com")
+        self.client.force_login(admin_user)
+        for model in ("uservocabularyword", "sharedvocabularyword", "customwordcontent", "downloadhistory", "generationjob"):
+            with self.subTest(model=model):
+                # Sesión, usuario, conteos de la paginación, la página y los filtros; nunca una consulta por fila
+                self.assertConstantQueries(
+                    8, lambda: self.get_ok(f"/admin-panel-1189/api_vocabulary/{model}/")
+                )
@@ -0,0 +1,57 @@
+from io import StringIO
+from unittest import skipUnless
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from api_vocabulary.management.commands.benchmark_hot_queries import NEW_INDEXES
+from api_vocabulary.models import CustomWordContent, Language, context_digest
+
+
+class CustomContextUniquenessTests(TestCase):
+    def setUp(self):
+        self.english = Language.objects.create(code="en", name="English")
+        self.spanish = Language.objects.create(code="es", name="Spanish")
+
+    def create(self, context):
+        return CustomWordContent.objects.create(
+            word="bank", source_lang=self.english, target_lang=self.spanish, context=context
+        )
+
+    def test_long_contexts_are_unique_by_hash(self):
+        long_context = "by the river " * 2000
+        content = self.create(long_context)
+        self.assertEqual(content.context_hash, context_digest(long_context))
+
+        self.create(long_context + "!")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.create(long_context)
+
+    def test_hash_follows_context_updates(self):
+        content = self.create("money")
+        content.context = "river"
+        content.save(update_fields=["context"])
+        content.refresh_from_db()
+        self.assertEqual(content.context_hash, context_digest("river"))
+
+
+@skipUnless(connection.vendor == "postgresql", "El benchmark usa EXPLAIN y DDL transaccional de PostgreSQL")
+class HotQueryBenchmarkTests(TestCase):
+    def test_benchmark_reports_before_and_after_and_keeps_the_indexes(self):
+        out = StringIO()
+        call_command(
+            "benchmark_hot_queries", "--users", "2", "--words-per-user", "20", "--large-user-words", "50",
+            "--custom-per-user", "2", "--downloads-per-user", "3", "--repeat", "1", "--compare", stdout=out
+        )
+
+        report = out.getvalue()
+        for name in ("vocabulary: primera página", "export: por mazo", "historial: última del mazo", "custom: por contexto"):
+            self.assertRegex(report, rf"\[grande\] {name}\s+\d+\.\d+ms\s+\d+\.\d+ms")
+
+        with connection.cursor() as cursor:
+            existing = set()
+            for table in ("api_vocabulary_uservocabularyword", "api_vocabulary_downloadhistory"):
+                existing |= set(connection.introspection.get_constraints(cursor, table))
+        self.assertTrue(set(NEW_INDEXES) <= existing)
+
+        call_command("benchmark_hot_queries", "--cleanup", stdout=StringIO())
+        self.assertFalse(CustomWordContent.objects.exists())
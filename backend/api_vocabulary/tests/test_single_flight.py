@@ -0,0 +1,98 @@
+import time
+from datetime import timedelta
+from unittest.mock import Mock, patch
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from api_vocabulary.models import Language, SharedVocabularyWord, GenerationClaim
+from api_vocabulary.single_flight import _try_claim, get_or_generate_shared, content_key
+
+
+def fill_content(shared):
+    shared.translation = "(n) casa"
+    shared.example_sentence = "This is my house."
+    shared.example_translation = "Esta es mi casa."
+    shared.save()
+
+
+class SingleFlightTests(TestCase):
+    def setUp(self):
+        self.english = Language.objects.create(code="en", name="English")
+        self.spanish = Language.objects.create(code="es", name="Spanish")
+
+    def test_generates_once_and_releases_claim(self):
+        generate = Mock(side_effect=fill_content)
+
+        first = get_or_generate_shared("house", self.english, self.spanish, generate)
+        second = get_or_generate_shared("house", self.english, self.spanish, generate)
+
+        self.assertEqual(first.id, second.id)
+        generate.assert_called_once()
+        self.assertFalse(GenerationClaim.objects.exists())
+
+    def test_waits_for_in_flight_generation_instead_of_generating(self):
+        '''Si otro proceso tiene el claim, se espera a su resultado sin llamar a los proveedores'''
+        GenerationClaim.objects.create(
+            key=content_key("house", self.english, self.spanish),
+            word="house", source_lang=self.english, target_lang=self.spanish, owner="otro-worker"
+        )
+
+        def other_worker_finishes(seconds):
+            shared = SharedVocabularyWord.objects.create(word="house", source_lang=self.english, target_lang=self.spanish)
+            fill_content(shared)
+            GenerationClaim.objects.all().delete()
+
+        generate = Mock(side_effect=fill_content)
+        with patch("api_vocabulary.single_flight.time.sleep", side_effect=other_worker_finishes):
+            shared = get_or_generate_shared("house", self.english, self.spanish, generate)
+
+        generate.assert_not_called()
+        self.assertEqual(shared.example_sentence, "This is my house.")
+
+    def test_stale_claim_is_taken_over(self):
+        GenerationClaim.objects.create(
+            key=content_key("house", self.english, self.spanish),
+            word="house", source_lang=self.english, target_lang=self.spanish, owner="worker-muerto",
+            heartbeat_at=timezone.now() - timedelta(hours=1)
+        )
+        generate = Mock(side_effect=fill_content)
+
+        shared = get_or_generate_shared("house", self.english, self.spanish, generate)
+
+        generate.assert_called_once()
+        self.assertEqual(shared.translation, "(n) casa")
+        self.assertFalse(GenerationClaim.objects.exists())
+
+    def test_failed_generation_leaves_no_half_built_row(self):
+        generate = Mock(side_effect=Exception("OpenAI caído"))
+
+        with self.assertRaises(Exception):
+            get_or_generate_shared("house", self.english, self.spanish, generate)
+
+        self.assertFalse(SharedVocabularyWord.objects.exists())
+        self.assertFalse(GenerationClaim.objects.exists())
+
+
+class SingleFlightHeartbeatTests(TransactionTestCase):
+    # El hilo del heartbeat usa su propia conexión: el claim tiene que estar confirmado para que lo vea
+
+    def setUp(self):
+        self.english = Language.objects.create(code="en", name="English")
+        self.spanish = Language.objects.create(code="es", name="Spanish")
+
+    @override_settings(SINGLE_FLIGHT_STALE_SECONDS=1)
+    def test_slow_generation_keeps_its_claim(self):
+        '''Una generación más larga que SINGLE_FLIGHT_STALE_SECONDS no deja que otro tome el claim'''
+        key = content_key("house", self.english, self.spanish)
+        observed = {}
+
+        def slow_generate(shared):
+            time.sleep(1.5)
+            claim = GenerationClaim.objects.get(key=key)
+            observed["refreshed"] = claim.heartbeat_at > timezone.now() - timedelta(seconds=1)
+            observed["taken_over"] = _try_claim(key, "otro-worker", "house", self.english, self.spanish)
+            fill_content(shared)
+
+        get_or_generate_shared("house", self.english, self.spanish, slow_generate)
+
+        self.assertEqual(observed, {"refreshed": True, "taken_over": False})
+        self.assertFalse(GenerationClaim.objects.exists())
@@ -0,0 +1,120 @@
+from io import StringIO
+from unittest.mock import Mock, patch
+from django.core.management import call_command
+from django.test import TestCase
+from api_vocabulary import translation_service
+from api_vocabulary.cache_stats import get_cache_stats
+from api_vocabulary.models import Language, SharedVocabularyWord, TranslationCache
+from api_vocabulary.translation_service import translate_batch, translate_example_sentences
+
+
+def fake_client():
+    client = Mock()
+    client.translate.side_effect = lambda values, source_language, target_language: [
+        {"translatedText": f"{target_language}:{v}"} for v in values
+    ]
+    return client
+
+
+class TranslateBatchTests(TestCase):
+    def test_results_keep_input_order_and_duplicates_are_sent_once(self):
+        client = fake_client()
+        with patch.object(translation_service, "get_translate_client", return_value=client):
+            result = translate_batch(["b", "a", "b"], "en", "es")
+
+        self.assertEqual(result, ["es:b", "es:a", "es:b"])
+        client.translate.assert_called_once()
+        self.assertEqual(client.translate.call_args.args[0], ["b", "a"])
+
+    def test_large_batches_are_chunked_to_api_limits(self):
+        client = fake_client()
+        texts = [f"sentence {i}" for i in range(translation_service.MAX_SEGMENTS_PER_REQUEST + 5)]
+        with patch.object(translation_service, "get_translate_client", return_value=client):
+            result = translate_batch(texts, "en", "es")
+
+        self.assertEqual(client.translate.call_count, 2)
+        self.assertEqual(result, [f"es:{t}" for t in texts])
+
+    def test_missing_example_translations_are_filled_per_language_pair(self):
+        english = Language.objects.create(code="en", name="English")
+        spanish = Language.objects.create(code="es", name="Spanish")
+        french = Language.objects.create(code="fr", name="French")
+        words = [
+            SharedVocabularyWord.objects.create(word="house", source_lang=english, target_lang=spanish,
+                                                example_sentence="My house.", example_translation=""),
+            SharedVocabularyWord.objects.create(word="car", source_lang=english, target_lang=french,
+                                                example_sentence="My car.", example_translation=""),
+            SharedVocabularyWord.objects.create(word="run", source_lang=english, target_lang=spanish,
+                                                example_sentence="I run.", example_translation="Yo corro."),
+        ]
+        client = fake_client()
+        with patch.object(translation_service, "get_translate_client", return_value=client):
+            updated = translate_example_sentences(words, only_missing=True)
+
+        self.assertEqual(len(updated), 2)
+        self.assertEqual(client.translate.call_count, 2)
+        self.assertEqual(SharedVocabularyWord.objects.get(word="car").example_translation, "fr:My car.")
+        self.assertEqual(SharedVocabularyWord.objects.get(word="run").example_translation, "Yo corro.")
+
+
+class TranslationCacheTests(TestCase):
+    def test_repeated_translation_is_served_from_cache(self):
+        client = fake_client()
+        with patch.object(translation_service, "get_translate_client", return_value=client):
+            first = translate_batch(["My house."], "en", "es")
+            second = translate_batch(["My  house. "], "en", "es")  # Mismo texto normalizado
+
+        self.assertEqual(first, ["es:My house."])
+        self.assertEqual(second, ["es:My house."])
+        client.translate.assert_called_once()
+
+        entry = TranslationCache.objects.get()
+        self.assertEqual(entry.hits, 1)
+        self.assertEqual(get_cache_stats()["translation"]["hits"], 1)
+        self.assertEqual(get_cache_stats()["translation"]["misses"], 1)
+
+    def test_language_pair_is_part_of_the_key(self):
+        client = fake_client()
+        with patch.object(translation_service, "get_translate_client", return_value=client):
+            translate_batch(["My house."], "en", "es")
+            result = translate_batch(["My house."], "en", "fr")
+
+        self.assertEqual(result, ["fr:My house."])
+        self.assertEqual(client.translate.call_count, 2)
+
+    def test_bypass_refreshes_the_cached_value(self):
+        client = fake_client()
+        with patch.object(translation_service, "get_translate_client", return_value=client):
+            translate_batch(["My house."], "en", "es")
+            TranslationCache.objects.update(translated_text="obsoleta")
+            result = translate_batch(["My house."], "en", "es", use_cache=False)
+
+        self.assertEqual(result, ["es:My house."])
+        self.assertEqual(TranslationCache.objects.get().translated_text, "es:My house.")
+
+    def test_least_recently_used_entries_are_evicted(self):
+        client = fake_client()
+        with patch.object(translation_service, "get_translate_client", return_value=client), \
+                self.settings(TRANSLATION_CACHE_MAX_ENTRIES=10, CACHE_EVICTION_SAMPLE_RATE=1):
+            translate_batch([f"old {i}" for i in range(10)], "en", "es")
+            translate_batch(["old 0"], "en", "es")  # Se vuelve a usar: no debe expulsarse
+            translate_batch(["new"], "en", "es")
+
+        self.assertLessEqual(TranslationCache.objects.count(), 10)
+        self.assertTrue(TranslationCache.objects.filter(source_text="old 0").exists())
+        self.assertTrue(TranslationCache.objects.filter(source_text="new").exists())
+        self.assertFalse(TranslationCache.objects.filter(source_text="old 1").exists())
+
+    def test_limit_is_only_checked_on_sampled_writes(self):
+        '''Fuera de la muestra no se cuenta la tabla; `cache_stats --evict` aplica el límite igualmente'''
+        client = fake_client()
+        with patch.object(translation_service, "get_translate_client", return_value=client), \
+                self.settings(TRANSLATION_CACHE_MAX_ENTRIES=10, CACHE_EVICTION_SAMPLE_RATE=0), \
+                patch.object(translation_service, "evict_translation_cache") as mock_evict:
+            translate_batch([f"text {i}" for i in range(12)], "en", "es")
+        mock_evict.assert_not_called()
+        self.assertEqual(TranslationCache.objects.count(), 12)
+
+        with self.settings(TRANSLATION_CACHE_MAX_ENTRIES=10):
+            call_command("cache_stats", "--evict", stdout=StringIO())
+        self.assertEqual(TranslationCache.objects.count(), 9)
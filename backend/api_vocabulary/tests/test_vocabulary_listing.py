@@ -0,0 +1,75 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+from api_vocabulary.models import CustomWordContent, Language, SharedVocabularyWord, UserVocabularyWord
+from users.models import CustomUser
+
+URL = "/api/vocabulary/"
+
+
+class VocabularyListingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username="lister", password="pass", email="l@example.com", is_active=True)
+        self.client.force_authenticate(user=self.user)
+        self.english = Language.objects.create(code="en", name="English")
+        self.spanish = Language.objects.create(code="es", name="Spanish")
+        for i in range(5):
+            shared = SharedVocabularyWord.objects.create(
+                word=f"word{i}", source_lang=self.english, target_lang=self.spanish, translation=f"(n) palabra{i}",
+                example_sentence="Example.", example_translation="Ejemplo."
+            )
+            UserVocabularyWord.objects.create(user=self.user, shared_word=shared, deck="General")
+        custom = CustomWordContent.objects.create(
+            word="bank", source_lang=self.english, target_lang=self.spanish, context="river", translation="(n) orilla",
+            example_sentence="The bank.", example_translation="La orilla."
+        )
+        UserVocabularyWord.objects.create(user=self.user, custom_content=custom, deck="General")
+
+    def test_default_list_keeps_the_nested_shape(self):
+        response = self.client.get(URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), 6)
+        # Mismo orden que las páginas del cursor: la más reciente primero
+        expected = list(UserVocabularyWord.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+        self.assertEqual([row["id"] for row in response.data], expected)
+        row = next(row for row in response.data if row["shared_word"])
+        self.assertEqual(row["shared_word"]["source_lang"]["code"], "en")
+
+    def test_cursor_pages_cover_every_word_once(self):
+        seen = []
+        url = f"{URL}?page_size=2"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data["results"]), 2)
+            seen.extend(row["id"] for row in response.data["results"])
+            url = response.data["next"]
+
+        expected = list(UserVocabularyWord.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_compact_view_flattens_content_and_uses_language_ids(self):
+        response = self.client.get(f"{URL}?view=compact&page_size=10")
+
+        rows = {row["word"]: row for row in response.data["results"]}
+        self.assertEqual(rows["bank"]["context"], "river")
+        self.assertEqual(rows["word0"]["translation"], "(n) palabra0")
+        self.assertEqual((rows["word0"]["source_lang"], rows["word0"]["target_lang"]), (self.english.id, self.spanish.id))
+        self.assertIsNone(rows["word0"]["context"])
+
+    def test_sparse_fieldsets(self):
+        response = self.client.get(f"{URL}?view=compact&fields=id,word,unknown")
+
+        self.assertEqual(set(response.data[0]), {"id", "word"})
+
+    def test_language_map_is_cached_and_invalidated(self):
+        response = self.client.get("/api/languages/map/")
+        self.assertEqual(response.data[str(self.english.id)], {"code": "en", "name": "English"})
+
+        with self.assertNumQueries(0):
+            self.client.get("/api/languages/map/")
+
+        Language.objects.create(code="fr", name="French")
+        self.assertEqual(len(self.client.get("/api/languages/map/").data), 3)
@@ -0,0 +1,69 @@
+from rest_framework.test import APITestCase
+from api_vocabulary.models import CustomWordContent, Language, SharedVocabularyWord, UserVocabularyWord
+from api_vocabulary.search import normalize_search_key
+from users.models import CustomUser
+
+URL = "/api/vocabulary/search/"
+
+
+class WordSearchTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username="seeker", password="pass", email="s@example.com", is_active=True)
+        self.client.force_authenticate(user=self.user)
+        self.spanish = Language.objects.create(code="es", name="Spanish")
+        self.english = Language.objects.create(code="en", name="English")
+        for word, translation in [("cafetería", "(n) coffee shop"), ("café", "(n) coffee"), ("descafeinado", "(adj) decaf")]:
+            self.add_word(word, translation)
+        custom = CustomWordContent.objects.create(
+            word="banco", source_lang=self.spanish, target_lang=self.english, context="parque", translation="(n) bench"
+        )
+        UserVocabularyWord.objects.create(user=self.user, custom_content=custom, deck="General")
+        # Del vocabulario compartido, pero no de este usuario
+        SharedVocabularyWord.objects.create(
+            word="cafetera", source_lang=self.spanish, target_lang=self.english, translation="(n) coffee maker",
+            example_sentence="", example_translation=""
+        )
+
+    def add_word(self, word, translation):
+        shared = SharedVocabularyWord.objects.create(
+            word=word, source_lang=self.spanish, target_lang=self.english, translation=translation,
+            example_sentence="", example_translation=""
+        )
+        return UserVocabularyWord.objects.create(user=self.user, shared_word=shared, deck="General")
+
+    def words(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [(row["custom_content"] or row["shared_word"])["word"] for row in response.data]
+
+    def test_search_key_is_normalized_and_kept_in_sync(self):
+        self.assertEqual(normalize_search_key("  Café ", "Crème  brûlée"), "cafe creme brulee")
+        shared = SharedVocabularyWord.objects.get(word="café")
+        shared.translation = "(n) Ñandú"
+        shared.save(update_fields=["translation"])
+        shared.refresh_from_db()
+        self.assertEqual(shared.search_key, "cafe (n) nandu")
+
+    def test_accent_insensitive_and_ranked(self):
+        response = self.client.get(URL, {"q": "CAFE"})
+
+        # Exacta, luego prefijo, luego contenida en otra parte de la palabra
+        self.assertEqual(self.words(response), ["café", "cafetería", "descafeinado"])
+
+    def test_matches_translation_and_custom_content(self):
+        self.assertEqual(self.words(self.client.get(URL, {"q": "bench"})), ["banco"])
+
+    def test_shared_scope_and_limit(self):
+        response = self.client.get(URL, {"q": "cafet", "scope": "shared", "limit": 1})
+
+        self.assertEqual([row["word"] for row in response.data], ["cafetera"])
+
+    def test_word_filter_uses_the_search_key(self):
+        response = self.client.get("/api/vocabulary/", {"word": "cafeteria"})
+
+        self.assertEqual(self.words(response), ["cafetería"])
+
+    def test_short_query_is_rejected(self):
+        self.assertEqual(self.client.get(URL, {"q": "é"}).status_code, 400)
+        # En todo el vocabulario compartido hacen falta 3 caracteres (mínimo que acota el índice de trigramas)
+        self.assertEqual(self.client.get(URL, {"q": "ca", "scope": "shared"}).status_code, 400)
+        self.assertEqual(self.client.get(URL, {"q": "ca"}).status_code, 200)
@@ -0,0 +1,180 @@
+# translation_service.py
+# Servicio único de traducción con Google Cloud Translate.
+# Un solo cliente por proceso (providers.py: sesión keep-alive, timeouts y reintentos) y llamadas por lote con listas de textos.
+# Antes de ir a la red se consulta la caché persistente TranslationCache.
+
+import hashlib
+import sys
+import unicodedata
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .cache_stats import eviction_due, record_cache_event
+from .models import TranslationCache
+from .providers import get_provider
+
+CACHE_NAME = "translation"
+
+# Límites por request de la API v2 (segmentos y caracteres)
+MAX_SEGMENTS_PER_REQUEST = 128
+MAX_CHARS_PER_REQUEST = 30000
+
+def get_translate_client():
+    """
+    Devuelve el cliente compartido de Google Translate (sesión keep-alive con timeouts),
+    creándolo la primera vez que se usa (nunca al importar el módulo).
+    """
+    return get_provider("translate").client()
+
+
+def translate_text(text, source_lang, target_lang, use_cache=True):
+    """
+    Traduce un texto. source_lang y target_lang son códigos compatibles con Google (e.g. 'es', 'en', 'pt-BR').
+    """
+    return translate_batch([text], source_lang, target_lang, use_cache=use_cache)[0]
+
+
+def translate_batch(texts, source_lang, target_lang, use_cache=True):
+    """
+    Traduce una lista de textos del mismo par de idiomas con el mínimo de requests.
+    Los textos repetidos se traducen una sola vez y el resultado conserva el orden de la entrada.
+    Con use_cache=False se ignora la caché al leer (regeneración forzada), pero se actualiza con el resultado.
+    """
+    unique_texts = list(dict.fromkeys(texts))
+    translations = _cached_translations(unique_texts, source_lang, target_lang) if use_cache else {}
+    pending = [text for text in unique_texts if text not in translations]
+    fresh = {}
+
+    for chunk in _chunks(pending):
+        print(f"[LOG] Traduciendo lote de {len(chunk)} textos ({source_lang} → {target_lang})", file=sys.stderr)
+        try:
+            results = get_provider("translate").call(
+                lambda: get_translate_client().translate(
+                    chunk, source_language=source_lang, target_language=target_lang
+                )
+            )
+        except Exception as e:
+            print(f"[ERROR] Fallo en Google Translate: {str(e)}", file=sys.stderr)
+            raise
+
+        # La API devuelve un resultado por entrada y en el mismo orden
+        if len(results) != len(chunk):
+            raise Exception(f"Google Translate devolvió {len(results)} resultados para {len(chunk)} textos.")
+        for text, result in zip(chunk, results):
+            fresh[text] = result["translatedText"]
+
+    _store_translations(fresh, source_lang, target_lang)
+    translations.update(fresh)
+    return [translations[text] for text in texts]
+
+
+def normalize_text(text):
+    # Mismo texto con distinto espaciado o composición Unicode → misma entrada de caché
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(text, source_lang, target_lang):
+    raw = f"{source_lang}\x1f{target_lang}\x1f{normalize_text(text)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _cached_translations(texts, source_lang, target_lang):
+    if not settings.TRANSLATION_CACHE_ENABLED or not texts:
+        return {}
+
+    keys = {cache_key(text, source_lang, target_lang): text for text in texts}
+    rows = TranslationCache.objects.filter(key__in=keys).values_list("key", "translated_text")
+    found = {keys[key]: translated for key, translated in rows}
+
+    if found:
+        TranslationCache.objects.filter(
+            key__in=[cache_key(text, source_lang, target_lang) for text in found]
+        ).update(hits=F("hits") + 1, last_used_at=timezone.now())
+    record_cache_event(CACHE_NAME, hits=len(found), misses=len(texts) - len(found))
+    return found
+
+
+def _store_translations(translations, source_lang, target_lang):
+    if not settings.TRANSLATION_CACHE_ENABLED or not translations:
+        return
+
+    TranslationCache.objects.bulk_create(
+        [
+            TranslationCache(
+                key=cache_key(text, source_lang, target_lang),
+                source_code=source_lang,
+                target_code=target_lang,
+                source_text=text,
+                translated_text=translated,
+            )
+            for text, translated in translations.items()
+        ],
+        # Otro worker pudo guardar la misma traducción a la vez; en una regeneración se sobrescribe
+        update_conflicts=True,
+        unique_fields=["key"],
+        update_fields=["translated_text", "last_used_at"],
+    )
+    if eviction_due():
+        evict_translation_cache()
+
+
+def evict_translation_cache(max_entries=None):
+    """
+    Expulsión LRU: si la tabla supera el máximo, borra las entradas usadas hace más tiempo
+    hasta quedar en el 90% del límite (para no expulsar en cada inserción).
+    """
+    max_entries = max_entries or settings.TRANSLATION_CACHE_MAX_ENTRIES
+    total = TranslationCache.objects.count()
+    if total <= max_entries:
+        return 0
+
+    excess = total - int(max_entries * 0.9)
+    oldest = list(TranslationCache.objects.order_by("last_used_at", "id").values_list("id", flat=True)[:excess])
+    deleted, _ = TranslationCache.objects.filter(id__in=oldest).delete()
+    record_cache_event(CACHE_NAME, evictions=deleted)
+    return deleted
+
+
+def _chunks(texts):
+    chunk, chars = [], 0
+    for text in texts:
+        if chunk and (len(chunk) >= MAX_SEGMENTS_PER_REQUEST or chars + len(text) > MAX_CHARS_PER_REQUEST):
+            yield chunk
+            chunk, chars = [], 0
+        chunk.append(text)
+        chars += len(text)
+    if chunk:
+        yield chunk
+
+
+def translate_example_sentences(contents, only_missing=False, use_cache=True):
+    """
+    (Re)traduce la frase de ejemplo de varios SharedVocabularyWord / CustomWordContent,
+    agrupando por par de idiomas en llamadas por lote. Guarda con bulk_update y devuelve los objetos actualizados.
+    """
+    groups = {}
+    for content in contents:
+        if not content.example_sentence:
+            continue
+        if only_missing and content.example_translation:
+            continue
+        key = (content.source_lang.code, content.target_lang.code)
+        groups.setdefault(key, []).append(content)
+
+    updated = []
+    for (source_code, target_code), items in groups.items():
+        translated = translate_batch([c.example_sentence for c in items], source_code, target_code, use_cache=use_cache)
+        for content, text in zip(items, translated):
+            content.example_translation = text
+            content.updated_at = timezone.now()  # bulk_update no aplica auto_now
+        updated.extend(items)
+
+    by_model = {}
+    for content in updated:
+        by_model.setdefault(type(content), []).append(content)
+    for model, objs in by_model.items():
+        model.objects.bulk_update(objs, ["example_translation", "updated_at"])
+
+    return updated
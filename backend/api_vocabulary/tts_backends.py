@@ -0,0 +1,135 @@
+# tts_backends.py
+# Motores de texto a voz intercambiables. Cada idioma elige el suyo (Language.tts_backend / tts_voice):
+# - gtts: Google Translate TTS (red, mp3). Es el motor por defecto.
+# - pyttsx3: motor local sin conexión (espeak en Linux, wav), ejecutado en un pool de procesos para
+#   generar audio en masa sin depender de un servicio externo ni de sus límites de uso.
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from gtts import gTTS
+
+from .providers import get_provider
+
+
+def synthesize_gtts(text, lang_code, tld=None):
+    # tld permite elegir el acento (p. ej. "com.mx", "co.uk")
+    provider = get_provider("tts")
+    tts = gTTS(text=text, lang=lang_code, tld=tld or "com", timeout=provider.timeout)
+
+    def synthesize():
+        audio_buffer = BytesIO()
+        tts.write_to_fp(audio_buffer)
+        return audio_buffer.getvalue()
+
+    return provider.call(synthesize)
+
+
+class TTSBackend:
+    name = None
+    audio_format = None
+
+    def synthesize(self, text, lang_code, voice=""):
+        """Devuelve los bytes del audio en self.audio_format."""
+        raise NotImplementedError
+
+    def voice_label(self, voice=""):
+        """Identifica motor + voz dentro de la clave del AudioAsset."""
+        return f"{self.name}:{voice or 'default'}"
+
+
+class GTTSBackend(TTSBackend):
+    name = "gtts"
+    audio_format = "mp3"
+
+    def synthesize(self, text, lang_code, voice=""):
+        if voice:
+            return synthesize_gtts(text, lang_code, tld=voice)
+        return synthesize_gtts(text, lang_code)
+
+    def voice_label(self, voice=""):
+        # Los audios generados antes de existir los motores usan la voz "default": se conservan sus claves
+        return voice or "default"
+
+
+# ---- pyttsx3 (se ejecuta en procesos aparte: el motor no es seguro entre hilos y bloquea el GIL) ----
+
+_engine = None
+
+
+def _pyttsx3_synthesize(text, lang_code, voice, rate):
+    """Corre dentro de un proceso del pool. Reutiliza un motor por proceso."""
+    global _engine
+    import pyttsx3
+
+    if _engine is None:
+        _engine = pyttsx3.init()
+
+    _engine.setProperty("voice", voice or lang_code)  # espeak acepta el código de idioma como voz
+    if rate:
+        _engine.setProperty("rate", rate)
+
+    fd, path = tempfile.mkstemp(suffix=".wav")
+    os.close(fd)
+    try:
+        _engine.save_to_file(text, path)
+        _engine.runAndWait()
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(path)
+
+
+class Pyttsx3Backend(TTSBackend):
+    name = "pyttsx3"
+    audio_format = "wav"
+
+    def __init__(self):
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                # spawn: no se hereda el estado del proceso web (hilos, conexiones a la base de datos)
+                self._pool = ProcessPoolExecutor(
+                    max_workers=settings.TTS_PROCESS_POOL_SIZE or None,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def synthesize(self, text, lang_code, voice=""):
+        future = self.get_pool().submit(_pyttsx3_synthesize, text, lang_code, voice, settings.TTS_PYTTSX3_RATE)
+        audio_bytes = future.result(timeout=settings.TTS_SYNTHESIS_TIMEOUT)
+        if not audio_bytes:
+            raise RuntimeError(f"pyttsx3 no generó audio para '{text}' ({lang_code})")
+        return audio_bytes
+
+
+TTS_BACKENDS = {backend.name: backend for backend in (GTTSBackend(), Pyttsx3Backend())}
+TTS_BACKEND_CHOICES = [(name, name) for name in TTS_BACKENDS]
+
+
+def get_tts_backend(name=None):
+    name = name or settings.TTS_DEFAULT_BACKEND
+    try:
+        return TTS_BACKENDS[name]
+    except KeyError:
+        print(f"[ERROR] Motor TTS desconocido '{name}', se usa gTTS", file=sys.stderr)
+        return TTS_BACKENDS["gtts"]
+
+
+def tts_for_language(language):
+    """
+    Devuelve (backend, lang_code, voice) configurados para un Language.
+    Sin idioma se usa inglés con el motor por defecto.
+    """
+    if language is None:
+        return get_tts_backend(), "en", ""
+    return get_tts_backend(language.tts_backend), language.code, language.tts_voice
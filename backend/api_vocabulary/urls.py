@@ -1,10 +1,13 @@
 from rest_framework.routers import DefaultRouter
 from django.urls import path, include
-from .views import UserVocabularyWordViewSet, LanguageViewSet, GenerateAudioView, BulkUploadView, BulkUploadTemplateView
+from .views import UserVocabularyWordViewSet, LanguageViewSet, DeckViewSet, GenerationJobViewSet, ExportJobViewSet, GenerateAudioView, BulkUploadView, BulkUploadTemplateView
 
 router = DefaultRouter()
 router.register(r'vocabulary', UserVocabularyWordViewSet, basename="vocabulary")
 router.register(r'languages', LanguageViewSet, basename="language")
+router.register(r'decks', DeckViewSet, basename="deck")
+router.register(r'generation-jobs', GenerationJobViewSet, basename="generation-job")
+router.register(r'export-jobs', ExportJobViewSet, basename="export-job")
 
 urlpatterns = [
     path('', include(router.urls)),
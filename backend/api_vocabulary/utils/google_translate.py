@@ -1,11 +1,10 @@
-from google.cloud import translate_v2 as translate
+from api_vocabulary.translation_service import translate_text as _translate_text
 
-client = translate.Client()
 
 def translate_text(text: str, source: str, target: str) -> str:
     """
     Traduce un texto usando Google Cloud Translate.
     source y target son códigos de idioma compatibles con Google (e.g. 'fr', 'es', 'en', 'pt-BR', etc.)
+    Se mantiene por compatibilidad: usa el cliente compartido de translation_service.
     """
-    result = client.translate(text, source_language=source, target_language=target)
-    return result["translatedText"]
+    return _translate_text(text, source, target)
@@ -1,58 +1,268 @@
-from rest_framework import viewsets, status, serializers
+from rest_framework import mixins, viewsets, status, serializers
 from rest_framework.decorators import action
-from django.http import FileResponse, Http404
+from django.http import StreamingHttpResponse
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.http import HttpResponse
 from .permissions import IsAuthenticatedAndVerified
 from rest_framework.parsers import MultiPartParser
 from django.db.models import Q
-from .models import UserVocabularyWord, SharedVocabularyWord, CustomWordContent, Language
-from .serializers import UserVocabularyWordSerializer, LanguageSerializer
-from django.db import IntegrityError, transaction
-from openai import OpenAI
-import os, io, csv, sys
+from django.conf import settings
+from .models import (
+    UserVocabularyWord, SharedVocabularyWord, CustomWordContent, Language, GenerationJob, ExportJob, Deck,
+    context_digest, language_map, normalize_deck_key
+)
+from .serializers import (
+    UserVocabularyWordSerializer, UserVocabularyWordCompactSerializer, LanguageSerializer,
+    GenerationJobSerializer, ExportJobSerializer, SharedVocabularyWordSerializer, DeckSerializer
+)
+from .search import MIN_QUERY_LENGTH, MIN_SHARED_QUERY_LENGTH, normalize_search_key, search_shared_words, search_user_vocabulary
+from .pagination import OptionalCursorPagination
+import io, csv, sys
 import re
-from google.cloud import translate_v2 as gcloud_translate
+import json
+from functools import partial
+from .translation_service import translate_text, translate_batch
 #from deep_translator import GoogleTranslator
 from .audio_utils import generate_gtts_audio_for_word, generate_gtts_audio_for_sentence
-from .anki_exporter import generate_apkg_for_user
+from .generation_pipeline import run_generation_pipeline
+from .anki_exporter import apkg_filename, prepare_apkg_export
+from .artifact_delivery import deliver_artifact
+from .artifact_http import call_after
+from .jobs import confirm_export_download, enqueue_export_job, enqueue_generation_job
+from .single_flight import get_or_generate_shared
+from .llm_cache import cached_chat_completion
+from .providers import ProviderUnavailable, get_provider
 from rest_framework.permissions import AllowAny
 
 
+# Idiomas que anida UserVocabularyWordSerializer (dos por contenido)
+NESTED_LANGUAGES = (
+    "shared_word__source_lang", "shared_word__target_lang",
+    "custom_content__source_lang", "custom_content__target_lang",
+)
+
+
+def is_true_flag(value):
+    """Interpreta una bandera de la query o del body: JSON (true) o texto de formulario ("true", "1", "yes")."""
+    return str(value).lower() in ("1", "true", "yes")
+
+
 class LanguageViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Language.objects.all()
     serializer_class = LanguageSerializer
     permission_classes = [IsAuthenticatedAndVerified]
 
+    @action(detail=False, methods=["get"], url_path="map", url_name="map")
+    def map(self, request):
+        """{id: {code, name}} para resolver los idiomas de las listas compactas (?view=compact)."""
+        response = Response(language_map())
+        response["Cache-Control"] = f"private, max-age={settings.LANGUAGE_MAP_CACHE_SECONDS}"
+        return response
+
+class DeckViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Mazos del usuario con su cantidad de palabras y la fecha del último cambio (mantenidos por signals.py):
+    una sola consulta sobre Deck, sin recorrer las palabras.
+    """
+    serializer_class = DeckSerializer
+    permission_classes = [IsAuthenticatedAndVerified]
+
+    def get_queryset(self):
+        return Deck.objects.filter(user=self.request.user, word_count__gt=0).order_by("name")
+
+class GenerationJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Estado de los trabajos de generación encolados con POST /api/vocabulary/?async=true
+    """
+    serializer_class = GenerationJobSerializer
+    permission_classes = [IsAuthenticatedAndVerified]
+
+    def get_queryset(self):
+        return (
+            GenerationJob.objects.filter(user=self.request.user)
+            .select_related("user_word__shared_word", "user_word__custom_content")
+            .select_related(*(f"user_word__{name}" for name in NESTED_LANGUAGES))
+            .order_by("-created_at")
+        )
+
+class ExportJobViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Exportaciones .apkg en segundo plano: POST encola el mazo (202 con el id del trabajo), GET informa el progreso
+    (notas renderizadas y audios reunidos) y GET {id}/download/ entrega el archivo con ETag, Last-Modified y Range.
+    """
+    serializer_class = ExportJobSerializer
+    permission_classes = [IsAuthenticatedAndVerified]
+
+    def get_queryset(self):
+        return ExportJob.objects.filter(user=self.request.user).select_related("artifact").order_by("-created_at")
+
+    def create(self, request, *args, **kwargs):
+        deck_name = (request.data.get("deck_name") or "").strip()
+        ids = request.data.get("ids")
+        # Desde un formulario llegan como texto ("false"): mismo criterio que ?async= y ?since_last_download=
+        allow_duplicates = is_true_flag(request.data.get("allow_duplicates", False))
+        since_last_download = is_true_flag(request.data.get("since_last_download", False))
+
+        if ids and (not isinstance(ids, list) or not all(isinstance(i, int) for i in ids)):
+            return Response({"error": "El campo 'ids' debe ser una lista de enteros."}, status=status.HTTP_400_BAD_REQUEST)
+
+        words = UserVocabularyWord.objects.filter(user=request.user)
+        if ids:
+            words = words.filter(id__in=ids)
+        elif deck_name:
+            words = words.filter(deck_ref__key=normalize_deck_key(deck_name))
+        if not words.exists():
+            return Response({"error": "No se encontraron palabras para exportar."}, status=status.HTTP_404_NOT_FOUND)
+
+        job = enqueue_export_job(
+            request.user, deck_name=deck_name, ids=ids, allow_duplicates=allow_duplicates,
+            since_last_download=since_last_download
+        )
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=["get"], url_path="download", url_name="download")
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != ExportJob.STATUS_DONE:
+            return Response(
+                {"error": "La exportación todavía no terminó.", "status": job.status},
+                status=status.HTTP_409_CONFLICT
+            )
+        if not job.artifact:
+            return Response(
+                {"error": "El archivo ya no está disponible; vuelve a exportar el mazo."},
+                status=status.HTTP_410_GONE
+            )
+        suffix = "_nuevas" if job.since_last_download else ""
+        return deliver_artifact(
+            request, job.artifact, apkg_filename(f"{job.artifact.deck_name}{suffix}"),
+            on_delivered=partial(confirm_export_download, job)
+        )
+
 class UserVocabularyWordViewSet(viewsets.ModelViewSet):
+    """
+    Listado: la lista completa por defecto; con ?cursor= o ?page_size= se pagina por cursor.
+    ?view=compact devuelve filas planas con los idiomas como id y ?fields=id,word,... limita los campos.
+    """
     queryset = UserVocabularyWord.objects.none()
     serializer_class = UserVocabularyWordSerializer
     permission_classes = [IsAuthenticatedAndVerified]
+    pagination_class = OptionalCursorPagination
+
+    def get_serializer_class(self):
+        if self.action in ("list", "retrieve", "search") and self.request.query_params.get("view") == "compact":
+            return UserVocabularyWordCompactSerializer
+        return super().get_serializer_class()
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        fields = self.request.query_params.get("fields") if self.action in ("list", "retrieve", "search") else None
+        if fields:
+            context["fields"] = [name.strip() for name in fields.split(",") if name.strip()]
+        return context
 
     def get_queryset(self):
         user = self.request.user
-        queryset = UserVocabularyWord.objects.filter(user=user)
+        # Contenido en el mismo SELECT; los idiomas solo si la representación los anida (la compacta usa los ids).
+        # Mismo orden con o sin paginación (el del cursor, cubierto por user_word_user_created_idx)
+        queryset = (
+            UserVocabularyWord.objects.filter(user=user)
+            .select_related("shared_word", "custom_content")
+            .order_by(*OptionalCursorPagination.ordering)
+        )
+        if self.get_serializer_class() is not UserVocabularyWordCompactSerializer:
+            queryset = queryset.select_related(*NESTED_LANGUAGES)
 
         deck = self.request.query_params.get('deck')
         word = self.request.query_params.get('word')
 
         if deck:
-            queryset = queryset.filter(deck__iexact=deck)
+            # Por la clave normalizada del mazo (índice único de Deck), no con un iexact sobre cada palabra
+            queryset = queryset.filter(deck_ref__key=normalize_deck_key(deck))
 
         if word:
+            # Sobre search_key (sin acentos, palabra y traducción), con índice de trigramas si hay pg_trgm
+            key = normalize_search_key(word)
             queryset = queryset.filter(
-                Q(shared_word__word__icontains=word) |
-                Q(custom_content__word__icontains=word)
+                Q(custom_content__isnull=True, shared_word__search_key__contains=key) |
+                Q(custom_content__search_key__contains=key)
             )
 
         return queryset
 
-    def perform_create(self, serializer):
-        print("[LOG] perform_create ejecutado", file=sys.stderr)    # Debugging line
-        validated = serializer.validated_data
-        user = self.request.user
+    @action(detail=False, methods=["get"], url_path="search", url_name="search")
+    def search(self, request):
+        """
+        GET /api/vocabulary/search/?q=texto: palabras del usuario ordenadas por relevancia (exacta, prefijo,
+        similitud). ?scope=shared busca en todo el vocabulario compartido. ?limit= (máx. SEARCH_MAX_RESULTS).
+        """
+        query = (request.query_params.get("q") or "").strip()
+        shared_scope = request.query_params.get("scope") == "shared"
+        min_length = MIN_SHARED_QUERY_LENGTH if shared_scope else MIN_QUERY_LENGTH
+        if len(normalize_search_key(query)) < min_length:
+            return Response(
+                {"error": f"La búsqueda necesita al menos {min_length} caracteres."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = min(int(request.query_params.get("limit", settings.SEARCH_DEFAULT_RESULTS)), settings.SEARCH_MAX_RESULTS)
+        except ValueError:
+            return Response({"error": "El parámetro 'limit' debe ser un entero."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if shared_scope:
+            shared = SharedVocabularyWord.objects.select_related("source_lang", "target_lang")
+            results = search_shared_words(shared, query)[:max(limit, 1)]
+            return Response(SharedVocabularyWordSerializer(results, many=True, context=self.get_serializer_context()).data)
+
+        results = search_user_vocabulary(self.get_queryset(), query)[:max(limit, 1)]
+        return Response(self.get_serializer(results, many=True).data)
+
+    def create(self, request, *args, **kwargs):
+        if not self.use_async_generation():
+            return super().create(request, *args, **kwargs)
+
+        # ⏳ Modo trabajo: se valida y se encola; el worker genera el contenido
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        word, source_lang, target_lang, context = self.validate_creation_fields(serializer.validated_data)
+
+        if not context and UserVocabularyWord.objects.filter(
+            user=request.user,
+            shared_word__word=word,
+            shared_word__source_lang=source_lang,
+            shared_word__target_lang=target_lang
+        ).exists():
+            raise serializers.ValidationError({
+                "word": "Ya tienes esta palabra en tu lista."
+            })
 
+        job = enqueue_generation_job(
+            request.user,
+            word,
+            source_lang,
+            target_lang,
+            context=context,
+            deck=serializer.validated_data.get("deck", ""),
+        )
+        return Response(
+            GenerationJobSerializer(job, context=self.get_serializer_context()).data,
+            status=status.HTTP_202_ACCEPTED
+        )
+
+    def use_async_generation(self):
+        """
+        El modo trabajo se activa con ?async=true (o "async": true en el body),
+        o para todos los requests con VOCABULARY_ASYNC_GENERATION=True.
+        """
+        flag = self.request.query_params.get("async")
+        if flag is None and hasattr(self.request.data, "get"):
+            flag = self.request.data.get("async")
+        if flag is None:
+            return settings.VOCABULARY_ASYNC_GENERATION
+        return is_true_flag(flag)
+
+    def validate_creation_fields(self, validated):
         word = validated.get("word")
         source_lang = validated.get("source_lang")
         target_lang = validated.get("target_lang")
@@ -66,8 +276,21 @@ class UserVocabularyWordViewSet(viewsets.ModelViewSet):
         if not word or not source_lang or not target_lang:
             raise serializers.ValidationError({"error": "Faltan campos obligatorios: 'word', 'source_lang' o 'target_lang'."})
 
-        word = word.strip().lower()
+        return word.strip().lower(), source_lang, target_lang, (context or "").strip()
+
+    def perform_create(self, serializer):
+        print("[LOG] perform_create ejecutado", file=sys.stderr)    # Debugging line
+        word, source_lang, target_lang, context = self.validate_creation_fields(serializer.validated_data)
+        user = self.request.user
+
+        content = self.resolve_word_content(user, word, source_lang, target_lang, context)
+        serializer.save(user=user, **content)
 
+    def resolve_word_content(self, user, word, source_lang, target_lang, context=None):
+        """
+        Obtiene (o genera) el contenido de la palabra y devuelve los kwargs para crear el UserVocabularyWord:
+        {"custom_content": ...} o {"shared_word": ...}. Lo usan tanto el request como el worker de trabajos.
+        """
         # 🧠 Premium: con contexto → flujo Custom
         if context:
             print("[FLOW] Generación personalizada activada", file=sys.stderr)  # Debugging line
@@ -76,7 +299,7 @@ class UserVocabularyWordViewSet(viewsets.ModelViewSet):
                 word=word,
                 source_lang=source_lang,
                 target_lang=target_lang,
-                context=context.strip()
+                context_hash=context_digest(context)
             ).exists():
                 raise serializers.ValidationError({
                     "word": "Ya existe una palabra personalizada con ese contexto."
@@ -87,58 +310,60 @@ class UserVocabularyWordViewSet(viewsets.ModelViewSet):
                 word=word,
                 source_lang=source_lang,
                 target_lang=target_lang,
-                context=context.strip()
+                context=context
             )
-            self.generate_content_for_custom(custom)
-            serializer.save(user=user, custom_content=custom)
-
-        else:
-            print("[FLOW] Generación compartida activada", file=sys.stderr)  # Debugging line
-            # 🔄 Reutilizable: flujo compartido (Shared)
-            shared = SharedVocabularyWord.objects.filter(
-                word=word,
-                source_lang=source_lang,
-                target_lang=target_lang
-            ).first()
-
-            if not shared:
-                shared = SharedVocabularyWord.objects.create(
-                    word=word,
-                    source_lang=source_lang,
-                    target_lang=target_lang
-                )
-                self.generate_content_for_shared(shared)
-
-            # Verifica si el usuario ya la tiene
-            if UserVocabularyWord.objects.filter(user=user, shared_word=shared).exists():
-                raise serializers.ValidationError({
-                    "word": "Ya tienes esta palabra en tu lista."
-                })
+            try:
+                self.generate_content_for_custom(custom)
+            except Exception:
+                # Sin filas a medio generar: bloquearían el reintento como "ya existe" (igual que single_flight)
+                custom.delete()
+                raise
+            return {"custom_content": custom}
+
+        print("[FLOW] Generación compartida activada", file=sys.stderr)  # Debugging line
+        # 🔄 Reutilizable: flujo compartido (Shared), generado una sola vez aunque lleguen requests simultáneos
+        shared = get_or_generate_shared(word, source_lang, target_lang, self.generate_content_for_shared)
+
+        # Verifica si el usuario ya la tiene
+        if UserVocabularyWord.objects.filter(user=user, shared_word=shared).exists():
+            raise serializers.ValidationError({
+                "word": "Ya tienes esta palabra en tu lista."
+            })
 
-            serializer.save(user=user, shared_word=shared)
+        return {"shared_word": shared}
 
     def get_openai_client(self):
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            print("[ERROR] Falta OPENAI_API_KEY", file=sys.stderr)  # Debugging line
-            raise Exception("La API Key de OpenAI no está definida en las variables de entorno.")
-        print("[OK] OPENAI_API_KEY encontrada", file=sys.stderr)    # Debugging line
-        return OpenAI(api_key=api_key)
+        # Cliente compartido del proceso (keep-alive, timeouts y circuit breaker en providers.py)
+        return get_provider("openai").client()
     
-    def translate_with_google_cloud(self, text, source_lang, target_lang):
+    def translate_with_google_cloud(self, text, source_lang, target_lang, use_cache=True):
         print(f"[LOG] Traduciendo con Google Cloud: '{text}' ({source_lang} → {target_lang})", file=sys.stderr)
-        try:
-            client = gcloud_translate.Client()
-            result = client.translate(text, source_language=source_lang, target_language=target_lang)
-            print(f"[LOG] Resultado de traducción: {result}", file=sys.stderr)
-            return result['translatedText']
-        except Exception as e:
-            print(f"[ERROR] Fallo en Google Translate: {str(e)}", file=sys.stderr)
-            raise
+        result = translate_text(text, source_lang, target_lang, use_cache=use_cache)
+        print(f"[LOG] Resultado de traducción: {result}", file=sys.stderr)
+        return result
 
 
-    def generate_content_for_shared(self, shared):
+    def generate_content_for_shared(self, shared, llm_result=None, translated_sentence=None, force_regenerate=False):
+        """
+        Genera frase, traducción y audios para una palabra compartida.
+        Si llega `llm_result` (example_sentence, translation) desde una generación por lote, se omite la llamada a OpenAI;
+        si además llega `translated_sentence` (traducción por lote), se omite la llamada a Google Translate.
+        Con force_regenerate=True se ignoran las cachés de OpenAI y de traducciones.
+        """
         print(f"[LOG] Generando contenido para palabra compartida: {shared.word}", file=sys.stderr) # Debugging line
+        self.last_stage_timings = run_generation_pipeline(
+            shared,
+            generate_llm=lambda: self.generate_llm_content_for_shared(shared, bypass_cache=force_regenerate),
+            translate=lambda sentence: self.translate_with_google_cloud(
+                sentence, shared.source_lang.code, shared.target_lang.code, use_cache=not force_regenerate
+            ),
+            llm_result=llm_result,
+            translated_sentence=translated_sentence if llm_result else None,
+            on_stage_done=getattr(self, "on_stage_done", None),
+        )
+        print(f"[LOG] Proceso finalizado para: {shared.word}",file=sys.stderr)  # Debugging line
+
+    def generate_llm_content_for_shared(self, shared, bypass_cache=False):
         prompt = (
             f"You are an AI assistant helping users learn vocabulary through example sentences and direct translations.\n\n"
             f"Your task is to generate the following for the word **'{shared.word}'** in the source language **'{shared.source_lang.name}'**:\n\n"
@@ -156,47 +381,116 @@ class UserVocabularyWordViewSet(viewsets.ModelViewSet):
             f"- Just follow the FORMAT strictly and output the two blocks only.\n"
         )
 
-        client = self.get_openai_client()
         print("[LOG] Llamando a OpenAI...", file=sys.stderr) # Debugging line
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
+        example_sentence, translation = cached_chat_completion(
+            self.get_openai_client,
+            "gpt-3.5-turbo",
+            [
                 {"role": "system", "content": "Eres un asistente que ayuda a aprender vocabulario con frases y traducciones."},
                 {"role": "user", "content": prompt}
-            ]
+            ],
+            parse=self.parse_single_response,
+            bypass_cache=bypass_cache,
         )
-        print("[LOG] Respuesta de OpenAI recibida", file=sys.stderr) # Debugging line
+        print(f"[LOG] Frase extraída: {example_sentence}", file=sys.stderr)  # Debugging line
+        print(f"[LOG] Traducción extraída: {translation}", file=sys.stderr)  # Debugging line
 
-        content = response.choices[0].message.content.strip()
-        print(f"[LOG] Contenido generado por OpenAI: {content}", file=sys.stderr) # Debugging line
+        return example_sentence, translation
 
+    def parse_single_response(self, content):
+        print(f"[LOG] Contenido generado por OpenAI: {content}", file=sys.stderr) # Debugging line
         example_sentence, translation = self.extract_response_data(content)
-        print(f"[LOG] Frase extraída: {example_sentence}", file=sys.stderr)  # Debugging line
-        print(f"[LOG] Traducción extraída: {translation}", file=sys.stderr)  # Debugging line
 
         if not example_sentence or not translation:
             raise Exception(f"No se pudo extraer contenido de OpenAI. Respuesta: {content}")
 
-        print("[LOG] Traduciendo frase con Google Translate...", file=sys.stderr)    # Debugging line      
-        translated_sentence = self.translate_with_google_cloud(
-            example_sentence, shared.source_lang.code, shared.target_lang.code
+        return [example_sentence, translation]
+
+    def generate_batch_llm_content(self, words, source_lang, target_lang):
+        """
+        Genera frase de ejemplo y traducción para varias palabras del mismo par de idiomas en una sola
+        llamada a OpenAI (respuesta JSON). Devuelve {word: (example_sentence, translation)} solo con los
+        elementos que se pudieron interpretar; el resto debe generarse palabra por palabra.
+        """
+        words_json = json.dumps(list(words), ensure_ascii=False)
+        prompt = (
+            f"You are an AI assistant helping users learn vocabulary through example sentences and direct translations.\n\n"
+            f"Your task is to generate the following for EACH word of the list below, in the source language **'{source_lang.name}'**:\n\n"
+            f"### WORDS:\n"
+            f"{words_json}\n\n"
+            f"### FORMAT STRICTLY:\n"
+            f"A JSON object with this shape, one item per word and in the same order:\n"
+            f'{{"items": [{{"word": "<the word exactly as given>", "example_sentence": "<example_sentence_here>", '
+            f'"translation": "<only the translation of the word in \'{target_lang.name}\', with the grammatical type abbreviated like (v.), (n), (adj.), etc.>"}}]}}\n\n'
+            f"### RULES:\n"
+            f"- Each example sentence must be written in **{source_lang.name}** and use its word.\n"
+            f"- Each translation must be in **{target_lang.name}** and ONLY include the meaning of its word in this format: (v.) traducción, (n) traducción, etc.\n"
+            f"- DO NOT include full sentence translations.\n"
+            f"- DO NOT explain anything or ask any questions.\n"
+            f"- Output ONLY the JSON object.\n"
+        )
+
+        def parse(content):
+            results = self.extract_batch_response_data(content, words)
+            if not results:
+                raise Exception(f"No se pudo interpretar ningún elemento del lote. Respuesta: {content}")
+            return {word: list(result) for word, result in results.items()}
+
+        print(f"[LOG] Llamando a OpenAI en lote para {len(words)} palabras...", file=sys.stderr) # Debugging line
+        parsed = cached_chat_completion(
+            self.get_openai_client,
+            "gpt-3.5-turbo",
+            [
+                {"role": "system", "content": "Eres un asistente que ayuda a aprender vocabulario con frases y traducciones."},
+                {"role": "user", "content": prompt}
+            ],
+            parse=parse,
+            response_format={"type": "json_object"},
         )
-        print(f"[LOG] Traducción generada: {translated_sentence}", file=sys.stderr)  # Debugging line
-
-        shared.translation = translation
-        shared.example_sentence = example_sentence
-        shared.example_translation = translated_sentence
-
-        # Generar audios
-        print("[LOG] Generando audio de palabra y frase...", file=sys.stderr)    # Debugging line
-        generate_gtts_audio_for_word(shared)
-        generate_gtts_audio_for_sentence(shared)
-        print("[CHECK] ¿Realmente llegamos al final de generate_content_for_shared?", file=sys.stderr)  # Debugging line
-        shared.save()
-        print(f"[LOG] Proceso finalizado para: {shared.word}",file=sys.stderr)  # Debugging line
+        return {word: tuple(result) for word, result in parsed.items()}
 
-    def generate_content_for_custom(self, custom):
+    def extract_batch_response_data(self, content, words):
+        """
+        Interpreta la respuesta JSON de una generación por lote.
+        Los elementos inválidos (faltan campos, traducción con forma de oración, palabra desconocida) se descartan.
+        """
+        try:
+            items = json.loads(content).get("items", [])
+        except (ValueError, AttributeError):
+            print(f"[ERROR] Respuesta de lote no es JSON válido: {content}", file=sys.stderr)  # Debugging line
+            return {}
+
+        expected = set(words)
+        results = {}
+        for item in items if isinstance(items, list) else []:
+            if not isinstance(item, dict):
+                continue
+            word = str(item.get("word", "")).strip().lower()
+            example_sentence = str(item.get("example_sentence", "")).strip("* ").strip()
+            translation = str(item.get("translation", "")).strip("* ").strip()
+            if word not in expected or word in results or not example_sentence or not translation:
+                continue
+            try:
+                results[word] = (example_sentence, self.clean_translation(translation))
+            except ValueError:
+                continue
+
+        print(f"[LOG] Lote interpretado: {len(results)}/{len(expected)} palabras", file=sys.stderr)  # Debugging line
+        return results
+
+    def generate_content_for_custom(self, custom, force_regenerate=False):
         print(f"[LOG] Generando contenido para palabra personalizada: {custom.word} con contexto: {custom.context}", file=sys.stderr)    # Debugging line
+        self.last_stage_timings = run_generation_pipeline(
+            custom,
+            generate_llm=lambda: self.generate_llm_content_for_custom(custom, bypass_cache=force_regenerate),
+            translate=lambda sentence: self.translate_with_google_cloud(
+                sentence, custom.source_lang.code, custom.target_lang.code, use_cache=not force_regenerate
+            ),
+            on_stage_done=getattr(self, "on_stage_done", None),
+        )
+        print(f"[LOG] Proceso finalizado para: {custom.word}", file=sys.stderr)  # Debugging line
+
+    def generate_llm_content_for_custom(self, custom, bypass_cache=False):
         prompt = (
             f"You are an AI assistant helping users learn vocabulary through example sentences and direct translations.\n\n"
             f"Your task is to generate the following for the word **'{custom.word}'** in the source language **'{custom.source_lang.name}'**, "
@@ -215,40 +509,21 @@ class UserVocabularyWordViewSet(viewsets.ModelViewSet):
             f"- Just follow the FORMAT strictly and output the two blocks only.\n"
         )
 
-        client = self.get_openai_client()
         print("[LOG] Llamando a OpenAI...", file=sys.stderr) # Debugging line
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
+        example_sentence, translation = cached_chat_completion(
+            self.get_openai_client,
+            "gpt-3.5-turbo",
+            [
                 {"role": "system", "content": "Eres un asistente de vocabulario."},
                 {"role": "user", "content": prompt}
-            ]
+            ],
+            parse=self.parse_single_response,
+            bypass_cache=bypass_cache,
         )
-        print("[LOG] Respuesta de OpenAI recibida", file=sys.stderr) # Debugging line
-
-        content = response.choices[0].message.content.strip()
-        print(f"[LOG] Contenido generado por OpenAI: {content}", file=sys.stderr) # Debugging line
-        
-        example_sentence, translation = self.extract_response_data(content)
         print(f"[LOG] Frase extraída: {example_sentence}", file=sys.stderr)  # Debugging line
         print(f"[LOG] Traducción extraída: {translation}", file=sys.stderr)  # Debugging line
 
-        print("[LOG] Traduciendo frase con Google Translate...", file=sys.stderr)    # Debugging line
-        translated_sentence = self.translate_with_google_cloud(
-            example_sentence, custom.source_lang.code, custom.target_lang.code
-        )
-        print(f"[LOG] Traducción generada: {translated_sentence}", file=sys.stderr)  # Debugging line
-
-        custom.translation = translation
-        custom.example_sentence = example_sentence
-        custom.example_translation = translated_sentence
-
-        print("[LOG] Generando audio de palabra y frase...", file=sys.stderr)    # Debugging line
-        generate_gtts_audio_for_word(custom)
-        generate_gtts_audio_for_sentence(custom)
-
-        custom.save()
-        print(f"[LOG] Proceso finalizado para: {custom.word}", file=sys.stderr)  # Debugging line
+        return example_sentence, translation
 
     def extract_response_data(self, content):
         """
@@ -276,11 +551,18 @@ class UserVocabularyWordViewSet(viewsets.ModelViewSet):
         example_sentence = example_sentence.strip("* ").strip()
         translation = translation.strip("* ").strip()
 
+        return example_sentence, self.clean_translation(translation)
+
+    def clean_translation(self, translation):
+        """
+        Se asegura de que la traducción sea corta y con formato (v.) palabra, y no una oración.
+        Lanza ValueError si parece una oración completa.
+        """
         # ⚠️ Validación: evitar que la traducción sea una oración completa
         # Si contiene más de 6 palabras o termina en punto, algo anda mal
         if len(translation.split()) > 6 or translation.endswith("."):
             print(f"[ERROR] Traducción inválida: '{translation}'", file=sys.stderr)  # Debugging line
-            raise Exception(f"La traducción parece ser una oración completa: '{translation}'")
+            raise ValueError(f"La traducción parece ser una oración completa: '{translation}'")
 
         # Corrección de formato duplicado: "piña (v.) piña"
         match = re.match(r"^(.+?)\s+\((.*?)\)\s+\1$", translation)
@@ -288,7 +570,7 @@ class UserVocabularyWordViewSet(viewsets.ModelViewSet):
             root, abbr = match.groups()
             translation = f"({abbr}) {root}"
 
-        return example_sentence, translation
+        return translation
     
     @action(detail=False, methods=['get', 'post'], url_path='download-apkg', permission_classes=[IsAuthenticatedAndVerified])
     def download_apkg(self, request):
@@ -296,22 +578,45 @@ class UserVocabularyWordViewSet(viewsets.ModelViewSet):
         deck_name = request.query_params.get("deck_name", "").strip() or request.data.get("deck_name", "").strip()  # capturar desde la URL
         ids = request.data.get("ids")
         allow_duplicates = request.data.get("allow_duplicates", False)
+        # ?since_last_download=true: solo las palabras nuevas o modificadas desde la última descarga del mazo
+        since_last_download = is_true_flag(
+            request.query_params.get("since_last_download") or request.data.get("since_last_download", False)
+        )
         
         if ids and not isinstance(ids, list):
             return Response({"error": "El campo 'ids' debe ser una lista de enteros."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            apkg_path, final_deck_name = generate_apkg_for_user(
+            export = prepare_apkg_export(
                 user, 
                 deck_name=deck_name, 
                 ids=ids,
-                allow_duplicates=bool(allow_duplicates)
+                allow_duplicates=bool(allow_duplicates),
+                since_last_download=since_last_download
             )
-            filename = f"aiflashlang_{final_deck_name}.apkg"
-            return FileResponse(open(apkg_path, 'rb'), as_attachment=True, filename=filename)
+            # La descarga se registra en el historial (base del próximo delta) solo cuando llega completa
+            if export.cached:
+                response = deliver_artifact(
+                    request, export.artifact, export.filename, export.store, on_delivered=export.record_download
+                )
+            else:
+                # El .apkg se envía a medida que se arma; si es reutilizable, se guarda a la vez en disco
+                response = StreamingHttpResponse(
+                    call_after(export.stream(), export.record_download), content_type="application/octet-stream"
+                )
+                response["Content-Disposition"] = f'attachment; filename="{export.filename}"'
+            return response
 
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_404_NOT_FOUND)
+        except ProviderUnavailable as e:
+            return Response({"error": str(e.detail)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            print(f"[ERROR] Exportación .apkg fallida: {str(e)}", file=sys.stderr)
+            return Response(
+                {"error": "No se pudo generar el mazo. Intenta de nuevo o usa POST /api/export-jobs/."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
 
 class GenerateAudioView(APIView):
     permission_classes = [IsAuthenticatedAndVerified]
@@ -333,6 +638,8 @@ class GenerateAudioView(APIView):
             generate_gtts_audio_for_sentence(content)
             content.save()
             return Response({"message": "Audios generados correctamente."}, status=status.HTTP_200_OK)
+        except ProviderUnavailable as e:
+            return Response({"error": str(e.detail)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         except Exception as e:
             return Response({"error": f"Error al generar audios: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
@@ -372,6 +679,7 @@ class BulkUploadView(APIView):
         creator.request = request
 
         results = []
+        valid_rows = []
         for idx, row in enumerate(rows, start=2):  # empieza en 2 por encabezado
 
             word = row.get("word", "").strip().lower()
@@ -390,32 +698,31 @@ class BulkUploadView(APIView):
                 results.append({'line': idx, 'word': word, 'status': 'error', 'reason': 'Código de idioma inválido'})
                 continue
 
+            valid_rows.append((idx, word, source_lang, target_lang, deck))
+
+        # 📦 Generación por lote: una llamada a OpenAI por par de idiomas en lugar de una por palabra
+        batch_content = self.generate_batch_content(creator, valid_rows)
+
+        for idx, word, source_lang, target_lang, deck in valid_rows:
             try:
-                with transaction.atomic():
-                    shared = SharedVocabularyWord.objects.filter(
-                        word=word,
-                        source_lang=source_lang,
-                        target_lang=target_lang
-                    ).first()
-
-                    if not shared:
-                        shared = SharedVocabularyWord.objects.create(
-                            word=word,
-                            source_lang=source_lang,
-                            target_lang=target_lang
-                        )
-                        creator.generate_content_for_shared(shared)
-
-                    UserVocabularyWord.objects.get_or_create(
-                        user=request.user,
-                        shared_word=shared,
-                        deck=deck
-                    )
-                    results.append({'line': idx, 'word': word, 'status': 'ok'})
+                generate = partial(
+                    creator.generate_content_for_shared,
+                    **batch_content.get((word, source_lang.id, target_lang.id), {})
+                )
+                # Fuera de transaction.atomic(): el claim de single-flight debe verse desde otros requests
+                shared = get_or_generate_shared(word, source_lang, target_lang, generate)
+
+                UserVocabularyWord.objects.get_or_create(
+                    user=request.user,
+                    shared_word=shared,
+                    deck=deck
+                )
+                results.append({'line': idx, 'word': word, 'status': 'ok'})
 
             except Exception as e:
                 results.append({'line': idx, 'word': word, 'status': 'error', 'reason': str(e)})
 
+        results.sort(key=lambda r: r['line'])
         success = sum(1 for r in results if r['status'] == 'ok')
         errors = [r for r in results if r['status'] == 'error']
 
@@ -425,6 +732,55 @@ class BulkUploadView(APIView):
             'success': success,
             'errors': errors
         }, status=status.HTTP_207_MULTI_STATUS)
+
+    def generate_batch_content(self, creator, valid_rows):
+        """
+        Agrupa por par de idiomas las palabras que aún no tienen contenido compartido y las genera por lotes
+        (OpenAI y después Google Translate para las frases de ejemplo).
+        Devuelve {(word, source_lang_id, target_lang_id): kwargs para generate_content_for_shared}; las palabras
+        que falten (lote fallido o elemento inválido) se generan después de forma individual.
+        """
+        groups = {}
+        for _, word, source_lang, target_lang, _ in valid_rows:
+            group = groups.setdefault((source_lang.id, target_lang.id), (source_lang, target_lang, []))
+            if word not in group[2]:
+                group[2].append(word)
+
+        batch_size = settings.BULK_GENERATION_BATCH_SIZE
+        content = {}
+        for source_lang, target_lang, words in groups.values():
+            existing = set(
+                SharedVocabularyWord.objects.filter(
+                    word__in=words, source_lang=source_lang, target_lang=target_lang
+                ).exclude(example_sentence="").values_list("word", flat=True)
+            )
+            missing = [w for w in words if w not in existing]
+
+            for i in range(0, len(missing), batch_size):
+                chunk = missing[i:i + batch_size]
+                try:
+                    generated = creator.generate_batch_llm_content(chunk, source_lang, target_lang)
+                except Exception as e:
+                    print(f"[ERROR] Falló la generación por lote, se usará generación individual: {e}", file=sys.stderr)
+                    continue
+                for word, result in generated.items():
+                    content[(word, source_lang.id, target_lang.id)] = {"llm_result": result}
+
+                # 🌐 Todas las frases del lote en una sola llamada a Google Translate
+                chunk_keys = [(w, source_lang.id, target_lang.id) for w in generated]
+                try:
+                    translated = translate_batch(
+                        [content[key]["llm_result"][0] for key in chunk_keys],
+                        source_lang.code,
+                        target_lang.code
+                    )
+                except Exception as e:
+                    print(f"[ERROR] Falló la traducción por lote, se traducirá frase por frase: {e}", file=sys.stderr)
+                    continue
+                for key, text in zip(chunk_keys, translated):
+                    content[key]["translated_sentence"] = text
+
+        return content
     
 class BulkUploadTemplateView(APIView):
     permission_classes = [AllowAny]  # Permitir acceso sin autenticación
@@ -141,6 +141,8 @@ SECURE_HSTS_PRELOAD = True
 
 # temporalmente para pruebas
 CORS_ALLOW_ALL_ORIGINS = True
+# Cabeceras de la descarga .apkg que el frontend necesita leer
+CORS_EXPOSE_HEADERS = ["Content-Disposition"]
 
 # 🌐 CORS (para cuando integre el frontend)
 # CORS_ALLOWED_ORIGINS = [
@@ -155,4 +157,82 @@ EMAIL_PORT = int(os.getenv("EMAIL_PORT", 587))
 EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "True") == "True"
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
-DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL")
\ No newline at end of file
+DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL")
+
+# ⏳ Generación asíncrona de palabras (cola en PostgreSQL, sin broker)
+# Con True, POST /api/vocabulary/ responde 202 con un trabajo; también se activa por request con ?async=true
+VOCABULARY_ASYNC_GENERATION = os.getenv("VOCABULARY_ASYNC_GENERATION", "False") == "True"
+GENERATION_JOB_MAX_ATTEMPTS = int(os.getenv("GENERATION_JOB_MAX_ATTEMPTS", 3))
+
+# 📄 Listado de vocabulario: paginación por cursor opcional (?cursor= / ?page_size=) y mapa de idiomas cacheado
+VOCABULARY_PAGE_SIZE = int(os.getenv("VOCABULARY_PAGE_SIZE", 100))
+VOCABULARY_MAX_PAGE_SIZE = int(os.getenv("VOCABULARY_MAX_PAGE_SIZE", 500))
+LANGUAGE_MAP_CACHE_SECONDS = int(os.getenv("LANGUAGE_MAP_CACHE_SECONDS", 60 * 60))
+
+# 🔎 Búsqueda de palabras (GET /api/vocabulary/search/): resultados por defecto y máximo por request
+SEARCH_DEFAULT_RESULTS = int(os.getenv("SEARCH_DEFAULT_RESULTS", 20))
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", 100))
+
+# 🔒 Single-flight: un solo proceso genera cada SharedVocabularyWord; el resto espera su resultado
+SINGLE_FLIGHT_WAIT_TIMEOUT = int(os.getenv("SINGLE_FLIGHT_WAIT_TIMEOUT", 90))
+SINGLE_FLIGHT_STALE_SECONDS = int(os.getenv("SINGLE_FLIGHT_STALE_SECONDS", 120))
+
+# 📦 Palabras por llamada a OpenAI en la carga masiva (generación por lote)
+BULK_GENERATION_BATCH_SIZE = int(os.getenv("BULK_GENERATION_BATCH_SIZE", 25))
+
+# 🌐 Caché persistente de traducciones (tabla TranslationCache con expulsión LRU)
+TRANSLATION_CACHE_ENABLED = os.getenv("TRANSLATION_CACHE_ENABLED", "True") == "True"
+TRANSLATION_CACHE_MAX_ENTRIES = int(os.getenv("TRANSLATION_CACHE_MAX_ENTRIES", 200000))
+# Fracción de escrituras que comprueban el límite de las cachés en tabla (COUNT(*)); `cache_stats --evict` lo aplica siempre
+CACHE_EVICTION_SAMPLE_RATE = float(os.getenv("CACHE_EVICTION_SAMPLE_RATE", 0.01))
+
+# 🤖 Caché de respuestas de OpenAI (tabla LLMResponseCache con TTL y expulsión LRU)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "True") == "True"
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", 60 * 60 * 24 * 30))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 50000))
+
+# ⚡ Hilos del pipeline de generación por palabra (audios en paralelo con OpenAI/Translate); 0 = secuencial
+GENERATION_PIPELINE_WORKERS = int(os.getenv("GENERATION_PIPELINE_WORKERS", 2))
+
+# 🔊 Motores de texto a voz (cada Language puede elegir el suyo: "gtts" o "pyttsx3")
+TTS_DEFAULT_BACKEND = os.getenv("TTS_DEFAULT_BACKEND", "gtts")
+TTS_PROCESS_POOL_SIZE = int(os.getenv("TTS_PROCESS_POOL_SIZE", 0))  # 0 = un proceso por CPU
+TTS_SYNTHESIS_TIMEOUT = int(os.getenv("TTS_SYNTHESIS_TIMEOUT", 30))
+TTS_PYTTSX3_RATE = int(os.getenv("TTS_PYTTSX3_RATE", 0))  # Palabras por minuto; 0 = valor del motor
+
+# 🛡️ Proveedores externos: timeouts (conexión, lectura) en segundos, reintentos con jitter y circuit breaker
+PROVIDER_TIMEOUTS = {
+    "openai": (5, 60),
+    "translate": (5, 20),
+    "tts": (5, 20),
+    "media": (5, 30),
+    "storage": (5, 30),
+}
+PROVIDER_MAX_RETRIES = int(os.getenv("PROVIDER_MAX_RETRIES", 2))
+PROVIDER_RETRY_BACKOFF = float(os.getenv("PROVIDER_RETRY_BACKOFF", 0.5))
+PROVIDER_POOL_SIZE = int(os.getenv("PROVIDER_POOL_SIZE", 20))
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", 5))
+CIRCUIT_BREAKER_RESET_SECONDS = int(os.getenv("CIRCUIT_BREAKER_RESET_SECONDS", 30))
+
+# 🎴 Exportación .apkg: descargas de audio en paralelo
+APKG_MEDIA_DOWNLOAD_WORKERS = int(os.getenv("APKG_MEDIA_DOWNLOAD_WORKERS", 8))
+APKG_MEDIA_FILE_TIMEOUT = int(os.getenv("APKG_MEDIA_FILE_TIMEOUT", 30))  # Segundos máximos por archivo
+
+# 💽 Caché en disco de audios remotos para la exportación .apkg (compartida entre workers, LRU por bytes)
+MEDIA_CACHE_ENABLED = os.getenv("MEDIA_CACHE_ENABLED", "True") == "True"
+MEDIA_CACHE_DIR = os.getenv("MEDIA_CACHE_DIR", str(BASE_DIR / "media_cache"))
+MEDIA_CACHE_MAX_BYTES = int(os.getenv("MEDIA_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+MEDIA_CACHE_MIN_AGE = int(os.getenv("MEDIA_CACHE_MIN_AGE", 300))  # Segundos sin expulsar un archivo recién usado
+
+# 🗄️ Almacén de .apkg generados ("local" = MEDIA_ROOT/generated_apkg, "s3" = bucket privado) con retención
+EXPORT_STORAGE = os.getenv("EXPORT_STORAGE", "local")
+EXPORT_USER_QUOTA_BYTES = int(os.getenv("EXPORT_USER_QUOTA_BYTES", 200 * 1024 * 1024))
+EXPORT_GLOBAL_QUOTA_BYTES = int(os.getenv("EXPORT_GLOBAL_QUOTA_BYTES", 5 * 1024 * 1024 * 1024))
+EXPORT_MAX_AGE_DAYS = int(os.getenv("EXPORT_MAX_AGE_DAYS", 30))  # Días sin descargas antes de expirar
+EXPORT_ONE_OFF_MAX_AGE_HOURS = int(os.getenv("EXPORT_ONE_OFF_MAX_AGE_HOURS", 24))  # .apkg no reutilizables
+EXPORT_JOB_MAX_ATTEMPTS = int(os.getenv("EXPORT_JOB_MAX_ATTEMPTS", 3))  # Exportaciones en segundo plano (process_export_jobs)
+
+# 🚚 Entrega de .apkg publicados: "auto", "stream", "x-accel" (nginx), "x-sendfile" o "presigned" (S3)
+EXPORT_DELIVERY = os.getenv("EXPORT_DELIVERY", "auto")
+EXPORT_ACCEL_PREFIX = os.getenv("EXPORT_ACCEL_PREFIX", "/protected-exports/")  # location internal → MEDIA_ROOT/generated_apkg/
+EXPORT_PRESIGNED_TTL = int(os.getenv("EXPORT_PRESIGNED_TTL", 300))  # Segundos de validez de la URL firmada
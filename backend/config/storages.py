@@ -1,16 +1,71 @@
 # backend/config/storages.py
 
+from botocore.config import Config
 from storages.backends.s3boto3 import S3Boto3Storage
 from django.conf import settings
 
-class MediaStorage(S3Boto3Storage):
+from api_vocabulary.providers import get_provider
+
+# Pool de conexiones y timeouts explícitos para S3. Sin reintentos de botocore: los maneja el proveedor
+# "storage" (backoff con jitter y circuit breaker), igual que con el resto de servicios externos
+S3_CLIENT_CONFIG = Config(
+    connect_timeout=settings.PROVIDER_TIMEOUTS["storage"][0],
+    read_timeout=settings.PROVIDER_TIMEOUTS["storage"][1],
+    retries={"max_attempts": 1, "mode": "standard"},
+    max_pool_connections=settings.PROVIDER_POOL_SIZE,
+)
+
+class ProviderS3Storage(S3Boto3Storage):
+    """S3Boto3Storage cuyas llamadas al bucket pasan por get_provider("storage").call()."""
+
+    def _call(self, method, *args):
+        return get_provider("storage").call(getattr(super(), method), *args)
+
+    def _open(self, name, mode="rb"):
+        def fetch():
+            file = super(ProviderS3Storage, self)._open(name, mode)
+            if "r" in mode:
+                file.file  # S3File descarga el objeto en la primera lectura: se fuerza aquí, dentro de los reintentos
+            return file
+
+        return get_provider("storage").call(fetch)
+
+    def _save(self, name, content):
+        return self._call("_save", name, content)  # _save rebobina `content` en cada intento
+
+    def delete(self, name):
+        return self._call("delete", name)
+
+    def exists(self, name):
+        return self._call("exists", name)
+
+    def listdir(self, name):
+        return self._call("listdir", name)
+
+    def size(self, name):
+        return self._call("size", name)
+
+    def get_modified_time(self, name):
+        return self._call("get_modified_time", name)
+
+class MediaStorage(ProviderS3Storage):
     location = "audio"  # Carpeta base dentro del bucket
     default_acl = None  # No usaremos ACLs (obligatorio si el bucket tiene Ownership Enforced)
     file_overwrite = True  # Sobrescribe si ya existe
     custom_domain = settings.AWS_S3_CUSTOM_DOMAIN
+    client_config = S3_CLIENT_CONFIG
 
-class AvatarStorage(S3Boto3Storage):
+class AvatarStorage(ProviderS3Storage):
     location = "avatars"
     default_acl = "public-read"  # Esto hará que las imágenes sean accesibles desde el frontend
     file_overwrite = True
-    custom_domain = settings.AWS_S3_CUSTOM_DOMAIN
\ No newline at end of file
+    custom_domain = settings.AWS_S3_CUSTOM_DOMAIN
+    client_config = S3_CLIENT_CONFIG
+
+class ExportStorage(ProviderS3Storage):
+    location = "exports"  # .apkg generados (export_store.py)
+    default_acl = None  # Privados: nunca se sirven desde el dominio público
+    querystring_auth = True  # Si se entregan por URL, siempre firmada
+    custom_domain = None  # Con dominio propio django-storages devuelve la URL del CDN sin firmar
+    file_overwrite = True
+    client_config = S3_CLIENT_CONFIG.merge(Config(signature_version="s3v4"))  # Firma X-Amz-* (SigV4)